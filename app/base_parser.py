@@ -4,9 +4,10 @@ Bazowe klasy i interfejsy dla parserów faktur
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import re
 from decimal import Decimal
 
+import regex_patterns as rx
+
 class InvoiceItem:
     """Reprezentacja pojedynczej pozycji na fakturze"""
     
@@ -104,15 +105,8 @@ class BaseInvoiceParser(ABC):
     
     def extract_invoice_number(self, text: str) -> Optional[str]:
         """Ekstrahuje numer faktury"""
-        patterns = [
-            r'(?:Faktura\s+(?:VAT\s+)?(?:nr|Nr\.?)\s*[:\s]?)([A-Za-z0-9\-/]+)',
-            r'(?:FAKTURA\s+(?:VAT\s+)?(?:NR|Nr\.?)\s*[:\s]?)([A-Za-z0-9\-/]+)',
-            r'(?:Invoice\s+(?:number|no\.?)\s*[:\s]?)([A-Za-z0-9\-/]+)',
-            r'(?:Numer\s+faktury\s*[:\s]?)([A-Za-z0-9\-/]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in rx.BASE_INVOICE_NUMBER:
+            match = pattern.search(text)
             if match:
                 return match.group(1)
         return None
@@ -125,24 +119,9 @@ class BaseInvoiceParser(ABC):
             text: Tekst do przeszukania
             date_type: Typ daty ('invoice', 'sale', 'payment')
         """
-        date_keywords = {
-            'invoice': ['Data wystawienia', 'Data faktury', 'Invoice date', 'Data dokumentu'],
-            'sale': ['Data sprzedaży', 'Data dostawy', 'Sale date', 'Data wykonania'],
-            'payment': ['Termin płatności', 'Payment due', 'Data płatności']
-        }
-        
-        keywords = date_keywords.get(date_type, [])
-        
-        # Wzorce dat
-        date_patterns = [
-            r'(\d{4}[-/.]\d{1,2}[-/.]\d{1,2})',  # YYYY-MM-DD
-            r'(\d{1,2}[-/.]\d{1,2}[-/.]\d{4})',  # DD-MM-YYYY
-            r'(\d{1,2}\s+\w+\s+\d{4})',          # DD Month YYYY
-        ]
-        
-        for keyword in keywords:
-            pattern = f'{keyword}.*?({"|".join(date_patterns)})'
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        # Wzorce "słowo kluczowe ... data" są prekompilowane w rx.DATE_BY_TYPE
+        for pattern in rx.DATE_BY_TYPE.get(date_type, []):
+            match = pattern.search(text)
             if match:
                 return self.normalize_date(match.group(1))
         
@@ -177,13 +156,13 @@ class BaseInvoiceParser(ABC):
                     return f"{year}-{month_num}-{day}"
             
             # Format: YYYY-MM-DD lub YYYY/MM/DD
-            if re.match(r'\d{4}[-/]\d{1,2}[-/]\d{1,2}', date_str):
-                parts = re.split(r'[-/]', date_str)
+            if rx.YEAR_FIRST_DATE.match(date_str):
+                parts = rx.DATE_SEPARATOR.split(date_str)
                 return f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
             
             # Format: DD-MM-YYYY lub DD/MM/YYYY
-            if re.match(r'\d{1,2}[-/]\d{1,2}[-/]\d{4}', date_str):
-                parts = re.split(r'[-/]', date_str)
+            if rx.DAY_FIRST_DATE.match(date_str):
+                parts = rx.DATE_SEPARATOR.split(date_str)
                 return f"{parts[2]}-{parts[1].zfill(2)}-{parts[0].zfill(2)}"
             
         except:
@@ -193,19 +172,12 @@ class BaseInvoiceParser(ABC):
     
     def extract_nip(self, text: str, context: str = '') -> Optional[str]:
         """Ekstrahuje NIP z tekstu"""
-        # Wzorce NIP
-        patterns = [
-            r'NIP[\s:]*([0-9]{3}[-\s]?[0-9]{3}[-\s]?[0-9]{2}[-\s]?[0-9]{2})',
-            r'NIP[\s:]*([0-9]{10})',
-            r'VAT[\s:]*PL([0-9]{10})',
-        ]
-        
         search_text = context + text if context else text
         
-        for pattern in patterns:
-            match = re.search(pattern, search_text, re.IGNORECASE)
+        for pattern in rx.BASE_NIP:
+            match = pattern.search(search_text)
             if match:
-                nip = re.sub(r'[-\s]', '', match.group(1))
+                nip = rx.DASH_OR_SPACE.sub('', match.group(1))
                 if len(nip) == 10:
                     return nip
         
@@ -215,7 +187,7 @@ class BaseInvoiceParser(ABC):
         """Parsuje kwotę do Decimal"""
         try:
             # Usuń wszystko oprócz cyfr, przecinka i kropki
-            cleaned = re.sub(r'[^\d,.-]', '', text)
+            cleaned = rx.NON_AMOUNT_CHARS.sub('', text)
             # Zamień przecinek na kropkę
             cleaned = cleaned.replace(',', '.')
             # Usuń spacje
@@ -227,15 +199,8 @@ class BaseInvoiceParser(ABC):
     
     def extract_vat_rate(self, text: str) -> str:
         """Ekstrahuje stawkę VAT"""
-        # Wzorce stawek VAT
-        patterns = [
-            r'(\d+)\s*%',
-            r'(\d+)%',
-            r'VAT\s+(\d+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern in rx.VAT_RATE:
+            match = pattern.search(text)
             if match:
                 rate = match.group(1)
                 return f"{rate}%"
@@ -269,15 +234,13 @@ class BaseInvoiceParser(ABC):
         data['nip'] = self.extract_nip(text) or ''
         
         # Ekstrakcja kodu pocztowego i miasta
-        postal_pattern = r'(\d{2}[-\s]\d{3})\s+([A-Za-zĄĆĘŁŃÓŚŹŻąćęłńóśźż\s]+)'
-        postal_match = re.search(postal_pattern, text)
+        postal_match = rx.POSTAL_CITY.search(text)
         if postal_match:
             data['postal_code'] = postal_match.group(1).replace(' ', '-')
             data['city'] = postal_match.group(2).strip()
         
         # Ekstrakcja adresu (ulica)
-        address_pattern = r'(ul\.?|ulica)\s+([A-Za-zĄĆĘŁŃÓŚŹŻąćęłńóśźż\s]+\s+\d+[A-Za-z]?(?:/\d+)?)'
-        address_match = re.search(address_pattern, text, re.IGNORECASE)
+        address_match = rx.STREET_ADDRESS.search(text)
         if address_match:
             data['address'] = address_match.group(2).strip()
         
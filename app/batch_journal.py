@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Dziennik postępu przetwarzania wsadowego (main_multi.py)
+
+Każdy przetworzony plik PDF dopisywany jest jako linia JSON: nazwa, SHA-256
+zawartości, status oraz zserializowany wynik mapowania. Przerwane
+przetwarzanie (awaria, brak pamięci, Ctrl-C) po ponownym uruchomieniu
+pomija pliki już przetworzone poprawnie lub odrzucone przez sondę pierwszej
+strony - ponownie przetwarzane są tylko pliki brakujące, zmienione lub
+zakończone błędem.
+"""
+import dataclasses
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from comarch_mapper import ComarchInvoiceData
+from contractor_registry import get_contractor_registry
+from extraction_cache import extraction_fingerprint
+from vendor_templates import get_template_store
+
+logger = logging.getLogger(__name__)
+
+# Zmienić przy każdej zmianie formatu wpisu
+JOURNAL_VERSION = 1
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+# Plik odrzucony przez sondę pierwszej strony (nie jest fakturą) - bez wyniku w XML
+STATUS_SKIPPED = 'skipped'
+# Statusy plików, których nie trzeba przetwarzać ponownie
+DONE_STATUSES = (STATUS_OK, STATUS_SKIPPED)
+
+class BatchJournal:
+    """Dziennik JSONL obok pliku wyjściowego (<wyjście>.journal.jsonl)"""
+
+    def __init__(self, output_path, parser_type: str):
+        output_path = Path(output_path)
+        self.path = output_path.with_name(output_path.name + '.journal.jsonl')
+        self.header = {
+            'journal': JOURNAL_VERSION,
+            'parser': parser_type,
+            'extraction': extraction_fingerprint(),
+            'templates': get_template_store().fingerprint(),
+            'contractors': get_contractor_registry().fingerprint(),
+        }
+        # nazwa pliku -> (offset linii w dzienniku, sha256, status)
+        self.entries: Dict[str, Tuple[int, str, str]] = {}
+        self._file = None
+        self._reader = None
+
+    def load(self) -> int:
+        """Wczytuje istniejący dziennik i zwraca liczbę plików, których nie trzeba przetwarzać ponownie
+
+        Dziennik z innym parserem lub innymi ustawieniami ekstrakcji jest odrzucany.
+        """
+        self.entries = {}
+        if not self.path.exists():
+            return 0
+
+        with open(self.path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = None
+            if header != self.header:
+                logger.warning(f"Dziennik {self.path.name} pochodzi z innej konfiguracji - zaczynam od nowa")
+                self.reset()
+                return 0
+
+            offset = f.tell()
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # linia zapisana częściowo w chwili przerwania
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry['file']] = (offset, entry['sha256'], entry['status'])
+                except (ValueError, KeyError):
+                    logger.warning(f"Pomijam uszkodzony wpis dziennika (offset {offset})")
+                offset += len(line)
+
+        # Obcięcie niepełnej ostatniej linii, żeby kolejne wpisy zaczynały się od nowej linii
+        if self.path.stat().st_size > offset:
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+        return sum(1 for _, _, status in self.entries.values() if status in DONE_STATUSES)
+
+    def reset(self):
+        """Usuwa dziennik (następny zapis zaczyna nowy)"""
+        self.close()
+        self.entries = {}
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def is_done(self, file_name: str, sha256: str) -> bool:
+        """Czy plik o tej zawartości został już przetworzony poprawnie (lub odrzucony przez sondę)"""
+        entry = self.entries.get(file_name)
+        return entry is not None and entry[1] == sha256 and entry[2] in DONE_STATUSES
+
+    def get_status(self, file_name: str) -> Optional[str]:
+        entry = self.entries.get(file_name)
+        return entry[2] if entry else None
+
+    def record(self, file_name: str, sha256: str, comarch_data, confidence: float, error: Optional[str],
+               skipped: bool = False):
+        """Dopisuje wynik przetworzenia pliku (skipped=True - plik odrzucony przez sondę)"""
+        if self._file is None:
+            is_new = not self.path.exists() or self.path.stat().st_size == 0
+            self._file = open(self.path, 'ab')
+            if is_new:
+                self._file.write(json.dumps(self.header).encode('utf-8') + b"\n")
+
+        entry = {
+            'file': file_name,
+            'sha256': sha256,
+            'status': STATUS_SKIPPED if skipped else STATUS_OK if comarch_data is not None else STATUS_ERROR,
+            'confidence': confidence,
+            'error': error,
+            'data': dataclasses.asdict(comarch_data) if comarch_data is not None else None,
+        }
+        offset = self._file.tell()
+        self._file.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b"\n")
+        # flush wystarcza przy przerwaniu procesu - dane są już w buforach systemu
+        self._file.flush()
+        self.entries[file_name] = (offset, sha256, entry['status'])
+
+    def read_result(self, file_name: str) -> Tuple[Optional[ComarchInvoiceData], float, Optional[str]]:
+        """Zwraca (dane Comarch, dokładność, błąd) zapisane dla pliku"""
+        offset = self.entries[file_name][0]
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(offset)
+        entry = json.loads(self._reader.readline())
+
+        comarch_data = None
+        if entry['data'] is not None:
+            comarch_data = ComarchInvoiceData(**entry['data'])
+            comarch_data.source_file = file_name
+        return comarch_data, entry['confidence'], entry['error']
+
+    def close(self):
+        for handle in (self._file, self._reader):
+            if handle is not None:
+                handle.close()
+        self._file = None
+        self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
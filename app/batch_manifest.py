@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest przetwarzania przyrostowego dla main.py --batch --incremental
+
+Dla każdego pliku PDF zapisywany jest SHA-256 zawartości, wersja potoku
+(odcisk kodu parserów i generatora) oraz odcisk konfiguracji. Plik jest
+przetwarzany ponownie tylko, gdy jest nowy, zmienił się, zmienił się kod
+potoku lub ustawienia wpływające na wynik, albo brakuje pliku XML.
+Pliki odrzucone przez sondę pierwszej strony (nie są fakturami) mają status
+'skipped' i nie wymagają XML - bez zmian nie są ponownie sondowane.
+Rozmiar i czas modyfikacji są szybką ścieżką - hash liczony jest tylko
+dla plików, których metadane się zmieniły.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import get_config
+from contractor_registry import get_contractor_registry
+from extraction_cache import compute_file_hash, extraction_fingerprint
+from vendor_templates import get_template_store
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.manifest.json'
+MANIFEST_VERSION = 1
+
+STATUS_OK = 'ok'
+# Plik odrzucony przez sondę pierwszej strony - bez pliku XML
+STATUS_SKIPPED = 'skipped'
+
+# Moduły, które nie wpływają na treść wygenerowanego XML
+_NON_PIPELINE_MODULES = {
+    'main.py', 'main_multi.py', 'gui.py', 'batch_journal.py', 'batch_manifest.py', 'memory_monitor.py',
+    'watch_folder.py', 'worker_pool.py', 'batch_progress.py',
+}
+
+# Ustawienia, które nie wpływają na treść wygenerowanego XML
+_NON_OUTPUT_SETTINGS = {
+    'config', 'log_level', 'input_dir', 'output_dir', 'processed_dir', 'logs_dir',
+    'cache_enabled', 'cache_dir', 'cache_max_size_mb',
+    'watch_workers', 'watch_debounce', 'watch_poll_interval',
+    'worker_task_timeout', 'worker_max_tasks', 'worker_max_rss_mb',
+    'multipage_workers',
+}
+
+def pipeline_version(parser_type: str) -> str:
+    """Zwraca odcisk kodu potoku (parsery, mapper, generator) dla typu parsera"""
+    app_dir = Path(__file__).parent
+    digest = hashlib.sha256(parser_type.encode('utf-8'))
+    for module_path in sorted(list(app_dir.glob('*.py')) + list(app_dir.glob('parsers/*.py'))):
+        if module_path.name in _NON_PIPELINE_MODULES:
+            continue
+        digest.update(module_path.name.encode('utf-8'))
+        digest.update(module_path.read_bytes())
+    return digest.hexdigest()[:16]
+
+def config_fingerprint() -> str:
+    """Zwraca odcisk ustawień konfiguracji wpływających na wynik"""
+    settings = {name: value for name, value in vars(get_config()).items()
+                if name not in _NON_OUTPUT_SETTINGS}
+    settings['extraction'] = extraction_fingerprint()
+    # Nowy lub poprawiony szablon dostawcy zmienia wynik jego faktur
+    settings['templates'] = get_template_store().fingerprint()
+    # Zmiana eksportu kontrahentów zmienia kody i dane sprzedawców
+    settings['contractors'] = get_contractor_registry().fingerprint()
+    payload = json.dumps(settings, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+class BatchManifest:
+    """Manifest plików przetworzonych w katalogu wyjściowym"""
+
+    def __init__(self, output_dir, parser_type: str):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.parser_type = parser_type
+        self.pipeline_version = pipeline_version(parser_type)
+        self.config_fingerprint = config_fingerprint()
+        self.files: Dict[str, Dict] = {}
+        # Hashe policzone w bieżącym uruchomieniu (do ponownego użycia w record)
+        self._hashes: Dict[str, str] = {}
+
+    def load(self):
+        """Wczytuje manifest (brak lub uszkodzony plik = pusty manifest)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Uszkodzony manifest {self.path}: {e} - wszystkie pliki zostaną przetworzone")
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.files = data.get('files', {})
+
+    def save(self):
+        """Zapisuje manifest atomowo"""
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _file_hash(self, pdf_path: Path) -> str:
+        key = str(pdf_path)
+        if key not in self._hashes:
+            self._hashes[key] = compute_file_hash(pdf_path)
+        return self._hashes[key]
+
+    def get_change_reason(self, pdf_path: Path, output_file: Path) -> Optional[str]:
+        """Zwraca powód ponownego przetworzenia albo None, gdy XML jest aktualny
+        (lub plik bez zmian był już odrzucony przez sondę)"""
+        entry = self.files.get(pdf_path.name)
+        if entry is None:
+            return "nowy plik"
+        if entry.get('parser') != self.parser_type or entry.get('pipeline') != self.pipeline_version:
+            return "zmiana parsera"
+        if entry.get('config') != self.config_fingerprint:
+            return "zmiana konfiguracji"
+        if entry.get('status', STATUS_OK) != STATUS_SKIPPED and not output_file.exists():
+            return "brak pliku XML"
+
+        stat = pdf_path.stat()
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return None
+        if entry.get('sha256') != self._file_hash(pdf_path):
+            return "zmieniona zawartość"
+        # Zmienił się tylko czas modyfikacji - aktualizujemy metadane bez przetwarzania
+        entry['size'] = stat.st_size
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return None
+
+    def record(self, pdf_path: Path, output_file: Path, skipped: bool = False):
+        """Zapisuje w manifeście poprawnie przetworzony plik (skipped - odrzucony przez sondę)"""
+        stat = pdf_path.stat()
+        self.files[pdf_path.name] = {
+            'sha256': self._file_hash(pdf_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'parser': self.parser_type,
+            'pipeline': self.pipeline_version,
+            'config': self.config_fingerprint,
+            'status': STATUS_SKIPPED if skipped else STATUS_OK,
+            'output': None if skipped else output_file.name,
+        }
+
+    def is_skipped(self, pdf_name: str) -> bool:
+        """Czy plik był odrzucony przez sondę (nie jest fakturą)"""
+        return self.files.get(pdf_name, {}).get('status') == STATUS_SKIPPED
+
+    def forget(self, pdf_name: str):
+        """Usuwa wpis (np. po nieudanym przetworzeniu)"""
+        self.files.pop(pdf_name, None)
+
+    def prune(self, existing_names):
+        """Usuwa wpisy plików, których nie ma już w katalogu wejściowym"""
+        existing = set(existing_names)
+        for name in [name for name in self.files if name not in existing]:
+            del self.files[name]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Postęp przetwarzania wsadowego (main_multi.py)
+
+Linia postępu z liczbą plików, tempem (pliki/s), szacowanym czasem do końca
+oraz podziałem na pliki z OCR, pliki tekstowe, trafienia cache, pliki
+odrzucone przez sondę pierwszej strony i błędy.
+Logowana co PROGRESS_INTERVAL sekund, żeby długie partie nie zalewały logu.
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 2.0
+
+KIND_OCR = 'ocr'
+KIND_TEXT = 'text'
+KIND_CACHE = 'cache'
+KIND_SKIPPED = 'skipped'
+KIND_ERROR = 'error'
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def classify_result(stats: dict, success: bool) -> str:
+    """Rodzaj wyniku na podstawie statystyk procesu roboczego"""
+    if stats.get('probe_rejected'):
+        return KIND_SKIPPED
+    if not success:
+        return KIND_ERROR
+    if stats.get('cache_hit'):
+        return KIND_CACHE
+    return KIND_OCR if stats.get('ocr_pages') else KIND_TEXT
+
+def format_probe_summary(probed: int, rejected: int, saved_seconds: float) -> str:
+    """Linia podsumowania sondy pierwszej strony (odsetek odrzuconych i zaoszczędzony czas)"""
+    rate = rejected / probed if probed else 0.0
+    return (f"🔎 Sonda 1. strony: odrzucone {rejected} z {probed} sprawdzonych plików ({rate:.0%}), "
+            f"zaoszczędzono ok. {saved_seconds:.1f} s ekstrakcji")
+
+class BatchProgress:
+    """Licznik postępu z okresowym logowaniem linii stanu"""
+
+    def __init__(self, total: int, interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.counts = {KIND_OCR: 0, KIND_TEXT: 0, KIND_CACHE: 0, KIND_SKIPPED: 0, KIND_ERROR: 0}
+        self.started_at = time.monotonic()
+        self._logged_at = self.started_at
+
+    def update(self, kind: str):
+        """Rejestruje zakończony plik i loguje linię postępu, jeśli minął interwał"""
+        self.done += 1
+        self.counts[kind] += 1
+        now = time.monotonic()
+        if now - self._logged_at >= self.interval or self.done == self.total:
+            self._logged_at = now
+            logger.info(self.format_line(now))
+
+    def format_line(self, now: float = None) -> str:
+        elapsed = (now or time.monotonic()) - self.started_at
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = _format_duration(remaining / rate) if rate > 0 and remaining else "-"
+        percent = self.done / self.total if self.total else 1.0
+        return (f"⏳ {self.done}/{self.total} ({percent:.0%}) | {rate:.1f} pliku/s | ETA {eta} | "
+                f"OCR: {self.counts[KIND_OCR]}, tekst: {self.counts[KIND_TEXT]}, "
+                f"cache: {self.counts[KIND_CACHE]}, pominięte: {self.counts[KIND_SKIPPED]}, "
+                f"błędy: {self.counts[KIND_ERROR]}")
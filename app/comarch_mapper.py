@@ -3,8 +3,14 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
+import os
 import re
-import requests
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from contractor_registry import Contractor, get_contractor_registry
+from nip_whitelist import get_nip_validator
 
 logger = logging.getLogger(__name__)
 
@@ -49,19 +55,12 @@ class ComarchMapper:
                 'city': 'Kraków'
             }
         }
+        self.nip_validator = get_nip_validator()
+        self.contractor_registry = get_contractor_registry()
 
     def validate_nip(self, nip: str) -> bool:
-        """Walidacja NIP przez API GUS lub prostą weryfikację"""
-        if not nip or len(nip) != 10 or not nip.isdigit():
-            return False
-        try:
-            response = requests.get(f"https://wl-api.mf.gov.pl/api/check/nip/{nip}")
-            return response.status_code == 200 and response.json().get('result', {}).get('status') == 'Czynny'
-        except:
-            # Fallback: prosty algorytm weryfikacji NIP
-            weights = [6, 5, 7, 2, 3, 4, 5, 6, 7]
-            checksum = sum(int(nip[i]) * weights[i] for i in range(9)) % 11
-            return checksum == int(nip[9])
+        """Walidacja NIP: suma kontrolna, snapshot białej listy, opcjonalnie API MF z timeoutem"""
+        return self.nip_validator.validate(nip)
 
     def map_invoice_data(self, invoice_data) -> ComarchInvoiceData:
         """Mapuje dane z PDF do struktury Comarch"""
@@ -76,6 +75,7 @@ class ComarchMapper:
             seller_info = invoice_data.get('seller', {})
             seller_name = seller_info.get('name')
             seller_nip = seller_info.get('nip')
+            seller_postal_code = seller_info.get('postal_code')
             payment_method = invoice_data.get('payment_method')
             payment_date = invoice_data.get('payment_date')
             items = invoice_data.get('items', [])
@@ -92,6 +92,7 @@ class ComarchMapper:
             jpk_flags = getattr(invoice_data, 'jpk_flags', [])
             seller_name = getattr(invoice_data, 'seller_name', None)
             seller_nip = getattr(invoice_data, 'seller_nip', None)
+            seller_postal_code = getattr(invoice_data, 'seller_postal_code', None)
             payment_method = getattr(invoice_data, 'payment_method', None)
             payment_date = getattr(invoice_data, 'payment_date', None)
             items = getattr(invoice_data, 'items', [])
@@ -106,9 +107,16 @@ class ComarchMapper:
         comarch_data.is_correction = is_correction
         comarch_data.currency = currency
         comarch_data.jpk_flags = jpk_flags or []
+        # Sprzedawca z rejestru kontrahentów: po NIP, a bez NIP - po nazwie i kodzie pocztowym
+        contractor = self.contractor_registry.resolve(seller_nip, seller_name, seller_postal_code)
         comarch_data.seller_name = self._clean_company_name(seller_name)
         comarch_data.seller_nip = self._format_nip(seller_nip)
-        comarch_data.seller_code = self._generate_seller_code(seller_name, seller_nip)
+        if contractor is not None:
+            if comarch_data.seller_name == "NIEZNANY DOSTAWCA":
+                comarch_data.seller_name = contractor.name
+            comarch_data.seller_nip = comarch_data.seller_nip or contractor.nip
+            comarch_data.seller_address = contractor.to_comarch_address()
+        comarch_data.seller_code = self._generate_seller_code(contractor, comarch_data.seller_nip)
         if not self.validate_nip(comarch_data.seller_nip):
             logger.warning(f"Niepoprawny NIP sprzedawcy: {comarch_data.seller_nip}")
         comarch_data.buyer_name = self.default_buyer['name']
@@ -160,7 +168,10 @@ class ComarchMapper:
         cleaned = re.sub(r'[^\d]', '', str(nip))
         return cleaned if len(cleaned) == 10 else ""
 
-    def _generate_seller_code(self, name: Optional[str], nip: Optional[str]) -> str:
+    def _generate_seller_code(self, contractor: Optional[Contractor], nip: Optional[str]) -> str:
+        """Kod kontrahenta z eksportu Optimy, a dla kontrahenta spoza eksportu - z końcówki NIP"""
+        if contractor is not None and contractor.code:
+            return contractor.code
         if nip and len(nip) == 10:
             return f"KONTR_{nip[-4:]}"
         return "KONTR_UNKNOWN"
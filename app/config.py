@@ -26,10 +26,22 @@ class Config:
         self.ocr_languages = self.config.get('DEFAULT', 'OCR_LANGUAGES', fallback='pol+eng')
         self.ocr_dpi = self.config.getint('DEFAULT', 'OCR_DPI', fallback=300)
         self.ocr_psm = self.config.getint('DEFAULT', 'OCR_PSM', fallback=6)
+        self.ocr_workers = self.config.getint('DEFAULT', 'OCR_WORKERS', fallback=4)
+        self.ocr_min_page_chars = self.config.getint('DEFAULT', 'OCR_MIN_PAGE_CHARS', fallback=50)
+        self.multipage_workers = self.config.getint('DEFAULT', 'MULTIPAGE_WORKERS', fallback=0)
+        self.probe_enabled = self.config.getboolean('DEFAULT', 'PROBE_ENABLED', fallback=True)
+        self.probe_ocr_dpi = self.config.getint('DEFAULT', 'PROBE_OCR_DPI', fallback=100)
+        self.lazy_pages = self.config.getboolean('DEFAULT', 'LAZY_PAGES', fallback=True)
+        self.vendor_templates_enabled = self.config.getboolean('DEFAULT', 'VENDOR_TEMPLATES_ENABLED', fallback=True)
+        self.vendor_templates_dir = self.config.get('DEFAULT', 'VENDOR_TEMPLATES_DIR', fallback='templates')
         
         # Poppler
         self.poppler_path = self.config.get('DEFAULT', 'POPPLER_PATH', fallback=None)
         
+        # NLP
+        self.nlp_enabled = self.config.getboolean('DEFAULT', 'NLP_ENABLED', fallback=True)
+        self.spacy_model = self.config.get('DEFAULT', 'SPACY_MODEL', fallback='pl_core_news_sm')
+        
         # Domyślny nabywca
         self.default_buyer_name = self.config.get('DEFAULT', 'DEFAULT_BUYER_NAME', 
                                                   fallback='2Vision Sp. z o.o.')
@@ -48,6 +60,29 @@ class Config:
         self.processed_dir = self.config.get('DEFAULT', 'PROCESSED_DIR', fallback='processed')
         self.logs_dir = self.config.get('DEFAULT', 'LOGS_DIR', fallback='logs')
         
+        # Cache ekstrakcji
+        self.cache_enabled = self.config.getboolean('DEFAULT', 'CACHE_ENABLED', fallback=True)
+        self.cache_dir = self.config.get('DEFAULT', 'CACHE_DIR', fallback='cache')
+        self.cache_max_size_mb = self.config.getint('DEFAULT', 'CACHE_MAX_SIZE_MB', fallback=500)
+        
+        # Walidacja NIP (biała lista VAT)
+        self.nip_whitelist_file = self.config.get('DEFAULT', 'NIP_WHITELIST_FILE', fallback='')
+        self.nip_live_check = self.config.getboolean('DEFAULT', 'NIP_LIVE_CHECK', fallback=False)
+        self.nip_live_timeout = self.config.getfloat('DEFAULT', 'NIP_LIVE_TIMEOUT', fallback=3.0)
+        
+        # Rejestr kontrahentów (eksport kontrahentów Optimy, CSV lub XML)
+        self.contractors_file = self.config.get('DEFAULT', 'CONTRACTORS_FILE', fallback='')
+        
+        # Demon obserwujący katalog wejściowy (watch_folder.py)
+        self.watch_workers = self.config.getint('DEFAULT', 'WATCH_WORKERS', fallback=0)
+        self.watch_debounce = self.config.getfloat('DEFAULT', 'WATCH_DEBOUNCE', fallback=2.0)
+        self.watch_poll_interval = self.config.getfloat('DEFAULT', 'WATCH_POLL_INTERVAL', fallback=2.0)
+        
+        # Procesy robocze (main_multi.py, watch_folder.py)
+        self.worker_task_timeout = self.config.getfloat('DEFAULT', 'WORKER_TASK_TIMEOUT', fallback=300.0)
+        self.worker_max_tasks = self.config.getint('DEFAULT', 'WORKER_MAX_TASKS', fallback=200)
+        self.worker_max_rss_mb = self.config.getint('DEFAULT', 'WORKER_MAX_RSS_MB', fallback=1024)
+        
         # Logowanie
         self.log_level = self.config.get('DEFAULT', 'LOG_LEVEL', fallback='INFO')
         
@@ -62,8 +97,19 @@ class Config:
         self.ocr_languages = 'pol+eng'
         self.ocr_dpi = 300
         self.ocr_psm = 6
+        self.ocr_workers = 4
+        self.ocr_min_page_chars = 50
+        self.multipage_workers = 0
+        self.probe_enabled = True
+        self.probe_ocr_dpi = 100
+        self.lazy_pages = True
+        self.vendor_templates_enabled = True
+        self.vendor_templates_dir = 'templates'
         self.poppler_path = None
         
+        self.nlp_enabled = True
+        self.spacy_model = 'pl_core_news_sm'
+        
         self.default_buyer_name = '2Vision Sp. z o.o.'
         self.default_buyer_nip = '6751781780'
         self.default_buyer_address = 'ul. Dąbska 20A/17'
@@ -75,6 +121,24 @@ class Config:
         self.processed_dir = 'processed'
         self.logs_dir = 'logs'
         
+        self.cache_enabled = True
+        self.cache_dir = 'cache'
+        self.cache_max_size_mb = 500
+        
+        self.nip_whitelist_file = ''
+        self.nip_live_check = False
+        self.nip_live_timeout = 3.0
+        
+        self.contractors_file = ''
+        
+        self.watch_workers = 0
+        self.watch_debounce = 2.0
+        self.watch_poll_interval = 2.0
+        
+        self.worker_task_timeout = 300.0
+        self.worker_max_tasks = 200
+        self.worker_max_rss_mb = 1024
+        
         self.log_level = 'INFO'
         
         self.xml_encoding = 'UTF-8'
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+"""
+Rejestr kontrahentów z indeksami do rozpoznawania sprzedawcy
+
+Kontrahenci wczytywani są z eksportu kontrahentów Comarch ERP Optima
+(CONTRACTORS_FILE, CSV albo XML) i uzupełniani wbudowaną listą znanych firm.
+Rejestr ma indeksy:
+- NIP -> kontrahent
+- kod pocztowy -> kontrahenci
+- słowo nazwy -> kontrahenci (słowa bez wielkości liter, polskich znaków
+  i form prawnych "sp. z o.o.", "s.a." itp.)
+- trigramy słów nazw -> słowa (nazwy z błędami OCR)
+
+Rozpoznanie sprzedawcy i kod kontrahenta to wyszukanie w indeksach - koszt
+nie rośnie z liczbą kontrahentów w rejestrze (przeglądani są tylko
+kontrahenci ze wspólnym słowem nazwy).
+
+Eksport CSV: pierwszy wiersz z nagłówkami (Kod/Akronim, Nazwa, NIP, Ulica,
+Nr domu, Nr lokalu, Miejscowość, Kod pocztowy, Kraj), separator ; , lub
+tabulator, kodowanie UTF-8 albo Windows-1250. Eksport XML: elementy
+<KONTRAHENT> z polami AKRONIM, NIP, NAZWA1..NAZWA3 i pierwszym adresem.
+"""
+import csv
+import hashlib
+import logging
+import math
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import regex_patterns as rx
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Minimalny wynik dopasowania nazwy (ważone wspólne słowa, 0-1)
+NAME_MATCH_THRESHOLD = 0.7
+# Premia za zgodny kod pocztowy
+POSTAL_CODE_BONUS = 0.1
+# Podobieństwo słowa z błędem do słowa z rejestru (Dice na trigramach)
+FUZZY_TOKEN_SIMILARITY = 0.7
+FUZZY_MIN_LENGTH = 4
+# Słowa występujące w nazwach większej liczby kontrahentów nie wyznaczają
+# kandydatów (np. "handel", "polska") - liczą się tylko w wyniku
+MAX_CANDIDATE_POSTINGS = 200
+
+# Formy prawne i spójniki pomijane w nazwach
+LEGAL_FORM_TOKENS = frozenset({
+    'sp', 'z', 'o', 'o.o', 'z.o.o', 'sp.z', 'sp.z.o.o', 'spolka', 'spolki', 'ograniczona', 'ograniczonej',
+    'odpowiedzialnoscia', 'akcyjna', 'jawna', 'komandytowa', 'komandytowo-akcyjna', 'cywilna', 'partnerska',
+    's.a', 'sa', 's.c', 'sc', 'sp.j', 'spj', 'sp.k', 'spk', 'sp.p', 's.k.a', 'ska', 'p.p.h.u', 'pphu', 'p.h.u',
+    'phu', 'f.h.u', 'fhu', 'i', 'oraz',
+})
+
+_POLISH_LETTERS = str.maketrans('ąćęłńóśźż', 'acelnoszz')
+
+# Nagłówki kolumn / znaczniki eksportu Optimy -> pole kontrahenta
+FIELD_ALIASES = {
+    'kod': 'code', 'akronim': 'code', 'kod_kontrahenta': 'code',
+    'nazwa': 'name', 'nazwa1': 'name', 'nazwa_pelna': 'name', 'pelna_nazwa': 'name',
+    'nazwa2': 'name2', 'nazwa3': 'name3',
+    'nip': 'nip', 'nip_pesel': 'nip',
+    'ulica': 'street', 'adres': 'street',
+    'nr_domu': 'building', 'numer_domu': 'building',
+    'nr_lokalu': 'apartment', 'numer_lokalu': 'apartment',
+    'miejscowosc': 'city', 'miasto': 'city',
+    'kod_pocztowy': 'postal_code',
+    'kraj': 'country',
+}
+
+# Znane firmy bez NIP na fakturze lub z nazwą spoza bloku sprzedawcy
+# (dawniej known_companies w parserach v5/v6); aliasy to frazy szukane w tekście
+BUILTIN_CONTRACTORS = (
+    {'name': '"ZAGAMIX II" L.J. CHRZĄSTEK SP. JAWNA', 'nip': '7341399090', 'street': 'ul. Wczasowa 18',
+     'city': 'Kraków', 'postal_code': '30-694', 'aliases': ('zagamix',)},
+    {'name': 'Hotel Stara Poczta', 'nip': '7341399090', 'street': 'ul. Wczasowa 18',
+     'city': 'Kraków', 'postal_code': '30-694'},
+    {'name': 'nazwa.pl sp. z o.o.', 'nip': '7342867148', 'street': 'ul. Medyczna 9',
+     'city': 'Katowice', 'postal_code': '40-764'},
+    {'name': 'Grzegorz Jakubowski', 'nip': '6751365082'},
+    {'name': 'MULTI Wyroby Gumowe S.C.', 'nip': '8842755507', 'aliases': ('multi',)},
+    {'name': 'Krzysztof Nowak Design', 'aliases': ('krzysztof nowak',)},
+)
+
+@dataclass
+class Contractor:
+    """Kontrahent z rejestru"""
+    name: str
+    nip: str = ''
+    code: str = ''
+    street: str = ''
+    building: str = ''
+    apartment: str = ''
+    city: str = ''
+    postal_code: str = ''
+    country: str = ''
+    aliases: Tuple[str, ...] = ()
+
+    @property
+    def address(self) -> str:
+        """Ulica z numerem domu i lokalu (np. "ul. Dąbska 20A/17")"""
+        number = f"{self.building}/{self.apartment}" if self.building and self.apartment else self.building
+        return ' '.join(part for part in (self.street, number) if part)
+
+    def to_party(self) -> Dict[str, str]:
+        """Niepuste dane w układzie sprzedawcy/nabywcy parsera (name, nip, address, city, postal_code)"""
+        party = {'name': self.name, 'nip': self.nip, 'address': self.address,
+                 'city': self.city, 'postal_code': self.postal_code}
+        return {key: value for key, value in party.items() if value}
+
+    def to_comarch_address(self) -> Optional[Dict[str, str]]:
+        """Adres w układzie ComarchInvoiceData.seller_address albo None, gdy rejestr go nie zna"""
+        if not self.street and not self.city:
+            return None
+        return {'street': self.street, 'building': self.building, 'apartment': self.apartment,
+                'postal_code': self.postal_code, 'city': self.city}
+
+def fold_text(text: str) -> str:
+    """Małe litery bez polskich znaków (OCR i eksporty często je gubią)"""
+    return text.lower().translate(_POLISH_LETTERS)
+
+def name_tokens(text: Optional[str]) -> List[str]:
+    """Słowa nazwy bez form prawnych, w kolejności występowania"""
+    if not text:
+        return []
+    tokens = [token[4:] if token.startswith('www.') else token
+              for token in rx.CONTRACTOR_NAME_TOKEN.findall(fold_text(text))]
+    significant = [token for token in tokens if token not in LEGAL_FORM_TOKENS]
+    # Nazwa złożona z samych form prawnych (np. "S.C.") - zostają wszystkie słowa
+    return significant or tokens
+
+def normalize_nip(nip: Optional[str]) -> str:
+    """10 cyfr NIP (bez prefiksu PL i separatorów) albo '' dla innych identyfikatorów"""
+    digits = rx.NON_DIGITS.sub('', str(nip or ''))
+    return digits if len(digits) == 10 else ''
+
+def normalize_postal_code(postal_code: Optional[str]) -> str:
+    """Kod pocztowy w postaci 00-000 albo ''"""
+    match = rx.CONTRACTOR_POSTAL_CODE.match(str(postal_code or '').strip())
+    return f"{match.group(1)}-{match.group(2)}" if match else ''
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+def _field_key(label: str) -> str:
+    return rx.CONTRACTOR_FIELD_KEY.sub('_', fold_text(label.strip())).strip('_')
+
+def _contractor_from_fields(fields: Dict[str, str]) -> Optional[Contractor]:
+    """Kontrahent z pól wiersza eksportu (klucze z FIELD_ALIASES) albo None dla pustego wiersza"""
+    name = ' '.join(fields[key].strip() for key in ('name', 'name2', 'name3') if fields.get(key, '').strip())
+    nip = normalize_nip(fields.get('nip'))
+    if not name and not nip:
+        return None
+    return Contractor(
+        name=name or fields.get('code', '').strip(),
+        nip=nip,
+        code=fields.get('code', '').strip(),
+        street=fields.get('street', '').strip(),
+        building=fields.get('building', '').strip(),
+        apartment=fields.get('apartment', '').strip(),
+        city=fields.get('city', '').strip(),
+        postal_code=normalize_postal_code(fields.get('postal_code')) or fields.get('postal_code', '').strip(),
+        country=fields.get('country', '').strip(),
+    )
+
+def _load_csv(data: bytes) -> List[Contractor]:
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp1250')
+    lines = text.splitlines()
+    try:
+        delimiter = csv.Sniffer().sniff('\n'.join(lines[:20]), delimiters=';,\t').delimiter
+    except csv.Error:
+        delimiter = ';'
+    reader = csv.reader(lines, delimiter=delimiter)
+    header = next(reader, None)
+    if not header:
+        return []
+    columns = {index: FIELD_ALIASES[_field_key(label)]
+               for index, label in enumerate(header) if _field_key(label) in FIELD_ALIASES}
+    if 'name' not in columns.values() and 'nip' not in columns.values():
+        raise ValueError(f"brak kolumny z nazwą lub NIP kontrahenta w nagłówku: {header}")
+
+    contractors = []
+    for row in reader:
+        fields = {}
+        for index, field in columns.items():
+            if index < len(row) and field not in fields:
+                fields[field] = row[index]
+        contractor = _contractor_from_fields(fields)
+        if contractor is not None:
+            contractors.append(contractor)
+    return contractors
+
+def _load_xml(path: Path) -> List[Contractor]:
+    contractors = []
+    for _, element in ET.iterparse(str(path), events=('end',)):
+        if _field_key(element.tag.rsplit('}', 1)[-1]) != 'kontrahent':
+            continue
+        fields = {}
+        # Pierwsze wystąpienie pola wygrywa - dane kontrahenta i jego pierwszy adres
+        for child in element.iter():
+            if len(child) or not child.text or not child.text.strip():
+                continue
+            field = FIELD_ALIASES.get(_field_key(child.tag.rsplit('}', 1)[-1]))
+            if field and field not in fields:
+                fields[field] = child.text
+        contractor = _contractor_from_fields(fields)
+        if contractor is not None:
+            contractors.append(contractor)
+        element.clear()
+    return contractors
+
+def load_optima_export(path: str) -> Tuple[List[Contractor], str]:
+    """Wczytuje eksport kontrahentów Optimy (CSV lub XML); zwraca kontrahentów i SHA-256 pliku"""
+    export_path = Path(path)
+    if not export_path.is_absolute():
+        export_path = Path(__file__).parent.parent / export_path
+    data = export_path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if export_path.suffix.lower() == '.xml':
+        try:
+            return _load_xml(export_path), digest
+        except ET.ParseError as e:
+            raise ValueError(f"niepoprawny XML: {e}")
+    return _load_csv(data), digest
+
+def _contains_phrase(tokens: List[str], phrase: Tuple[str, ...]) -> bool:
+    """Czy słowa frazy występują w tokens kolejno, obok siebie"""
+    length = len(phrase)
+    return any(tuple(tokens[position:position + length]) == phrase
+               for position, token in enumerate(tokens) if token == phrase[0])
+
+class ContractorRegistry:
+    """Kontrahenci z indeksami NIP, kodu pocztowego i słów nazwy"""
+
+    def __init__(self, contractors: Iterable[Contractor] = (), source_hash: str = ''):
+        self.contractors: List[Contractor] = []
+        self.source_hash = source_hash
+        # Kilka firm może dzielić NIP (np. hotel i prowadząca go spółka)
+        self.by_nip: Dict[str, List[int]] = defaultdict(list)
+        self.by_postal_code: Dict[str, List[int]] = defaultdict(list)
+        self.by_token: Dict[str, List[int]] = defaultdict(list)
+        self._tokens: List[Set[str]] = []
+        # Frazy (nazwa i aliasy) każdego kontrahenta - wybór spośród firm o tym samym NIP
+        self._contractor_phrases: List[List[Tuple[str, ...]]] = []
+        # Pierwsze słowo frazy (nazwa lub alias) -> (słowa frazy, kontrahent)
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], int]]] = defaultdict(list)
+        self._trigram_tokens: Dict[str, Set[str]] = defaultdict(set)
+        self._token_trigrams: Dict[str, FrozenSet[str]] = {}
+        for contractor in contractors:
+            self.add(contractor)
+
+    def __len__(self) -> int:
+        return len(self.contractors)
+
+    def add(self, contractor: Contractor):
+        """Dodaje kontrahenta do indeksów"""
+        index = len(self.contractors)
+        self.contractors.append(contractor)
+        if contractor.nip:
+            self.by_nip[contractor.nip].append(index)
+        if contractor.postal_code:
+            self.by_postal_code[contractor.postal_code].append(index)
+
+        tokens = name_tokens(contractor.name)
+        self._tokens.append(set(tokens))
+        for token in set(tokens):
+            if not self.by_token[token]:
+                grams = frozenset(_trigrams(token))
+                self._token_trigrams[token] = grams
+                for gram in grams:
+                    self._trigram_tokens[gram].add(token)
+            self.by_token[token].append(index)
+
+        phrases = [tuple(phrase) for phrase in [tokens] + [name_tokens(alias) for alias in contractor.aliases] if phrase]
+        self._contractor_phrases.append(phrases)
+        for phrase in phrases:
+            # Pojedyncze krótkie słowo jako fraza dawałoby przypadkowe trafienia
+            if len(phrase) > 1 or (phrase and len(phrase[0]) >= FUZZY_MIN_LENGTH):
+                self._phrases[phrase[0]].append((phrase, index))
+
+    def _pick_by_phrase(self, indexes: List[int], tokens: List[str]) -> Contractor:
+        """Spośród kontrahentów o tym samym NIP ten, którego nazwa lub alias występuje
+        w słowach tokens (najdłuższa fraza), a bez trafienia - pierwszy"""
+        best, best_length = indexes[0], 0
+        if len(indexes) > 1:
+            for index in indexes:
+                for phrase in self._contractor_phrases[index]:
+                    if len(phrase) > best_length and _contains_phrase(tokens, phrase):
+                        best, best_length = index, len(phrase)
+        return self.contractors[best]
+
+    def get_by_nip(self, nip: Optional[str], name: Optional[str] = None) -> Optional[Contractor]:
+        """Kontrahent o danym NIP; gdy NIP dzieli kilka firm - wybierany po nazwie"""
+        indexes = self.by_nip.get(normalize_nip(nip))
+        if not indexes:
+            return None
+        return self._pick_by_phrase(indexes, name_tokens(name))
+
+    def resolve(self, nip: Optional[str] = None, name: Optional[str] = None,
+                postal_code: Optional[str] = None) -> Optional[Contractor]:
+        """Kontrahent po NIP, a gdy faktura nie ma NIP - po nazwie (i kodzie pocztowym)
+
+        NIP spoza rejestru oznacza innego kontrahenta, nawet o tej samej nazwie
+        (np. oddział lub spółka z grupy) - wtedy wynik jest pusty.
+        """
+        if normalize_nip(nip):
+            return self.get_by_nip(nip, name)
+        return self.match_name(name, postal_code)
+
+    def _idf(self, token: str) -> float:
+        return math.log((len(self.contractors) + 1) / (len(self.by_token.get(token, ())) + 1)) + 1.0
+
+    def _similar_tokens(self, token: str) -> List[Tuple[str, float]]:
+        """Słowa z rejestru pasujące do słowa zapytania: (słowo, podobieństwo 0-1)"""
+        if self.by_token.get(token):
+            return [(token, 1.0)]
+        if len(token) < FUZZY_MIN_LENGTH:
+            return []
+        grams = _trigrams(token)
+        # Słowo o podobieństwie >= progu ma co najmniej min_shared wspólnych trigramów,
+        # więc ma też któryś z (len - min_shared + 1) najrzadszych - tylko one wyznaczają kandydatów
+        min_shared = math.ceil(FUZZY_TOKEN_SIMILARITY * len(grams) / (2.0 - FUZZY_TOKEN_SIMILARITY))
+        rarest = sorted(grams, key=lambda gram: len(self._trigram_tokens.get(gram, ())))
+        candidates = set()
+        for gram in rarest[:len(grams) - min_shared + 1]:
+            candidates.update(self._trigram_tokens.get(gram, ()))
+        similar = []
+        for candidate in candidates:
+            candidate_grams = self._token_trigrams[candidate]
+            if len(candidate_grams) < min_shared:
+                continue
+            similarity = 2.0 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            if similarity >= FUZZY_TOKEN_SIMILARITY:
+                similar.append((candidate, similarity))
+        return similar
+
+    def match_name(self, name: Optional[str], postal_code: Optional[str] = None) -> Optional[Contractor]:
+        """Kontrahent o najbardziej podobnej nazwie albo None (brak lub niejednoznaczne dopasowanie)"""
+        query = set(name_tokens(name))
+        if not query or not self.contractors:
+            return None
+        postal_code = normalize_postal_code(postal_code)
+
+        matches = {token: self._similar_tokens(token) for token in query}
+        candidates = set()
+        for similar in matches.values():
+            for token, _ in similar:
+                postings = self.by_token[token]
+                if len(postings) <= MAX_CANDIDATE_POSTINGS:
+                    candidates.update(postings)
+        if not candidates and postal_code:
+            candidates.update(self.by_postal_code.get(postal_code, ()))
+
+        query_weight = sum(self._idf(token) for token in query)
+        scored = []
+        for index in candidates:
+            tokens = self._tokens[index]
+            matched_tokens = set()
+            matched_weight = 0.0
+            for token, similar in matches.items():
+                best = max(((similarity, other) for other, similarity in similar if other in tokens), default=None)
+                if best is not None:
+                    matched_weight += self._idf(token) * best[0]
+                    matched_tokens.add(best[1])
+            extra_weight = sum(self._idf(token) for token in tokens - matched_tokens)
+            score = matched_weight / (query_weight + extra_weight)
+            if postal_code and self.contractors[index].postal_code == postal_code:
+                score += POSTAL_CODE_BONUS
+            scored.append((score, index))
+        if not scored:
+            return None
+
+        scored.sort(key=lambda entry: (-entry[0], entry[1]))
+        best_score, best_index = scored[0]
+        if best_score < NAME_MATCH_THRESHOLD:
+            return None
+        best = self.contractors[best_index]
+        # Dwóch różnych kontrahentów z tym samym wynikiem - nie zgadujemy
+        for score, index in scored[1:]:
+            if score < best_score - 1e-9:
+                break
+            other = self.contractors[index]
+            if other.nip != best.nip or not best.nip:
+                return None
+        return best
+
+    def find_in_text(self, text: str, exclude_nips: Iterable[str] = ()) -> Optional[Contractor]:
+        """Kontrahent, którego NIP (najpierw) lub nazwa/alias występuje w tekście faktury
+
+        exclude_nips - NIP-y do pominięcia (np. nabywcy), żeby nie wziąć go za sprzedawcę.
+        """
+        if not text or not self.contractors:
+            return None
+        excluded = {normalize_nip(nip) for nip in exclude_nips if nip}
+        tokens = name_tokens(text)
+
+        for match in rx.TEMPLATE_NIP_CANDIDATE.finditer(text):
+            nip = normalize_nip(match.group(1))
+            if nip and nip not in excluded and self.by_nip.get(nip):
+                return self._pick_by_phrase(self.by_nip[nip], tokens)
+
+        for position, token in enumerate(tokens):
+            phrases = self._phrases.get(token)
+            if not phrases:
+                continue
+            found = None
+            for phrase, index in phrases:
+                if (tuple(tokens[position:position + len(phrase)]) == phrase
+                        and self.contractors[index].nip not in excluded
+                        and (found is None or len(phrase) > len(found[0]))):
+                    found = (phrase, index)
+            if found is not None:
+                return self.contractors[found[1]]
+        return None
+
+    def fingerprint(self) -> str:
+        """Odcisk eksportu kontrahentów (zmiana eksportu zmienia kody i dane sprzedawców)"""
+        return self.source_hash[:16]
+
+def load_contractor_registry(contractors_file: Optional[str] = None) -> ContractorRegistry:
+    """Rejestr z eksportu Optimy (CONTRACTORS_FILE) uzupełniony wbudowaną listą znanych firm"""
+    if contractors_file is None:
+        contractors_file = get_config().contractors_file
+
+    contractors: List[Contractor] = []
+    source_hash = ''
+    if contractors_file:
+        try:
+            contractors, source_hash = load_optima_export(contractors_file)
+            logger.info(f"Wczytano rejestr kontrahentów: {len(contractors)} z {contractors_file}")
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            logger.warning(f"Nie udało się wczytać rejestru kontrahentów {contractors_file}: {e}")
+    # Eksport przed listą wbudowaną - dane i kod z Optimy mają pierwszeństwo dla tego samego NIP
+    contractors.extend(Contractor(**entry) for entry in BUILTIN_CONTRACTORS)
+    return ContractorRegistry(contractors, source_hash)
+
+# Rejestr na proces (eksport wczytywany raz)
+_registry = None
+
+def get_contractor_registry() -> ContractorRegistry:
+    """Zwraca współdzielony rejestr kontrahentów dla bieżącego procesu"""
+    global _registry
+    if _registry is None:
+        _registry = load_contractor_registry()
+    return _registry
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Cache ekstrakcji tekstu i tabel z PDF adresowany zawartością pliku
+
+Klucz wpisu to SHA-256 zawartości PDF połączony z odciskiem ustawień
+ekstrakcji (wersja pdfplumber, parametry Tesseract). Zmiana pliku lub
+ustawień OCR powoduje automatycznie nowy klucz.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Zmienić przy każdej zmianie formatu wpisu lub sposobu ekstrakcji
+CACHE_FORMAT_VERSION = 2
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Zwraca SHA-256 zawartości pliku (czytanego blokami)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extraction_fingerprint() -> str:
+    """Zwraca odcisk ustawień wpływających na wynik ekstrakcji"""
+    try:
+        import pdfplumber
+        pdfplumber_version = getattr(pdfplumber, '__version__', 'unknown')
+    except ImportError:
+        pdfplumber_version = 'missing'
+
+    config = get_config()
+    settings = {
+        'format': CACHE_FORMAT_VERSION,
+        'pdfplumber': pdfplumber_version,
+        'ocr_lang': config.ocr_languages,
+        'ocr_config': config.get_tesseract_config(),
+        'ocr_dpi': config.ocr_dpi,
+        'ocr_min_page_chars': config.ocr_min_page_chars,
+    }
+    payload = json.dumps(settings, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+class ExtractionCache:
+    """Trwały cache wyników extract_text_and_tables z limitem rozmiaru"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: Optional[int] = None,
+                 enabled: Optional[bool] = None, refresh: bool = False):
+        config = get_config()
+        cache_dir = cache_dir or config.cache_dir
+        self.cache_dir = Path(cache_dir)
+        if not self.cache_dir.is_absolute():
+            self.cache_dir = Path(__file__).parent.parent / self.cache_dir
+
+        if max_size_mb is None:
+            max_size_mb = config.cache_max_size_mb
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.enabled = config.cache_enabled if enabled is None else enabled
+        # Tryb odświeżania: nie czytaj starych wpisów, ale zapisuj nowe
+        self.refresh = refresh
+        self.fingerprint = extraction_fingerprint()
+
+        self.hits = 0
+        self.misses = 0
+        # Szacowany rozmiar cache - pełne skanowanie katalogu tylko po przekroczeniu limitu
+        self._size_estimate = None
+
+    def make_key(self, pdf_path: str) -> str:
+        """Buduje klucz wpisu dla pliku PDF"""
+        return f"{compute_file_hash(pdf_path)}_{self.fingerprint}"
+
+    def _entry_path(self, key: str) -> Path:
+        # Podkatalogi po dwóch pierwszych znakach, żeby nie trzymać tysięcy plików w jednym katalogu
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[str, List]]:
+        """Zwraca (text, tables) z cache albo None"""
+        if not self.enabled or self.refresh:
+            self.misses += 1
+            return None
+
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Uszkodzony wpis cache {entry_path.name}: {e}")
+            self.misses += 1
+            return None
+
+        # Aktualizacja czasu dostępu - na jego podstawie działa usuwanie najstarszych wpisów
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return entry.get('text', ''), entry.get('tables', [])
+
+    def put(self, key: str, text: str, tables: List):
+        """Zapisuje wynik ekstrakcji do cache"""
+        if not self.enabled:
+            return
+
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_suffix('.tmp')
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'text': text, 'tables': tables}, f, ensure_ascii=False)
+            # Zapis atomowy - równoległe procesy nie zobaczą niepełnego wpisu
+            os.replace(tmp_path, entry_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Nie udało się zapisać wpisu cache: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return
+
+        if self._size_estimate is None:
+            self._evict()
+        else:
+            try:
+                self._size_estimate += entry_path.stat().st_size
+            except OSError:
+                pass
+            if self._size_estimate > self.max_size_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Usuwa najdawniej używane wpisy, gdy cache przekracza limit rozmiaru"""
+        entries = []
+        total_size = 0
+        for entry_path in self.cache_dir.glob('*/*.json'):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+            total_size += stat.st_size
+
+        if total_size <= self.max_size_bytes:
+            self._size_estimate = total_size
+            return
+
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                entry_path.unlink()
+                total_size -= size
+            except OSError:
+                pass
+        self._size_estimate = total_size
+
+    def get_stats(self) -> Dict[str, int]:
+        """Zwraca liczniki trafień i chybień"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+# Instancja cache na proces
+_cache = None
+
+def get_extraction_cache() -> ExtractionCache:
+    """Zwraca współdzieloną instancję cache dla bieżącego procesu"""
+    global _cache
+    if _cache is None:
+        _cache = ExtractionCache()
+    return _cache
+
+def configure_extraction_cache(enabled: Optional[bool] = None, refresh: bool = False) -> ExtractionCache:
+    """Ustawia tryb cache dla bieżącego procesu (np. z flag --no-cache / --refresh-cache)"""
+    global _cache
+    _cache = ExtractionCache(enabled=enabled, refresh=refresh)
+    return _cache
@@ -5,6 +5,9 @@ import re
 from typing import Dict, Optional, List
 from enum import Enum
 
+import regex_patterns as rx
+from keyword_matcher import KeywordHits, fold_case, get_keyword_matcher, literal_prefix
+
 class InvoiceType(Enum):
     """Typy faktur obsługiwane przez system"""
     ATUT = "ATUT"
@@ -17,6 +20,17 @@ class InvoiceType(Enum):
     PMH = "PMH"
     UNKNOWN = "Unknown"
 
+# Znaki, które re.IGNORECASE utożsamia z literami ASCII wzorców znaczników, a lower() nie zmienia
+_MARKER_CASE_EQUIVALENTS = (('\u0130', 'i'), ('\u0131', 'i'), ('\u017f', 's'))
+
+def _fold_for_markers(text: str) -> str:
+    """Tekst małymi literami dla wzorców rx.INVOICE_MARKERS (pozycje znaków bez zmian)"""
+    folded = fold_case(text)
+    for char, ascii_char in _MARKER_CASE_EQUIVALENTS:
+        if char in folded:
+            folded = folded.replace(char, ascii_char)
+    return folded
+
 class InvoiceDetector:
     """Klasa do rozpoznawania typu faktury"""
     
@@ -64,6 +78,22 @@ class InvoiceDetector:
                 'regex_patterns': [r'P\.M\.H\.', r'PMH']
             }
         }
+        # Reguły typów dla trafień automatu: (słowa kluczowe, NIP, [(stały początek, wyrażenie)]).
+        # Wyrażenie będące stałym tekstem jest zwykłym słowem kluczowym (wyrażenie None),
+        # pozostałe sprawdzane są tylko w miejscach trafień swojego stałego początku
+        self._type_rules = {}
+        matcher_keywords = []
+        for invoice_type, patterns in self.patterns.items():
+            regexes = []
+            for regex in patterns['regex_patterns']:
+                prefix, is_literal = literal_prefix(regex)
+                regexes.append((prefix, None if is_literal else re.compile(regex, re.IGNORECASE)))
+                matcher_keywords.append(prefix)
+            self._type_rules[invoice_type] = (patterns['keywords'], patterns['nip'], regexes)
+            matcher_keywords.extend(patterns['keywords'])
+            matcher_keywords.append(patterns['nip'])
+        # Jeden automat dla wszystkich tabel słów kluczowych dostawców
+        self.matcher = get_keyword_matcher(matcher_keywords)
     
     def detect_type(self, text: str) -> InvoiceType:
         """
@@ -75,24 +105,26 @@ class InvoiceDetector:
         Returns:
             Typ faktury
         """
-        text_upper = text.upper()
-        text_lower = text.lower()
-        
-        # Sprawdzanie każdego typu
-        for invoice_type, patterns in self.patterns.items():
-            # Sprawdzanie słów kluczowych
-            for keyword in patterns['keywords']:
-                if keyword.upper() in text_upper:
-                    return invoice_type
-            
-            # Sprawdzanie NIP jeśli zdefiniowany
-            if patterns['nip'] and patterns['nip'] in text:
+        return self._detect_type_in_range(text, self.matcher.scan(text), 0, len(text))
+    
+    def _regex_found(self, text: str, hits: KeywordHits, prefix: str, regex, start: int, end: int) -> bool:
+        """Czy wyrażenie reguły typu pasuje we fragmencie text[start:end]"""
+        if regex is None:
+            return hits.contains(prefix, start, end)
+        if not prefix:
+            return regex.search(text, start, end) is not None
+        return any(regex.match(text, position, end) for position in hits.starts(prefix, start, end))
+    
+    def _detect_type_in_range(self, text: str, hits: KeywordHits, start: int, end: int) -> InvoiceType:
+        """Wykrywa typ faktury we fragmencie text[start:end] na podstawie trafień automatu"""
+        for invoice_type, (keywords, nip, regexes) in self._type_rules.items():
+            # Słowa kluczowe, NIP (jeśli zdefiniowany), wyrażenia regularne
+            if any(hits.contains(keyword, start, end) for keyword in keywords):
+                return invoice_type
+            if nip and hits.contains(nip, start, end):
+                return invoice_type
+            if any(self._regex_found(text, hits, prefix, regex, start, end) for prefix, regex in regexes):
                 return invoice_type
-            
-            # Sprawdzanie wyrażeń regularnych
-            for regex in patterns['regex_patterns']:
-                if re.search(regex, text, re.IGNORECASE):
-                    return invoice_type
         
         return InvoiceType.UNKNOWN
     
@@ -107,30 +139,28 @@ class InvoiceDetector:
         Returns:
             Poziom pewności (0.0 - 1.0)
         """
-        if invoice_type == InvoiceType.UNKNOWN:
+        if invoice_type not in self._type_rules:
+            return 0.0
+        return self._confidence_in_range(text, self.matcher.scan(text), 0, len(text), invoice_type)
+    
+    def _confidence_in_range(self, text: str, hits: KeywordHits, start: int, end: int,
+                             invoice_type: InvoiceType) -> float:
+        """Poziom pewności typu faktury dla fragmentu text[start:end]"""
+        if invoice_type not in self._type_rules:
             return 0.0
         
-        patterns = self.patterns.get(invoice_type, {})
-        score = 0.0
-        max_score = 0.0
-        
-        # Sprawdzanie słów kluczowych
-        max_score += len(patterns.get('keywords', []))
-        for keyword in patterns.get('keywords', []):
-            if keyword.upper() in text.upper():
-                score += 1.0
+        keywords, nip, regexes = self._type_rules[invoice_type]
+        score = sum(1.0 for keyword in keywords if hits.contains(keyword, start, end))
+        max_score = float(len(keywords))
         
-        # Sprawdzanie NIP
-        if patterns.get('nip'):
-            max_score += 2.0  # NIP ma większą wagę
-            if patterns['nip'] in text:
+        # NIP ma większą wagę
+        if nip:
+            max_score += 2.0
+            if hits.contains(nip, start, end):
                 score += 2.0
         
-        # Sprawdzanie regex
-        max_score += len(patterns.get('regex_patterns', []))
-        for regex in patterns.get('regex_patterns', []):
-            if re.search(regex, text, re.IGNORECASE):
-                score += 1.0
+        max_score += len(regexes)
+        score += sum(1.0 for prefix, regex in regexes if self._regex_found(text, hits, prefix, regex, start, end))
         
         return score / max_score if max_score > 0 else 0.0
     
@@ -138,65 +168,58 @@ class InvoiceDetector:
         """
         Wykrywa wiele faktur w jednym dokumencie
         
+        Każdy wzorzec znacznika przechodzi tekst raz (wyszukiwanie końca fragmentu
+        zaczyna się za początkiem znacznika), a fragment faktury kończy się na
+        następnym dopasowaniu tego samego wzorca. Typ i pewność liczone
+        są tylko dla znaczników pozostałych po deduplikacji, z trafień automatu
+        słów kluczowych (jedno przejście całego tekstu) w zakresie fragmentu.
+        
         Args:
             text: Tekst całego dokumentu
             
         Returns:
             Lista słowników z informacjami o znalezionych fakturach
         """
-        invoices = []
-        
-        # Wzorce do wykrywania granic faktur
-        invoice_markers = [
-            r'FAKTURA\s+(?:VAT\s+)?(?:NR|Nr\.?)\s*[:\s]?\s*([A-Za-z0-9\-/]+)',
-            r'INVOICE\s+(?:NUMBER|NO\.?)\s*[:\s]?\s*([A-Za-z0-9\-/]+)',
-            r'Faktura\s+nr\s*[:\s]?\s*([A-Za-z0-9\-/]+)',
-            r'Strona\s+\d+\s+z\s+\d+',
-            r'Page\s+\d+\s+of\s+\d+'
-        ]
-        
-        # Znajdowanie pozycji faktur
-        for pattern in invoice_markers:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
+        # Wzorce dopasowywane są do tekstu małymi literami, numer faktury
+        # pobierany z oryginalnego tekstu (pozycje znaków są te same)
+        folded = _fold_for_markers(text)
+        # (początek, koniec, numer faktury) dla wszystkich dopasowań znaczników
+        markers = []
+        for pattern in rx.INVOICE_MARKERS:
+            for match in pattern.finditer(folded):
                 start_pos = match.start()
-                invoice_number = match.group(1) if match.lastindex else None
-                
-                # Wyodrębnianie fragmentu tekstu dla tej faktury
-                # (zakładamy, że następna faktura zaczyna się od kolejnego dopasowania)
-                end_pos = len(text)
-                for next_match in re.finditer(pattern, text[start_pos+1:], re.IGNORECASE):
-                    end_pos = start_pos + 1 + next_match.start()
-                    break
-                
-                invoice_text = text[start_pos:end_pos]
-                invoice_type = self.detect_type(invoice_text)
-                
-                invoices.append({
-                    'number': invoice_number,
-                    'type': invoice_type,
-                    'start_pos': start_pos,
-                    'end_pos': end_pos,
-                    'confidence': self.get_confidence_score(invoice_text, invoice_type),
-                    'text_fragment': invoice_text[:500]  # Pierwsze 500 znaków
-                })
+                # Fragment kończy się na następnym dopasowaniu wzorca - także zaczynającym
+                # się wewnątrz bieżącego, którego finditer nie zwraca
+                next_match = pattern.search(folded, start_pos + 1)
+                end_pos = next_match.start() if next_match else len(text)
+                invoice_number = text[match.start(1):match.end(1)] if match.lastindex else None
+                markers.append((start_pos, end_pos, invoice_number))
+        markers.sort(key=lambda marker: marker[0])
         
-        # Deduplikacja i sortowanie
+        # Deduplikacja: numer faktury liczy się raz, znacznik bez numeru
+        # w odległości < 100 znaków od poprzedniej faktury to ta sama faktura
         unique_invoices = []
         seen_numbers = set()
+        hits = None
         
-        for invoice in sorted(invoices, key=lambda x: x['start_pos']):
-            if invoice['number'] and invoice['number'] not in seen_numbers:
-                seen_numbers.add(invoice['number'])
-                unique_invoices.append(invoice)
-            elif not invoice['number']:
-                # Jeśli nie ma numeru, sprawdź czy nie jest to duplikat po pozycji
-                is_duplicate = False
-                for ui in unique_invoices:
-                    if abs(ui['start_pos'] - invoice['start_pos']) < 100:
-                        is_duplicate = True
-                        break
-                if not is_duplicate:
-                    unique_invoices.append(invoice)
+        for start_pos, end_pos, invoice_number in markers:
+            if invoice_number:
+                if invoice_number in seen_numbers:
+                    continue
+                seen_numbers.add(invoice_number)
+            elif unique_invoices and start_pos - unique_invoices[-1]['start_pos'] < 100:
+                continue
+            
+            if hits is None:
+                hits = self.matcher.scan(text)
+            invoice_type = self._detect_type_in_range(text, hits, start_pos, end_pos)
+            unique_invoices.append({
+                'number': invoice_number,
+                'type': invoice_type,
+                'start_pos': start_pos,
+                'end_pos': end_pos,
+                'confidence': self._confidence_in_range(text, hits, start_pos, end_pos, invoice_type),
+                'text_fragment': text[start_pos:min(end_pos, start_pos + 500)]  # Pierwsze 500 znaków
+            })
         
         return unique_invoices
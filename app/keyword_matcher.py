@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Wyszukiwanie wielu słów kluczowych w jednym przejściu tekstu
+
+Automat (Aho–Corasick) budowany jest raz dla tabeli słów kluczowych
+i zwraca wszystkie trafienia (także nakładające się) z pozycjami, bez
+rozróżniania wielkości liter. Rozpoznanie faktury, typu dostawcy i poziom
+pewności liczone są z trafień - tekst nie jest przeglądany osobno dla
+każdego słowa kluczowego ani kopiowany dla każdego fragmentu.
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# pyahocorasick jest opcjonalny - bez niego trafienia wyznacza jedna alternatywa
+# wyrażeń regularnych (z uzupełnieniem trafień nakładających się)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+_REGEX_SPECIAL = '.^$*+?{}[]()|'
+
+# Jedyny znak Unicode, który po lower() zmienia długość ('İ' -> 'i' + kropka łącząca)
+_LENGTH_CHANGING_CHAR = '\u0130'
+
+def fold_case(text: str) -> str:
+    """Małe litery z zachowaniem pozycji znaków (pozycje trafień = pozycje w tekście)"""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # Znak zmieniający długość zostaje bez zmian, reszta tekstu - małymi literami
+    return _LENGTH_CHANGING_CHAR.join(part.lower() for part in text.split(_LENGTH_CHANGING_CHAR))
+
+def literal_prefix(regex: str) -> Tuple[str, bool]:
+    """Zwraca stały początek wyrażenia regularnego i czy całe wyrażenie jest stałym tekstem
+
+    Dopasowanie wyrażenia może zacząć się tylko w miejscu trafienia jego
+    stałego początku, więc wystarczy sprawdzać je w tych miejscach.
+    """
+    if '|' in regex:
+        return '', False
+    prefix = []
+    index = 0
+    while index < len(regex):
+        char = regex[index]
+        if char == '\\':
+            # \. \- itp. to znak dosłowny, \s \d itp. - klasa znaków
+            if index + 1 >= len(regex) or regex[index + 1].isalnum():
+                return ''.join(prefix), False
+            char = regex[index + 1]
+            step = 2
+        elif char in _REGEX_SPECIAL:
+            return ''.join(prefix), False
+        else:
+            step = 1
+        quantifier = regex[index + step:index + step + 1]
+        if quantifier and quantifier in '*?{':
+            return ''.join(prefix), False
+        prefix.append(char)
+        if quantifier == '+':
+            return ''.join(prefix), False
+        index += step
+    return ''.join(prefix), True
+
+class KeywordHits:
+    """Trafienia słów kluczowych w tekście: słowo (małymi literami) -> rosnące pozycje początku"""
+
+    def __init__(self, positions: Dict[str, List[int]]):
+        self._positions = positions
+
+    def contains(self, keyword: str, start: int = 0, end: int = None) -> bool:
+        """Czy słowo kluczowe występuje w całości we fragmencie [start:end]"""
+        keyword = keyword.lower()
+        positions = self._positions.get(keyword)
+        if not positions:
+            return False
+        index = bisect_left(positions, start)
+        return index < len(positions) and (end is None or positions[index] + len(keyword) <= end)
+
+    def starts(self, keyword: str, start: int = 0, end: int = None) -> List[int]:
+        """Pozycje trafień słowa kluczowego mieszczących się w całości we fragmencie [start:end]"""
+        keyword = keyword.lower()
+        positions = self._positions.get(keyword, [])
+        first = bisect_left(positions, start)
+        if end is None:
+            return positions[first:]
+        return positions[first:bisect_left(positions, end - len(keyword) + 1, first)]
+
+class KeywordMatcher:
+    """Automat wyszukujący wszystkie słowa kluczowe z tabeli w jednym przejściu tekstu"""
+
+    def __init__(self, keywords: Iterable[str]):
+        # Od najdłuższych - alternatywa zwraca najdłuższe słowo zaczynające się w danym miejscu
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword}, key=len, reverse=True)
+        # Krótsze słowa będące początkiem dłuższego trafiają w tym samym miejscu
+        self._prefixes = {
+            keyword: [other for other in self.keywords if other != keyword and keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+        self._automaton = None
+        self._pattern = None
+        if not self.keywords:
+            return
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            self._pattern = re.compile('|'.join(re.escape(keyword) for keyword in self.keywords))
+
+    def scan(self, text: str) -> KeywordHits:
+        """Zwraca wszystkie trafienia słów kluczowych w tekście (bez rozróżniania wielkości liter)"""
+        positions = defaultdict(list)
+        folded = fold_case(text)
+        if self._automaton is not None:
+            for end, keyword in self._automaton.iter(folded):
+                positions[keyword].append(end - len(keyword) + 1)
+        elif self._pattern is not None:
+            match_at = self._pattern.match
+            for match in self._pattern.finditer(folded):
+                start, end = match.span()
+                self._add_hit(positions, start, match.group())
+                # finditer pomija słowa zaczynające się wewnątrz trafienia - sprawdzamy te pozycje
+                for position in range(start + 1, end):
+                    inner = match_at(folded, position)
+                    if inner:
+                        self._add_hit(positions, position, inner.group())
+        return KeywordHits(positions)
+
+    def _add_hit(self, positions: Dict[str, List[int]], position: int, keyword: str):
+        positions[keyword].append(position)
+        for prefix in self._prefixes[keyword]:
+            positions[prefix].append(position)
+
+@lru_cache(maxsize=None)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Zwraca automat dla tabeli słów kluczowych - budowany raz na proces"""
+    return _cached_matcher(tuple(sorted({keyword.lower() for keyword in keywords if keyword})))
@@ -7,8 +7,11 @@ import logging
 import argparse
 from pathlib import Path
 from pdf_processor import PDFProcessor
+from extraction_cache import configure_extraction_cache, get_extraction_cache
 from comarch_mapper import ComarchMapper
 from xml_generator import XMLGenerator
+from batch_manifest import BatchManifest
+from batch_progress import format_probe_summary
 
 # Konfiguracja logowania
 logging.basicConfig(
@@ -17,8 +20,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def process_single_file(input_file, output_file, parser_type='universal'):
-    """Przetwarza pojedynczy plik PDF"""
+# Co ile przetworzonych plików zapisywany jest manifest trybu przyrostowego
+MANIFEST_SAVE_INTERVAL = 25
+
+def process_single_file(input_file, output_file, parser_type='universal', stats=None):
+    """Przetwarza pojedynczy plik PDF
+
+    Plik odrzucony przez sondę pierwszej strony (nie jest fakturą) nie daje
+    XML. Słownik stats, jeśli podany, dostaje wynik sondy (probed,
+    probe_rejected, probe_saved_seconds).
+    """
+    stats = {} if stats is None else stats
     try:
         logger.info(f"Przetwarzanie: {Path(input_file).name}")
         
@@ -29,6 +41,14 @@ def process_single_file(input_file, output_file, parser_type='universal'):
         # Przetwarzanie PDF
         processor = PDFProcessor(parser_type=parser_type)
         invoice_data = processor.extract_from_pdf(input_file)
+        document_probe = processor.last_stats.get('probe')
+        if document_probe is not None:
+            stats['probed'] = True
+            if not document_probe.is_invoice:
+                stats['probe_rejected'] = document_probe.kind
+                stats['probe_saved_seconds'] = document_probe.saved_seconds
+                logger.warning(f"⏭️ Pominięto {Path(input_file).name}: nie jest fakturą ({document_probe.kind})")
+                return False
         
         # Mapowanie danych do struktury Comarch
         mapper = ComarchMapper()
@@ -51,8 +71,13 @@ def process_single_file(input_file, output_file, parser_type='universal'):
         logger.error(f"❌ Błąd dla {Path(input_file).name}: {e}")
         return False
 
-def process_batch(input_dir, output_dir, parser_type='universal'):
-    """Przetwarza wszystkie pliki PDF z katalogu"""
+def process_batch(input_dir, output_dir, parser_type='universal', incremental=False):
+    """Przetwarza wszystkie pliki PDF z katalogu
+
+    W trybie przyrostowym (incremental=True) pomijane są pliki, dla których
+    XML jest aktualny według manifestu w katalogu wyjściowym, oraz niezmienione
+    pliki odrzucone wcześniej przez sondę (nie są fakturami).
+    """
     input_path = Path(input_dir)
     output_path = Path(output_dir)
     
@@ -68,28 +93,80 @@ def process_batch(input_dir, output_dir, parser_type='universal'):
     
     logger.info(f"Znaleziono {len(pdf_files)} plików PDF do przetworzenia")
     
+    manifest = None
+    if incremental:
+        manifest = BatchManifest(output_path, parser_type)
+        manifest.load()
+        manifest.prune(pdf_file.name for pdf_file in pdf_files)
+    
     successful = 0
     failed = 0
+    skipped = 0
+    # Pliki bez zmian odrzucone przez sondę w poprzednim uruchomieniu
+    known_rejected = 0
+    # Sonda pierwszej strony: pliki ocenione, odrzucone i szacowany zaoszczędzony czas
+    probed = 0
+    rejected = 0
+    probe_saved_seconds = 0.0
     
-    for pdf_file in pdf_files:
+    for index, pdf_file in enumerate(pdf_files, 1):
         # Generuj nazwę pliku wyjściowego
         output_file = output_path / (pdf_file.stem + ".xml")
         
+        if manifest:
+            reason = manifest.get_change_reason(pdf_file, output_file)
+            if reason is None:
+                if manifest.is_skipped(pdf_file.name):
+                    known_rejected += 1
+                else:
+                    skipped += 1
+                continue
+            logger.info(f"{pdf_file.name}: {reason}")
+        
         # Przetwórz plik
-        if process_single_file(str(pdf_file), str(output_file), parser_type):
+        file_stats = {}
+        if process_single_file(str(pdf_file), str(output_file), parser_type, stats=file_stats):
             successful += 1
+            if manifest:
+                manifest.record(pdf_file, output_file)
+        elif file_stats.get('probe_rejected'):
+            rejected += 1
+            probe_saved_seconds += file_stats['probe_saved_seconds']
+            if manifest:
+                manifest.record(pdf_file, output_file, skipped=True)
         else:
             failed += 1
+            if manifest:
+                manifest.forget(pdf_file.name)
+        if file_stats.get('probed'):
+            probed += 1
+        
+        # Okresowy zapis manifestu - przerwane przetwarzanie nie traci postępu
+        if manifest and index % MANIFEST_SAVE_INTERVAL == 0:
+            manifest.save()
+    
+    if manifest:
+        manifest.save()
     
     # Podsumowanie
     logger.info("=" * 50)
     logger.info(f"PODSUMOWANIE:")
     logger.info(f"✅ Przetworzone pomyślnie: {successful}")
     logger.info(f"❌ Niepowodzenia: {failed}")
+    if manifest:
+        logger.info(f"⏭️ Pominięte (XML aktualny): {skipped}")
+    if rejected or known_rejected:
+        logger.info(f"⏭️ Pominięte (nie są fakturami): {rejected + known_rejected}")
+    if probed:
+        logger.info(format_probe_summary(probed, rejected, probe_saved_seconds))
+    cache = get_extraction_cache()
+    if cache.enabled:
+        cache_stats = cache.get_stats()
+        logger.info(f"🗄️ Cache ekstrakcji: trafienia {cache_stats['hits']}, chybienia {cache_stats['misses']}")
     logger.info(f"📁 Pliki XML zapisane w: {output_dir}")
     logger.info("=" * 50)
     
-    return successful
+    return successful + skipped
 
 def main():
     """Główna funkcja aplikacji"""
@@ -105,11 +182,19 @@ def main():
                        default='universal')
     parser.add_argument('--batch', action='store_true', 
                        help='Przetwarzaj wszystkie pliki z katalogu input')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Nie używaj cache ekstrakcji tekstu i tabel')
+    parser.add_argument('--refresh-cache', action='store_true',
+                       help='Ignoruj istniejące wpisy cache i zapisz je od nowa')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Przetwarzaj tylko nowe i zmienione pliki (manifest w katalogu wyjściowym)')
     
     args = parser.parse_args()
     
     try:
         logger.info("Start przetwarzania PDF-to-XML")
+        configure_extraction_cache(enabled=False if args.no_cache else None,
+                                   refresh=args.refresh_cache)
         
         # Tryb pojedynczego pliku
         if args.input and args.output:
@@ -120,7 +205,8 @@ def main():
         # Tryb wsadowy (domyślny lub z flagą --batch)
         else:
             logger.info("Tryb: przetwarzanie wsadowe")
-            count = process_batch(args.input_dir, args.output_dir, args.parser)
+            count = process_batch(args.input_dir, args.output_dir, args.parser,
+                                  incremental=args.incremental)
             return 0 if count > 0 else 1
             
     except Exception as e:
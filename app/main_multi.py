@@ -8,11 +8,15 @@ import os
 import sys
 import logging
 import argparse
+from collections import Counter
 from pathlib import Path
-from multiprocessing import Pool
 from pdf_processor import PDFProcessor
+from extraction_cache import configure_extraction_cache, compute_file_hash
+from batch_journal import BatchJournal, DONE_STATUSES, STATUS_SKIPPED
 from comarch_mapper import ComarchMapper
-from xml_generator_multi import XMLGeneratorMulti
+from xml_generator_multi import MultiInvoiceXMLWriter
+from worker_pool import WarmWorkerPool
+from batch_progress import BatchProgress, classify_result, format_probe_summary
 
 # Konfiguracja logowania
 logging.basicConfig(
@@ -21,14 +25,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Obiekty procesu roboczego - tworzone raz w _init_worker i używane dla każdego pliku
+_processor = None
+_mapper = None
+
+def _warm_up(parser_type: str):
+    """Tworzy PDFProcessor z gotowym parserem oraz mapper"""
+    global _processor, _mapper
+    _processor = PDFProcessor(parser_type=parser_type)
+    # Parser ładujemy od razu, żeby koszt startu nie obciążał pierwszego pliku
+    _processor.get_parser(parser_type)
+    _mapper = ComarchMapper()
+
+def _init_worker(parser_type: str = 'universal', cache_enabled=None, refresh_cache: bool = False):
+    """Inicjalizuje proces roboczy puli - wywoływane raz na proces"""
+    configure_extraction_cache(enabled=cache_enabled, refresh=refresh_cache)
+    _warm_up(parser_type)
+
 def process_single_pdf(pdf_file: Path, parser_type: str) -> tuple:
     """Przetwarza pojedynczy plik PDF i zwraca dane oraz metryki"""
     try:
         logger.info(f"Przetwarzanie: {pdf_file.name}")
-        processor = PDFProcessor(parser_type=parser_type)
+        if _processor is None or _processor.parser_type != parser_type:
+            _warm_up(parser_type)
+        processor = _processor
         invoice_data = processor.extract_from_pdf(str(pdf_file))
-        mapper = ComarchMapper()
-        comarch_data = mapper.map_invoice_data(invoice_data)
+        stats = {
+            'cache_hit': processor.last_stats.get('cache_hit', False),
+            'ocr_pages': processor.last_stats.get('ocr_pages', 0),
+            'peak_rss_mb': processor.last_stats.get('peak_rss_mb'),
+        }
+        document_probe = processor.last_stats.get('probe')
+        if document_probe is not None:
+            stats['probed'] = True
+            if not document_probe.is_invoice:
+                # Plik odrzucony przez sondę 1. strony nie trafia do XML
+                stats['probe_rejected'] = document_probe.kind
+                stats['probe_saved_seconds'] = document_probe.saved_seconds
+                return None, 0.0, f"Nie jest fakturą ({document_probe.kind})", stats
+        comarch_data = _mapper.map_invoice_data(invoice_data)
         comarch_data.source_file = pdf_file.name
         
         # Metryki dokładności
@@ -42,75 +77,210 @@ def process_single_pdf(pdf_file: Path, parser_type: str) -> tuple:
         if not invoice_data.net_total or not invoice_data.gross_total:
             confidence -= 0.2
         
-        return comarch_data, confidence, None
+        return comarch_data, confidence, None, stats
     except Exception as e:
         logger.error(f"  ❌ Błąd dla {pdf_file.name}: {e}")
-        return None, 0.0, str(e)
+        return None, 0.0, str(e), {}
+
+class _OrderedXmlOutput:
+    """Zapisuje wyniki do zbiorczego XML w kolejności plików
+
+    Wynik pliku trafia do XML, gdy tylko wszystkie wcześniejsze pliki są
+    gotowe. Wyniki zakończone poza kolejnością czekają w dzienniku na dysku,
+    a nie w pamięci.
+    """
 
-def process_all_to_single_xml(input_dir, output_file, parser_type='universal'):
-    """Przetwarza wszystkie pliki PDF i zapisuje do jednego XML"""
+    def __init__(self, writer: MultiInvoiceXMLWriter, journal: BatchJournal, pdf_files):
+        self.writer = writer
+        self.journal = journal
+        self.names = [pdf_file.name for pdf_file in pdf_files]
+        self.completed = set()
+        self.next_index = 0
+        self.successful = 0
+        self.failed = 0
+        self.skipped = 0
+        self.confidence_scores = []
+        self.total_net = self.total_vat = self.total_gross = 0.0
+        self.currency = 'PLN'
+
+    def complete(self, name: str):
+        """Oznacza plik jako gotowy (wynik zapisany w dzienniku) i zapisuje gotową część XML"""
+        self.completed.add(name)
+        while self.next_index < len(self.names) and self.names[self.next_index] in self.completed:
+            self._write(self.names[self.next_index])
+            self.next_index += 1
+
+    def _write(self, name: str):
+        if self.journal.get_status(name) == STATUS_SKIPPED:
+            self.skipped += 1
+            return
+        comarch_data, confidence, _ = self.journal.read_result(name)
+        if comarch_data is None or not self.writer.write(comarch_data):
+            # Błąd przetwarzania albo faktura niezgodna ze schematem - reszta partii jest zapisywana
+            self.failed += 1
+            return
+        if self.successful == 0:
+            self.currency = comarch_data.currency
+        self.successful += 1
+        self.confidence_scores.append(confidence)
+        self.total_net += comarch_data.net_total
+        self.total_vat += comarch_data.vat_total
+        self.total_gross += comarch_data.gross_total
+
+def process_all_to_single_xml(input_dir, output_file, parser_type='universal',
+                              use_cache=True, refresh_cache=False, resume=True):
+    """Przetwarza wszystkie pliki PDF i zapisuje do jednego XML
+
+    Wyniki kolejnych plików trafiają do dziennika obok pliku wyjściowego.
+    Przerwane przetwarzanie po ponownym uruchomieniu pomija pliki już
+    przetworzone (resume=False zaczyna od nowa). Plik XML jest zapisywany
+    atomowo - do pliku tymczasowego, a następnie podmieniany.
+    """
     input_path = Path(input_dir)
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    pdf_files = list(input_path.glob("*.pdf"))
+    pdf_files = sorted(input_path.glob("*.pdf"))
     if not pdf_files:
         logger.warning(f"Brak plików PDF w katalogu: {input_dir}")
         return 0
     
     logger.info(f"Znaleziono {len(pdf_files)} plików PDF do przetworzenia")
     
-    all_invoices = []
-    successful = 0
-    failed = 0
-    confidence_scores = []
+    journal = BatchJournal(output_path, parser_type)
+    if resume:
+        resumed = journal.load()
+    else:
+        journal.reset()
+        resumed = 0
     
-    # Równoległe przetwarzanie
-    with Pool() as pool:
-        results = pool.starmap(process_single_pdf, [(pdf_file, parser_type) for pdf_file in pdf_files])
+    file_hashes = {pdf_file.name: compute_file_hash(pdf_file) for pdf_file in pdf_files}
+    pending = [pdf_file for pdf_file in pdf_files if not journal.is_done(pdf_file.name, file_hashes[pdf_file.name])]
+    if resumed:
+        logger.info(f"♻️ Wznawianie: {len(pdf_files) - len(pending)} plików przetworzonych wcześniej, "
+                    f"{len(pending)} do przetworzenia")
     
-    for comarch_data, confidence, error in results:
-        if comarch_data:
-            all_invoices.append(comarch_data)
-            successful += 1
-            confidence_scores.append(confidence)
-            logger.info(f"  ✅ Sukces: {comarch_data.source_file} (dokładność: {confidence:.2%})")
-        else:
-            failed += 1
-            logger.error(f"  ❌ Błąd: {error}")
+    cache_hits = 0
+    peak_rss_values = []
+    recycled = 0
+    timed_out = []
+    # Sonda pierwszej strony: pliki ocenione, odrzucone według rodzaju, szacowany zaoszczędzony czas
+    probed = 0
+    rejected_kinds = Counter()
+    probe_saved_seconds = 0.0
     
-    if all_invoices:
-        logger.info(f"Generowanie zbiorczego XML z {len(all_invoices)} fakturami...")
-        generator = XMLGeneratorMulti()
-        try:
-            xml_content = generator.generate_multi_invoice_xml(all_invoices)
-            with open(output_path, 'w', encoding='utf-8-sig') as f:
-                f.write(xml_content)
-            
-            logger.info(f"✅ XML zapisany do: {output_path}")
-            
-            total_net = sum(inv.net_total for inv in all_invoices)
-            total_vat = sum(inv.vat_total for inv in all_invoices)
-            total_gross = sum(inv.gross_total for inv in all_invoices)
-            avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+    # Zbiorczy XML budowany strumieniowo w kolejności plików w miarę napływu wyników,
+    # zapis do pliku tymczasowego i atomowa podmiana
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    writer = MultiInvoiceXMLWriter(tmp_path)
+    output = _OrderedXmlOutput(writer, journal, pdf_files)
+    cache_enabled = None if use_cache else False
+    try:
+        with journal, writer:
+            # Pliki przetworzone w poprzednim uruchomieniu trafiają do XML od razu
+            pending_names = {pdf_file.name for pdf_file in pending}
+            for pdf_file in pdf_files:
+                if pdf_file.name not in pending_names:
+                    output.complete(pdf_file.name)
             
-            logger.info("=" * 50)
-            logger.info("PODSUMOWANIE:")
-            logger.info(f"📄 Liczba faktur: {len(all_invoices)}")
-            logger.info(f"✅ Przetworzone pomyślnie: {successful}")
-            logger.info(f"❌ Niepowodzenia: {failed}")
-            logger.info(f"📊 Średnia dokładność: {avg_confidence:.2%}")
-            logger.info(f"💰 Suma netto: {total_net:.2f} {all_invoices[0].currency if all_invoices else 'PLN'}")
-            logger.info(f"💰 Suma VAT: {total_vat:.2f} {all_invoices[0].currency if all_invoices else 'PLN'}")
-            logger.info(f"💰 Suma brutto: {total_gross:.2f} {all_invoices[0].currency if all_invoices else 'PLN'}")
-            logger.info(f"📁 Plik XML: {output_path}")
-            logger.info("=" * 50)
-        except ValueError as e:
-            logger.error(f"Błąd generowania XML: {e}")
+            if pending:
+                # Równoległe przetwarzanie - każdy proces roboczy inicjalizuje parser i mapper raz.
+                # Największe pliki (zwykle skany z OCR) zlecane są najpierw, żeby nie wydłużały
+                # końcówki partii, gdy reszta procesów nie ma już pracy
+                progress = BatchProgress(len(pending))
+                with WarmWorkerPool(os.cpu_count() or 1, initializer=_init_worker,
+                                    initargs=(parser_type, cache_enabled, refresh_cache)) as pool:
+                    for pdf_file in sorted(pending, key=lambda path: path.stat().st_size, reverse=True):
+                        pool.submit(pdf_file, process_single_pdf, pdf_file, parser_type)
+                    while pool.pending:
+                        for pdf_file, completed, result in pool.collect():
+                            # Zadanie przerwane przez pulę (limit czasu, awaria procesu) - result to opis błędu
+                            comarch_data, confidence, error, stats = result if completed else (None, 0.0, result, {})
+                            rejected_kind = stats.get('probe_rejected')
+                            journal.record(pdf_file.name, file_hashes[pdf_file.name], comarch_data, confidence, error,
+                                           skipped=rejected_kind is not None)
+                            output.complete(pdf_file.name)
+                            progress.update(classify_result(stats, comarch_data is not None))
+                            if stats.get('cache_hit'):
+                                cache_hits += 1
+                            if stats.get('probed'):
+                                probed += 1
+                            peak_rss = stats.get('peak_rss_mb')
+                            if peak_rss is not None:
+                                peak_rss_values.append(peak_rss)
+                            if rejected_kind is not None:
+                                rejected_kinds[rejected_kind] += 1
+                                probe_saved_seconds += stats.get('probe_saved_seconds', 0.0)
+                                logger.info(f"  ⏭️ Pominięto ({pdf_file.name}): {error}")
+                            elif comarch_data:
+                                memory_info = f", pamięć: {peak_rss:.0f} MB" if peak_rss is not None else ""
+                                logger.info(f"  ✅ Sukces: {comarch_data.source_file} (dokładność: {confidence:.2%}{memory_info})")
+                            else:
+                                logger.error(f"  ❌ Błąd ({pdf_file.name}): {error}")
+                    timed_out = [pdf_file.name for pdf_file in pool.timed_out]
+                    recycled = pool.recycled
+        
+        successful = output.successful
+        failed = output.failed
+        if successful == 0:
+            if writer.failures:
+                logger.error("Żadna faktura nie przeszła walidacji XSD - plik XML nie został utworzony")
+            else:
+                logger.error("Nie udało się przetworzyć żadnego pliku PDF")
             return 0
+        
+        os.replace(tmp_path, output_path)
+    except KeyboardInterrupt:
+        logger.warning(f"Przerwano - postęp zapisany w {journal.path.name}, uruchom ponownie, aby wznowić")
+        raise
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    
+    # Dziennik zostaje tylko wtedy, gdy są pliki z błędami przetwarzania do ponowienia
+    if all(journal.get_status(pdf_file.name) in DONE_STATUSES for pdf_file in pdf_files):
+        journal.reset()
     else:
-        logger.error("Nie udało się przetworzyć żadnego pliku PDF")
-        return 0
+        logger.info(f"Dziennik {journal.path.name} zachowany - kolejne uruchomienie ponowi pliki z błędami")
+    
+    logger.info(f"✅ XML zapisany do: {output_path}")
+    
+    confidence_scores = output.confidence_scores
+    avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+    
+    logger.info("=" * 50)
+    logger.info("PODSUMOWANIE:")
+    logger.info(f"📄 Liczba faktur: {successful}")
+    logger.info(f"✅ Przetworzone pomyślnie: {successful}")
+    logger.info(f"❌ Niepowodzenia: {failed}")
+    if output.skipped:
+        logger.info(f"⏭️ Pominięte (nie są fakturami): {output.skipped}")
+    if writer.failures:
+        logger.info(f"⚠️ Odrzucone przez walidację XSD: {len(writer.failures)}")
+        for failure in writer.failures:
+            logger.info(f"   - {failure['invoice_number']} ({failure['source_file']})")
+    logger.info(f"📊 Średnia dokładność: {avg_confidence:.2%}")
+    if resumed:
+        logger.info(f"♻️ Wznowiono z dziennika: {len(pdf_files) - len(pending)} plików")
+    if use_cache and pending:
+        logger.info(f"🗄️ Cache ekstrakcji: trafienia {cache_hits}, chybienia {len(pending) - cache_hits}")
+    if probed:
+        logger.info(format_probe_summary(probed, sum(rejected_kinds.values()), probe_saved_seconds))
+        for kind, count in rejected_kinds.most_common():
+            logger.info(f"   - {kind}: {count}")
+    if peak_rss_values:
+        logger.info(f"🧠 Szczyt pamięci procesu roboczego: {max(peak_rss_values):.0f} MB")
+    if recycled:
+        logger.info(f"🔁 Wymienione procesy robocze: {recycled}")
+    if timed_out:
+        logger.info(f"⏱️ Przekroczony limit czasu: {len(timed_out)}")
+        for name in timed_out:
+            logger.info(f"   - {name}")
+    logger.info(f"💰 Suma netto: {output.total_net:.2f} {output.currency}")
+    logger.info(f"💰 Suma VAT: {output.total_vat:.2f} {output.currency}")
+    logger.info(f"💰 Suma brutto: {output.total_gross:.2f} {output.currency}")
+    logger.info(f"📁 Plik XML: {output_path}")
+    logger.info("=" * 50)
     
     return successful
 
@@ -123,10 +293,18 @@ def main():
                        default=r'output/wszystkie_faktury.xml')
     parser.add_argument('--parser', help='Parser do użycia (universal, atut, bolt)',
                        default='universal')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Nie używaj cache ekstrakcji tekstu i tabel')
+    parser.add_argument('--refresh-cache', action='store_true',
+                       help='Ignoruj istniejące wpisy cache i zapisz je od nowa')
+    parser.add_argument('--no-resume', action='store_true',
+                       help='Nie wznawiaj przerwanego przetwarzania - usuń dziennik i zacznij od nowa')
     
     args = parser.parse_args()
     
-    process_all_to_single_xml(args.input_dir, args.output, args.parser)
+    process_all_to_single_xml(args.input_dir, args.output, args.parser,
+                              use_cache=not args.no_cache, refresh_cache=args.refresh_cache,
+                              resume=not args.no_resume)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Pomiar szczytowego zużycia pamięci (RSS) procesu podczas przetwarzania pliku
+"""
+import os
+import threading
+from typing import Optional
+
+# psutil jest opcjonalny - bez niego na Linuksie czytamy /proc/self/statm
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Obiekt psutil.Process dla bieżącego procesu - po fork (procesy robocze)
+# tworzony od nowa, żeby nie mierzyć procesu głównego
+_process = None
+
+def get_rss_mb() -> Optional[float]:
+    """Zwraca bieżące RSS procesu w MB albo None, jeśli pomiar jest niedostępny"""
+    global _process
+    if psutil is not None:
+        if _process is None or _process.pid != os.getpid():
+            _process = psutil.Process()
+        return _process.memory_info().rss / (1024 * 1024)
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class PeakMemoryMonitor:
+    """Menedżer kontekstu próbkujący RSS w tle i zapamiętujący maksimum"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = get_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        if self.peak_mb is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+        return False
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Walidacja NIP bez blokowania na sieci
+
+Kolejność sprawdzania:
+1. suma kontrolna NIP (zawsze, bez I/O)
+2. lokalny snapshot białej listy VAT wczytany z pliku (NIP_WHITELIST_FILE)
+3. opcjonalnie zapytanie do API białej listy MF (NIP_LIVE_CHECK) z limitem
+   czasu (NIP_LIVE_TIMEOUT); wynik zapamiętywany per NIP
+
+Plik snapshotu to CSV/TXT (NIP i opcjonalnie status w kolejnych kolumnach,
+separator ; , lub tabulator, linie z # pomijane) albo JSON {"NIP": "status"}.
+NIP bez statusu traktowany jest jako "Czynny".
+"""
+import json
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional
+
+import regex_patterns as rx
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+NIP_WEIGHTS = (6, 5, 7, 2, 3, 4, 5, 6, 7)
+ACTIVE_STATUS = 'Czynny'
+# Statusy podatnika zarejestrowanego (zwolniony z VAT też ma poprawny NIP)
+REGISTERED_STATUSES = (ACTIVE_STATUS, 'Zwolniony')
+WHITELIST_API_URL = 'https://wl-api.mf.gov.pl/api/search/nip/{nip}'
+
+def nip_checksum_valid(nip: Optional[str]) -> bool:
+    """Sprawdza format i sumę kontrolną NIP (10 cyfr)"""
+    if not nip or len(nip) != 10 or not nip.isdigit():
+        return False
+    checksum = sum(int(digit) * weight for digit, weight in zip(nip, NIP_WEIGHTS)) % 11
+    return checksum == int(nip[9])
+
+def load_whitelist_snapshot(path: str) -> Dict[str, str]:
+    """Wczytuje snapshot białej listy do słownika NIP -> status"""
+    snapshot_path = Path(path)
+    if not snapshot_path.is_absolute():
+        snapshot_path = Path(__file__).parent.parent / snapshot_path
+
+    if snapshot_path.suffix.lower() == '.json':
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {rx.NON_DIGITS.sub('', str(nip)): str(status) for nip, status in data.items()}
+
+    snapshot = {}
+    with open(snapshot_path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = [field.strip() for field in rx.SNAPSHOT_FIELD_SEPARATOR.split(line)]
+            nip = rx.NON_DIGITS.sub('', fields[0])
+            if len(nip) != 10:
+                continue  # nagłówek lub uszkodzona linia
+            snapshot[nip] = fields[1] if len(fields) > 1 and fields[1] else ACTIVE_STATUS
+    return snapshot
+
+class NipValidator:
+    """Walidator NIP: suma kontrolna, lokalny snapshot, opcjonalne API z timeoutem"""
+
+    def __init__(self, whitelist_file: Optional[str] = None, live_check: Optional[bool] = None,
+                 live_timeout: Optional[float] = None):
+        config = get_config()
+        self.whitelist_file = config.nip_whitelist_file if whitelist_file is None else whitelist_file
+        self.live_check = config.nip_live_check if live_check is None else live_check
+        self.live_timeout = config.nip_live_timeout if live_timeout is None else live_timeout
+
+        self.snapshot = {}
+        if self.whitelist_file:
+            try:
+                self.snapshot = load_whitelist_snapshot(self.whitelist_file)
+                logger.info(f"Wczytano snapshot białej listy: {len(self.snapshot)} NIP")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Nie udało się wczytać snapshotu białej listy {self.whitelist_file}: {e}")
+
+        # Wyniki zapytań do API per NIP (również None = brak odpowiedzi)
+        self._live_results: Dict[str, Optional[str]] = {}
+
+    def get_status(self, nip: str) -> Optional[str]:
+        """Zwraca status VAT z białej listy (snapshot, potem API) albo None, gdy nieznany"""
+        status = self.snapshot.get(nip)
+        if status is None and self.live_check:
+            if nip not in self._live_results:
+                self._live_results[nip] = self._query_live(nip)
+            status = self._live_results[nip]
+        return status
+
+    def _query_live(self, nip: str) -> Optional[str]:
+        """Pyta API białej listy MF; przy błędzie sieci wyłącza dalsze zapytania"""
+        try:
+            import requests
+        except ImportError:
+            logger.warning("Brak modułu requests - wyłączam sprawdzanie NIP online")
+            self.live_check = False
+            return None
+
+        try:
+            response = requests.get(
+                WHITELIST_API_URL.format(nip=nip),
+                params={'date': date.today().isoformat()},
+                timeout=self.live_timeout,
+            )
+            if response.status_code != 200:
+                logger.debug(f"API białej listy zwróciło {response.status_code} dla NIP {nip}")
+                return None
+            subject = response.json().get('result', {}).get('subject') or {}
+            return subject.get('statusVat')
+        except requests.RequestException as e:
+            # Brak sieci - nie czekamy na timeout przy każdym kolejnym NIP
+            logger.warning(f"API białej listy niedostępne ({e}) - dalsza walidacja NIP offline")
+            self.live_check = False
+            return None
+        except ValueError as e:
+            logger.debug(f"Niepoprawna odpowiedź API białej listy dla NIP {nip}: {e}")
+            return None
+
+    def validate(self, nip: Optional[str]) -> bool:
+        """NIP jest poprawny, gdy ma poprawną sumę kontrolną i - jeśli jego status
+        jest znany (snapshot lub API) - podatnik jest czynny lub zwolniony
+        """
+        if not nip_checksum_valid(nip):
+            return False
+        status = self.get_status(nip)
+        return status is None or status in REGISTERED_STATUSES
+
+# Instancja walidatora na proces (snapshot wczytywany raz)
+_validator = None
+
+def get_nip_validator() -> NipValidator:
+    """Zwraca współdzieloną instancję walidatora dla bieżącego procesu"""
+    global _validator
+    if _validator is None:
+        _validator = NipValidator()
+    return _validator
@@ -3,12 +3,12 @@ Parser dla faktur ATUT Sp. z o.o.
 """
 from typing import Dict, List, Optional
 from decimal import Decimal
-import re
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from base_parser import BaseInvoiceParser, InvoiceItem
+import regex_patterns as rx
 
 class ATUTParser(BaseInvoiceParser):
     """Parser specyficzny dla faktur ATUT"""
@@ -79,24 +79,18 @@ class ATUTParser(BaseInvoiceParser):
     def _extract_seller_data(self, text: str):
         """Ekstrahuje dane sprzedawcy ATUT"""
         # Szukamy bloku ze sprzedawcą
-        seller_patterns = [
-            r'Sprzedawca[:\s]*(.*?)(?:Nabywca|Odbiorca|$)',
-            r'SPRZEDAWCA[:\s]*(.*?)(?:NABYWCA|ODBIORCA|$)',
-            r'Wystawca[:\s]*(.*?)(?:Nabywca|Odbiorca|$)'
-        ]
-        
-        for pattern in seller_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        for pattern in rx.ATUT_SELLER_SECTION:
+            match = pattern.search(text)
             if match:
                 seller_text = match.group(1)
                 
                 # Szukamy adresu ATUT
-                address_match = re.search(r'ul\.?\s+([^,\n]+)', seller_text, re.IGNORECASE)
+                address_match = rx.STREET_SHORT.search(seller_text)
                 if address_match:
                     self.invoice_data['seller']['address'] = address_match.group(1).strip()
                 
                 # Kod pocztowy i miasto
-                postal_match = re.search(r'(\d{2}[-\s]\d{3})\s+([A-Za-zĄĆĘŁŃÓŚŹŻąćęłńóśźż\s]+)', seller_text)
+                postal_match = rx.POSTAL_CITY.search(seller_text)
                 if postal_match:
                     self.invoice_data['seller']['postal_code'] = postal_match.group(1).replace(' ', '-')
                     self.invoice_data['seller']['city'] = postal_match.group(2).strip()
@@ -106,14 +100,8 @@ class ATUTParser(BaseInvoiceParser):
     def _extract_buyer_data(self, text: str):
         """Ekstrahuje dane nabywcy"""
         # Szukamy bloku z nabywcą
-        buyer_patterns = [
-            r'Nabywca[:\s]*(.*?)(?:Pozycje|Lp\.|Nr\.|$)',
-            r'NABYWCA[:\s]*(.*?)(?:POZYCJE|LP\.|NR\.|$)',
-            r'Odbiorca[:\s]*(.*?)(?:Pozycje|Lp\.|Nr\.|$)'
-        ]
-        
-        for pattern in buyer_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        for pattern in rx.ATUT_BUYER_SECTION:
+            match = pattern.search(text)
             if match:
                 buyer_text = match.group(1)
                 lines = buyer_text.strip().split('\n')
@@ -128,12 +116,12 @@ class ATUTParser(BaseInvoiceParser):
                     self.invoice_data['buyer']['nip'] = nip
                 
                 # Adres
-                address_match = re.search(r'ul\.?\s+([^,\n]+)', buyer_text, re.IGNORECASE)
+                address_match = rx.STREET_SHORT.search(buyer_text)
                 if address_match:
                     self.invoice_data['buyer']['address'] = address_match.group(1).strip()
                 
                 # Kod pocztowy i miasto
-                postal_match = re.search(r'(\d{2}[-\s]\d{3})\s+([A-Za-zĄĆĘŁŃÓŚŹŻąćęłńóśźż\s]+)', buyer_text)
+                postal_match = rx.POSTAL_CITY.search(buyer_text)
                 if postal_match:
                     self.invoice_data['buyer']['postal_code'] = postal_match.group(1).replace(' ', '-')
                     self.invoice_data['buyer']['city'] = postal_match.group(2).strip()
@@ -233,9 +221,7 @@ class ATUTParser(BaseInvoiceParser):
     def _extract_items_from_text(self, text: str):
         """Ekstrahuje pozycje bezpośrednio z tekstu (fallback)"""
         # Wzorzec dla pozycji ATUT
-        item_pattern = r'(\d+)\s+(.*?)\s+(\d+[,.]?\d*)\s+(\w+)\s+(\d+[,.]?\d*)\s+(\d+[,.]?\d*)\s+(\d+)%?\s+(\d+[,.]?\d*)\s+(\d+[,.]?\d*)'
-        
-        matches = re.finditer(item_pattern, text)
+        matches = rx.ATUT_TEXT_ITEM.finditer(text)
         for match in matches:
             item = InvoiceItem()
             item.lp = int(match.group(1))
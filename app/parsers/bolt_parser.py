@@ -3,12 +3,12 @@ Parser dla faktur Bolt
 """
 from typing import Dict, List, Optional
 from decimal import Decimal
-import re
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from base_parser import BaseInvoiceParser, InvoiceItem
+import regex_patterns as rx
 
 class BoltParser(BaseInvoiceParser):
     """Parser specyficzny dla faktur Bolt"""
@@ -76,27 +76,15 @@ class BoltParser(BaseInvoiceParser):
     def _extract_basic_info(self, text: str):
         """Ekstrahuje podstawowe informacje faktury Bolt"""
         # Numer faktury - często w formacie RIDE-xxxx
-        patterns = [
-            r'(?:Invoice|Faktura)\s*(?:number|nr|Nr)?\s*[:\s]*([A-Z0-9\-]+)',
-            r'RIDE[-\s]([A-Z0-9]+)',
-            r'Trip\s*ID[:\s]*([A-Z0-9\-]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in rx.BOLT_INVOICE_NUMBER:
+            match = pattern.search(text)
             if match:
                 self.invoice_data['invoice_number'] = match.group(1)
                 break
         
         # Data - Bolt używa różnych formatów
-        date_patterns = [
-            r'Date[:\s]*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
-            r'(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
-            r'(\d{1,2}\s+\w+\s+\d{4})'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
+        for pattern in rx.BOLT_DATE:
+            match = pattern.search(text)
             if match:
                 self.invoice_data['invoice_date'] = self.normalize_date(match.group(1))
                 self.invoice_data['sale_date'] = self.invoice_data['invoice_date']
@@ -111,14 +99,14 @@ class BoltParser(BaseInvoiceParser):
                 break
         
         # VAT ID dla Bolt (często estoński)
-        vat_match = re.search(r'VAT\s*(?:ID|number)[:\s]*([A-Z]{2}\d+)', text, re.IGNORECASE)
+        vat_match = rx.BOLT_VAT_ID.search(text)
         if vat_match:
             self.invoice_data['seller']['nip'] = vat_match.group(1)
         
         # Adres Bolt (często Estonia)
         if 'Estonia' in text or 'Tallinn' in text:
             self.invoice_data['seller']['country'] = 'Estonia'
-            city_match = re.search(r'Tallinn[,\s]+(\d{5})', text)
+            city_match = rx.BOLT_TALLINN_POSTAL.search(text)
             if city_match:
                 self.invoice_data['seller']['city'] = 'Tallinn'
                 self.invoice_data['seller']['postal_code'] = city_match.group(1)
@@ -128,11 +116,7 @@ class BoltParser(BaseInvoiceParser):
     
     def _extract_buyer_from_text(self, text: str):
         """Ekstrahuje dane nabywcy"""
-        buyer_section = re.search(
-            r'(?:Customer|Client|Nabywca|Bill to)[:\s]*(.*?)(?:Items|Services|Trip|$)',
-            text, 
-            re.IGNORECASE | re.DOTALL
-        )
+        buyer_section = rx.BOLT_BUYER_SECTION.search(text)
         
         if buyer_section:
             buyer_text = buyer_section.group(1)
@@ -153,13 +137,8 @@ class BoltParser(BaseInvoiceParser):
         item = InvoiceItem()
         
         # Opis usługi
-        service_patterns = [
-            r'(?:Ride|Trip|Przejazd)\s+(?:from|z)\s+(.*?)(?:to|do)\s+(.*?)(?:\n|$)',
-            r'(?:Service|Usługa)[:\s]*(.*?)(?:\n|$)'
-        ]
-        
-        for pattern in service_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in rx.BOLT_SERVICE:
+            match = pattern.search(text)
             if match:
                 if match.lastindex == 2:
                     item.name = f"Przejazd: {match.group(1)} - {match.group(2)}"
@@ -174,15 +153,9 @@ class BoltParser(BaseInvoiceParser):
         item.unit = 'usł.'
         
         # Kwoty
-        amount_patterns = [
-            (r'(?:Total|Razem|Amount)[:\s]*([\d.,]+)', 'gross'),
-            (r'(?:Net|Netto)[:\s]*([\d.,]+)', 'net'),
-            (r'(?:VAT|Tax)[:\s]*([\d.,]+)', 'vat')
-        ]
-        
         amounts = {}
-        for pattern, amount_type in amount_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern, amount_type in rx.BOLT_AMOUNTS:
+            match = pattern.search(text)
             if match:
                 amounts[amount_type] = self.parse_amount(match.group(1))
         
@@ -13,49 +13,11 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from base_parser import BaseInvoiceParser, InvoiceItem
+from contractor_registry import get_contractor_registry
 
 class UniversalParser(BaseInvoiceParser):
     """Parser uniwersalny dla różnych typów faktur - wersja 5"""
     
-    def __init__(self):
-        super().__init__()
-        # Znane firmy bez NIP lub ze specyficznymi danymi
-        self.known_companies = {
-            'zagamix': {
-                'name': '"ZAGAMIX II" L.J. CHRZĄSTEK SP. JAWNA',
-                'nip': '7341399090',  # Dodajemy znany NIP
-                'address': 'ul. Wczasowa 18',
-                'city': 'Kraków',
-                'postal_code': '30-694'
-            },
-            'hotel stara poczta': {
-                'name': 'Hotel Stara Poczta',
-                'nip': '7341399090',
-                'address': 'ul. Wczasowa 18',
-                'city': 'Kraków',
-                'postal_code': '30-694'
-            },
-            'nazwa.pl': {
-                'name': 'nazwa.pl sp. z o.o.',
-                'nip': '7342867148',
-                'address': 'ul. Medyczna 9',
-                'city': 'Katowice',
-                'postal_code': '40-764'
-            },
-            'grzegorz jakubowski': {
-                'name': 'Grzegorz Jakubowski',
-                'nip': '6751365082'
-            },
-            'multi': {
-                'name': 'MULTI Wyroby Gumowe S.C.',
-                'nip': '8842755507'
-            },
-            'krzysztof nowak': {
-                'name': 'Krzysztof Nowak Design',
-                'nip': ''
-            }
-        }
-    
     def parse(self, text: str, tables: List[List[List[str]]] = None) -> Dict:
         """Parsuje fakturę używając uniwersalnych wzorców"""
         
@@ -202,14 +164,12 @@ class UniversalParser(BaseInvoiceParser):
         text_lower = text.lower()
         seller_found = False
         
-        for key, company_data in self.known_companies.items():
-            if key in text_lower:
-                # Znaleziono znaną firmę - sprawdź czy to sprzedawca czy nabywca
-                if '2vision' in text_lower:
-                    # Jeśli jest 2Vision, to znana firma jest sprzedawcą
-                    self.invoice_data['seller'].update(company_data)
-                    seller_found = True
-                    break
+        # Jeśli jest 2Vision (nabywca), to znany kontrahent z rejestru jest sprzedawcą
+        if '2vision' in text_lower:
+            contractor = get_contractor_registry().find_in_text(text, exclude_nips=['6751781780'])
+            if contractor is not None:
+                self.invoice_data['seller'].update(contractor.to_party())
+                seller_found = True
         
         # Standardowa ekstrakcja
         seller_keywords = ['Sprzedawca', 'SPRZEDAWCA', 'Wystawca', 'WYSTAWCA', 'Dostawca', 
@@ -857,14 +817,12 @@ class UniversalParser(BaseInvoiceParser):
         text_lower = text.lower()
         seller_found = False
         
-        for key, company_data in self.known_companies.items():
-            if key in text_lower:
-                # Znaleziono znaną firmę - sprawdź czy to sprzedawca czy nabywca
-                if '2vision' in text_lower:
-                    # Jeśli jest 2Vision, to znana firma jest sprzedawcą
-                    self.invoice_data['seller'].update(company_data)
-                    seller_found = True
-                    break
+        # Jeśli jest 2Vision (nabywca), to znany kontrahent z rejestru jest sprzedawcą
+        if '2vision' in text_lower:
+            contractor = get_contractor_registry().find_in_text(text, exclude_nips=['6751781780'])
+            if contractor is not None:
+                self.invoice_data['seller'].update(contractor.to_party())
+                seller_found = True
         
         # Standardowa ekstrakcja
         seller_keywords = ['Sprzedawca', 'SPRZEDAWCA', 'Wystawca', 'WYSTAWCA', 'Dostawca', 
@@ -1512,14 +1470,12 @@ class UniversalParser(BaseInvoiceParser):
         text_lower = text.lower()
         seller_found = False
         
-        for key, company_data in self.known_companies.items():
-            if key in text_lower:
-                # Znaleziono znaną firmę - sprawdź czy to sprzedawca czy nabywca
-                if '2vision' in text_lower:
-                    # Jeśli jest 2Vision, to znana firma jest sprzedawcą
-                    self.invoice_data['seller'].update(company_data)
-                    seller_found = True
-                    break
+        # Jeśli jest 2Vision (nabywca), to znany kontrahent z rejestru jest sprzedawcą
+        if '2vision' in text_lower:
+            contractor = get_contractor_registry().find_in_text(text, exclude_nips=['6751781780'])
+            if contractor is not None:
+                self.invoice_data['seller'].update(contractor.to_party())
+                seller_found = True
         
         # Standardowa ekstrakcja
         seller_keywords = ['Sprzedawca', 'SPRZEDAWCA', 'Wystawca', 'WYSTAWCA', 'Dostawca', 
@@ -2167,14 +2123,12 @@ class UniversalParser(BaseInvoiceParser):
         text_lower = text.lower()
         seller_found = False
         
-        for key, company_data in self.known_companies.items():
-            if key in text_lower:
-                # Znaleziono znaną firmę - sprawdź czy to sprzedawca czy nabywca
-                if '2vision' in text_lower:
-                    # Jeśli jest 2Vision, to znana firma jest sprzedawcą
-                    self.invoice_data['seller'].update(company_data)
-                    seller_found = True
-                    break
+        # Jeśli jest 2Vision (nabywca), to znany kontrahent z rejestru jest sprzedawcą
+        if '2vision' in text_lower:
+            contractor = get_contractor_registry().find_in_text(text, exclude_nips=['6751781780'])
+            if contractor is not None:
+                self.invoice_data['seller'].update(contractor.to_party())
+                seller_found = True
         
         # Standardowa ekstrakcja
         seller_keywords = ['Sprzedawca', 'SPRZEDAWCA', 'Wystawca', 'WYSTAWCA', 'Dostawca', 
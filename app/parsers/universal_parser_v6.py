@@ -12,65 +12,50 @@ Poprawki:
 """
 from typing import Dict, List, Optional, Tuple
 from decimal import Decimal, InvalidOperation
-import re
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from base_parser import BaseInvoiceParser, InvoiceItem
+from config import get_config
+from contractor_registry import get_contractor_registry
+import regex_patterns as rx
+
+# Model spaCy współdzielony w obrębie procesu - ładowany przy pierwszym użyciu
+_nlp = None
+_nlp_loaded = False
+
+def get_nlp():
+    """Zwraca model spaCy (ładowany leniwie, raz na proces) albo None
+
+    None oznacza, że NLP jest wyłączone w konfiguracji (NLP_ENABLED=False)
+    albo spaCy / model nie są zainstalowane.
+    """
+    global _nlp, _nlp_loaded
+    if not _nlp_loaded:
+        _nlp_loaded = True
+        config = get_config()
+        if config.nlp_enabled:
+            try:
+                import spacy
+                _nlp = spacy.load(config.spacy_model)
+            except:
+                _nlp = None
+    return _nlp
 
 class UniversalParser(BaseInvoiceParser):
     """Parser uniwersalny dla różnych typów faktur - wersja 6 FIXED"""
     
-    def __init__(self):
-        super().__init__()
-        self.known_companies = {
-            'zagamix': {
-                'name': '"ZAGAMIX II" L.J. CHRZĄSTEK SP. JAWNA',
-                'nip': '7341399090',
-                'address': 'ul. Wczasowa 18',
-                'city': 'Kraków',
-                'postal_code': '30-694'
-            },
-            'hotel stara poczta': {
-                'name': 'Hotel Stara Poczta',
-                'nip': '7341399090',
-                'address': 'ul. Wczasowa 18',
-                'city': 'Kraków',
-                'postal_code': '30-694'
-            },
-            'nazwa.pl': {
-                'name': 'nazwa.pl sp. z o.o.',
-                'nip': '7342867148',
-                'address': 'ul. Medyczna 9',
-                'city': 'Katowice',
-                'postal_code': '40-764'
-            },
-            'grzegorz jakubowski': {
-                'name': 'Grzegorz Jakubowski',
-                'nip': '6751365082'
-            },
-            'multi': {
-                'name': 'MULTI Wyroby Gumowe S.C.',
-                'nip': '8842755507'
-            },
-            'krzysztof nowak': {
-                'name': 'Krzysztof Nowak Design',
-                'nip': ''
-            }
-        }
-        # Inicjalizacja spaCy - opcjonalna
-        try:
-            import spacy
-            self.nlp = spacy.load("pl_core_news_sm")
-        except:
-            self.nlp = None
+    @property
+    def nlp(self):
+        """Model spaCy - ładowany dopiero przy pierwszym użyciu"""
+        return get_nlp()
 
     def _clean_nip(self, nip: str) -> str:
         """Czyści NIP z niepotrzebnych znaków"""
         # Usuń wszystkie znaki niebędące cyframi
-        cleaned = re.sub(r'[^\d]', '', nip)
+        cleaned = rx.NON_DIGITS.sub('', nip)
         # Zwróć tylko 10 cyfr
         return cleaned[-10:] if len(cleaned) >= 10 else cleaned
 
@@ -145,27 +130,16 @@ class UniversalParser(BaseInvoiceParser):
     
     def _extract_invoice_number_v6(self, text: str) -> Optional[str]:
         """Ulepszona ekstrakcja numeru faktury"""
-        patterns = [
-            r'(\d{5}/naz/\d{2}/\d{4})',
-            r'Faktura\s*(?:VAT\s*)?nr\s*[:.]?\s*([^\s\n]+)',
-            r'Invoice\s*(?:No\.?)?\s*([A-Z0-9\-/\.]+)',
-            r'Korekta\s*nr\s*[:.]?\s*([A-Z0-9\-/\.]+)'
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in rx.V6_INVOICE_NUMBER:
+            match = pattern.search(text)
             if match:
                 return match.group(1)
         return None
     
     def _extract_currency(self, text: str) -> Optional[str]:
         """Ekstrakcja waluty"""
-        patterns = [
-            r'Waluta\s*[:.]?\s*(\w{3})',
-            r'Currency\s*[:.]?\s*(\w{3})',
-            r'\b(PLN|EUR|USD|GBP)\b'
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in rx.V6_CURRENCY:
+            match = pattern.search(text)
             if match:
                 return match.group(1).upper()
         return None
@@ -181,13 +155,8 @@ class UniversalParser(BaseInvoiceParser):
     
     def _extract_payment_method(self, text: str):
         """Ekstrakcja metody płatności"""
-        patterns = [
-            r'Sposób\s*(?:płatności|zapłaty)\s*[:.]?\s*([^\n]+)',
-            r'Forma\s*płatności\s*[:.]?\s*([^\n]+)',
-            r'Payment\s*method\s*[:.]?\s*([^\n]+)'
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in rx.V6_PAYMENT_METHOD:
+            match = pattern.search(text)
             if match:
                 self.invoice_data['payment_method'] = match.group(1).strip()
                 break
@@ -208,7 +177,7 @@ class UniversalParser(BaseInvoiceParser):
                 buyer_text = '\n'.join(lines[i:i+5])
         
         # Użycie spaCy do ekstrakcji nazw i adresów (jeśli dostępny)
-        if self.nlp and seller_text:
+        if seller_text and self.nlp:
             doc = self.nlp(seller_text)
             for ent in doc.ents:
                 if ent.label_ == 'ORG':
@@ -218,7 +187,7 @@ class UniversalParser(BaseInvoiceParser):
                 elif ent.label_ == 'LOC':
                     self.invoice_data['seller']['address'] = ent.text
         
-        if self.nlp and buyer_text:
+        if buyer_text and self.nlp:
             doc = self.nlp(buyer_text)
             for ent in doc.ents:
                 if ent.label_ == 'ORG':
@@ -228,14 +197,14 @@ class UniversalParser(BaseInvoiceParser):
                 elif ent.label_ == 'LOC':
                     self.invoice_data['buyer']['address'] = ent.text
         
-        # Fallback regex
+        # Fallback - znany kontrahent z rejestru (NIP lub nazwa w tekście, bez NIP-ów nabywcy)
         if not self.invoice_data['seller']['name']:
-            for company_key, data in self.known_companies.items():
-                if company_key in text.lower():
-                    self.invoice_data['seller'].update(data)
-                    break
+            buyer_nips = [self._clean_nip(nip) for nip in rx.V6_NIP.findall(buyer_text)]
+            contractor = get_contractor_registry().find_in_text(text, exclude_nips=buyer_nips)
+            if contractor is not None:
+                self.invoice_data['seller'].update(contractor.to_party())
         
-        nip_match = re.search(r'NIP\s*[:.]?\s*([PL]?\s*[\d\s\-]+)', seller_text, re.IGNORECASE)
+        nip_match = rx.V6_NIP.search(seller_text)
         if nip_match:
             self.invoice_data['seller']['nip'] = self._clean_nip(nip_match.group(1))
         
@@ -246,7 +215,7 @@ class UniversalParser(BaseInvoiceParser):
             self.invoice_data['buyer']['city'] = "Kraków"
             self.invoice_data['buyer']['postal_code'] = "31-572"
         else:
-            nip_match = re.search(r'NIP\s*[:.]?\s*([PL]?\s*[\d\s\-]+)', buyer_text, re.IGNORECASE)
+            nip_match = rx.V6_NIP.search(buyer_text)
             if nip_match:
                 self.invoice_data['buyer']['nip'] = self._clean_nip(nip_match.group(1))
 
@@ -266,11 +235,11 @@ class UniversalParser(BaseInvoiceParser):
                     item.lp = len(items) + 1
                     for i, cell in enumerate(row):
                         cell_str = str(cell).strip()
-                        if len(cell_str) > 10 and not re.match(r'^[\d\s,.-]+$', cell_str):
+                        if len(cell_str) > 10 and not rx.CELL_NUMERIC_ONLY.match(cell_str):
                             item.name = cell_str
-                        elif re.match(r'^\d+([.,]\d+)?\s*(szt|kg|l|m|h)?\.?$', cell_str, re.IGNORECASE):
+                        elif rx.CELL_QUANTITY.match(cell_str):
                             item.quantity = self._parse_amount_safe(cell_str)
-                        elif re.match(r'^[\d\s]+[,.]?\d*$', cell_str):
+                        elif rx.CELL_AMOUNT.match(cell_str):
                             amount = self._parse_amount_safe(cell_str)
                             if amount > 0:
                                 if not item.unit_price_net:
@@ -279,14 +248,16 @@ class UniversalParser(BaseInvoiceParser):
                                     item.net_amount = amount
                                 elif not item.gross_amount:
                                     item.gross_amount = amount
-                        elif re.match(r'^\d+%$', cell_str):
+                        elif rx.CELL_PERCENT.match(cell_str):
                             item.vat_rate = int(cell_str.replace('%', ''))
                     
                     if item.name:
                         item.quantity = item.quantity or 1
                         item.unit_price_net = item.unit_price_net or 0
                         item.net_amount = item.net_amount or (item.unit_price_net * item.quantity)
-                        
+                        # Kwoty z komórek są typu float - VAT liczymy na Decimal
+                        item.net_amount = Decimal(str(item.net_amount))
+
                         # Zapewnij że vat_rate jest liczbą
                         if item.vat_rate is None:
                             item.vat_rate = 23
@@ -306,17 +277,8 @@ class UniversalParser(BaseInvoiceParser):
     def _extract_summary_v6(self, text: str, tables: List[List[List[str]]]):
         """Ulepszona ekstrakcja podsumowania"""
         amounts = []
-        for pattern in [
-            r'do\s+zapłaty[:\s]*([\d\s,.-]+)',
-            r'razem\s+do\s+zapłaty[:\s]*([\d\s,.-]+)',
-            r'kwota\s+brutto[:\s]*([\d\s,.-]+)',
-            r'wartość\s+brutto[:\s]*([\d\s,.-]+)',
-            r'suma\s+brutto[:\s]*([\d\s,.-]+)',
-            r'razem\s+netto[:\s]*([\d\s,.-]+)',
-            r'kwota\s+netto[:\s]*([\d\s,.-]+)',
-            r'podatek\s+vat[:\s]*([\d\s,.-]+)',
-        ]:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in rx.V6_SUMMARY_AMOUNTS:
+            matches = pattern.findall(text)
             for match in matches:
                 amount = self._parse_amount_safe(match)
                 if 0 < amount < 1000000:
@@ -344,9 +306,9 @@ class UniversalParser(BaseInvoiceParser):
     def _parse_amount_safe(self, amount: str) -> float:
         """Bezpieczne parsowanie kwot"""
         try:
-            amount = re.sub(r'\s+', '', amount)
+            amount = rx.WHITESPACE_RUN.sub('', amount)
             amount = amount.replace(',', '.')
-            return float(re.sub(r'[^\d.]', '', amount))
+            return float(rx.NON_DIGITS_OR_DOT.sub('', amount))
         except:
             return 0.0
 
@@ -381,12 +343,9 @@ class UniversalParser(BaseInvoiceParser):
 
     def _extract_items_from_text(self, text: str):
         """Ekstrahuje pozycje bezpośrednio z tekstu"""
-        patterns = [
-            r'(\d+)\s+([^\d\n].*?)\s+(\d+[,\.]?\d*)\s*(szt|kg|l|m|h)?\.?\s+([\d\s]+[,.]\d{2})\s+(\d+%)\s+([\d\s]+[,.]\d{2})'
-        ]
         items = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in rx.V6_TEXT_ITEMS:
+            matches = pattern.findall(text)
             for i, match in enumerate(matches, 1):
                 item = {
                     'lp': i,
@@ -407,13 +366,8 @@ class UniversalParser(BaseInvoiceParser):
         if not filename:
             return ''
         name = os.path.splitext(filename)[0]
-        patterns = [
-            r'(F[VSAKZ][S]?[\-_]*\d+[\-_]\d+[\-_]\d+)',
-            r'(\d+[\-_]\d+[\-_]\d{4})',
-            r'(\d+_\d+_\d+)'
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, name, re.IGNORECASE)
+        for pattern in rx.FILENAME_INVOICE_NUMBER:
+            match = pattern.search(name)
             if match:
                 return match.group(1)
         return ''
@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
 
-import re
 import pdfplumber
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from decimal import Decimal, InvalidOperation
+from typing import Optional, List, Dict, Tuple
 import logging
+import multiprocessing
 import sys
 import os
+import time
 import warnings
 
 # Filtruj ostrzeżenia z pdfplumber o brakującym module dla kolorów
@@ -19,7 +24,12 @@ warnings.filterwarnings('ignore', message='.*Error importing pdfplumber.*', cate
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import get_config
+import regex_patterns as rx
+from extraction_cache import get_extraction_cache
+from memory_monitor import PeakMemoryMonitor
 from invoice_detector import InvoiceDetector, InvoiceType
+from keyword_matcher import KeywordHits, get_keyword_matcher
+from vendor_templates import extract_with_template, get_template_store
 from parsers.atut_parser import ATUTParser
 from parsers.bolt_parser import BoltParser
 from parsers.universal_parser_v6 import UniversalParser
@@ -30,6 +40,34 @@ pytesseract.pytesseract.tesseract_cmd = config.tesseract_path
 
 logger = logging.getLogger(__name__)
 
+# Poniżej tej liczby stron (faktur) plik zbiorczy jest ekstraktowany (parsowany)
+# w jednym procesie - start procesu kosztuje więcej niż kilka stron
+MULTIPAGE_MIN_PARALLEL_ITEMS = 8
+
+# Tabela kończąca się w dolnej części strony (ułamek wysokości) ciągnie się na następnej
+TABLE_BOTTOM_MARGIN = 0.1
+
+# Dopuszczalna różnica sumy pozycji i podsumowania (na pozycję - zaokrąglenia groszy)
+ITEM_SUM_TOLERANCE = Decimal('0.01')
+
+def _to_decimal(value) -> Optional[Decimal]:
+    """Kwota z wyniku parsera (str, float, Decimal) albo None"""
+    if value is None or value == '':
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+def _parse_stated_amount(amount: str) -> Optional[Decimal]:
+    """Kwota z tekstu dokumentu: ostatni separator (',' lub '.' przed 2 cyframi) jest dziesiętny"""
+    amount = amount.replace(' ', '').replace('\u00a0', '')
+    if len(amount) > 3 and amount[-3] in ',.':
+        amount = amount[:-3].replace('.', '').replace(',', '') + '.' + amount[-2:]
+    else:
+        amount = amount.replace('.', '').replace(',', '')
+    return _to_decimal(amount)
+
 @dataclass
 class InvoiceData:
     """Struktura danych faktury"""
@@ -50,10 +88,150 @@ class InvoiceData:
     gross_total: Optional[float] = None
     payment_method: Optional[str] = None
     payment_date: Optional[str] = None
+    # Strona PDF (od 1), na której zaczyna się faktura - ustawiane przy plikach zbiorczych
+    source_page: Optional[int] = None
+
+@dataclass
+class DocumentProbe:
+    """Wynik sondy pierwszej strony PDF (PDFProcessor._probe_document)"""
+    is_invoice: bool
+    # 'faktura', 'nieznany' (1. strona bez czytelnego tekstu) albo rodzaj odrzuconego dokumentu
+    kind: str
+    pages: int
+    # Czy tekst 1. strony pochodzi z OCR w rozdzielczości PROBE_OCR_DPI
+    ocr: bool
+    seconds: float
+
+    @property
+    def saved_seconds(self) -> float:
+        """Szacowany czas pominiętej ekstrakcji: czas sondy jednej strony razy liczba pozostałych stron"""
+        return 0.0 if self.is_invoice else self.seconds * max(0, self.pages - 1)
+
+@dataclass
+class PageContent:
+    """Tekst i tabele jednej strony PDF (LazyDocument)"""
+    number: int
+    text: str
+    tables: List
+    # Strona bez warstwy tekstowej - tekst pochodzi z OCR (po wczytaniu z ocr=True)
+    needs_ocr: bool = False
+    # Ostatnia tabela sięga dołu strony - tabela pozycji może ciągnąć się na następnej
+    table_at_bottom: bool = False
+
+class LazyDocument:
+    """Leniwy widok dokumentu PDF - strony ekstraktowane przy pierwszym odwołaniu
+
+    Strona (tekst, tabele, OCR w razie potrzeby) jest ekstraktowana dopiero,
+    gdy ktoś o nią poprosi, i zapamiętywana. Strony, o które nikt nie
+    poprosi, nie są ani ekstraktowane, ani OCR-owane. text() i tables()
+    łączą wczytane strony w kolejności stron.
+    """
+
+    def __init__(self, processor: 'PDFProcessor', pdf_path: str):
+        self.processor = processor
+        self.pdf_path = pdf_path
+        self._pdf = pdfplumber.open(pdf_path)
+        self.page_count = len(self._pdf.pages)
+        self._pages: Dict[int, PageContent] = {}
+        # Strony, których obiekty pdfplumber zostają w pamięci po ekstrakcji
+        # (np. 1. strona do odczytu szablonem dostawcy) - zwalnia je close()
+        self.retained_pages = set()
+        # Strony wczytane bez OCR (sonda), które wymagają OCR
+        self._pending_ocr = set()
+        self.ocr_page_count = 0
+        # Czas wczytywania stron (razem z OCR) i sam OCR, w sekundach
+        self.load_seconds = 0.0
+        self.ocr_seconds = 0.0
+
+    @property
+    def metadata(self) -> Dict:
+        return self._pdf.metadata or {}
+
+    @property
+    def pdf_pages(self) -> List:
+        """Strony pdfplumber dokumentu (bez ekstrakcji), np. do odczytu obszarów szablonu dostawcy"""
+        return self._pdf.pages
+
+    @property
+    def loaded_pages(self) -> List[int]:
+        return sorted(self._pages)
+
+    @property
+    def fully_loaded(self) -> bool:
+        return len(self._pages) == self.page_count and not self._pending_ocr
+
+    def load(self, page_numbers, ocr: bool = True) -> List[PageContent]:
+        """Wczytuje strony (numeracja od 1) i zwraca je w podanej kolejności
+
+        Strony bez warstwy tekstowej są OCR-owane razem (równolegle, patrz
+        PDFProcessor._ocr_pages); ocr=False odkłada OCR do kolejnego wczytania.
+        """
+        started_at = time.perf_counter()
+        page_numbers = [number for number in page_numbers if 1 <= number <= self.page_count]
+        for number in page_numbers:
+            if number in self._pages:
+                continue
+            page_text, tables, needs_ocr, table_at_bottom = self.processor._extract_page(
+                self._pdf.pages[number - 1], release=number not in self.retained_pages)
+            self._pages[number] = PageContent(number, page_text, tables or [], needs_ocr, table_at_bottom)
+            if needs_ocr:
+                self._pending_ocr.add(number)
+
+        ocr_numbers = sorted(self._pending_ocr.intersection(page_numbers)) if ocr else []
+        if ocr_numbers:
+            logger.info(f"Używam OCR dla stron {ocr_numbers} z {self.page_count}...")
+            ocr_start = time.perf_counter()
+            for number, ocr_text in zip(ocr_numbers, self.processor._ocr_pages(self.pdf_path, ocr_numbers)):
+                self._pages[number].text = ocr_text
+            self.ocr_seconds += time.perf_counter() - ocr_start
+            self.ocr_page_count += len(ocr_numbers)
+            self._pending_ocr.difference_update(ocr_numbers)
+        self.load_seconds += time.perf_counter() - started_at
+        return [self._pages[number] for number in page_numbers]
+
+    def page(self, number: int) -> Optional[PageContent]:
+        """Strona o numerze number (od 1) albo None poza zakresem"""
+        pages = self.load([number])
+        return pages[0] if pages else None
+
+    def first_page(self) -> Optional[PageContent]:
+        return self.page(1)
+
+    def last_page(self) -> Optional[PageContent]:
+        return self.page(self.page_count)
+
+    def next_page(self, page: PageContent) -> Optional[PageContent]:
+        return self.page(page.number + 1)
+
+    def load_all(self):
+        """Wczytuje wszystkie strony (OCR stron-skanów razem, równolegle)"""
+        self.load(range(1, self.page_count + 1))
+
+    def text(self) -> str:
+        """Tekst wczytanych stron (jak tekst całego pliku w extract_text_and_tables)"""
+        return "".join(self._pages[number].text + "\n" for number in self.loaded_pages if self._pages[number].text)
+
+    def tables(self) -> List:
+        """Tabele wczytanych stron w kolejności stron"""
+        return [table for number in self.loaded_pages for table in self._pages[number].tables]
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
 
 class PDFProcessor:
     def __init__(self, parser_type: str = 'auto'):
         self.parser_type = parser_type
+        # Statystyki ostatniej ekstrakcji (np. trafienie w cache)
+        self.last_stats = {}
+        # Instancje parserów używane ponownie dla kolejnych plików
+        self._parsers = {}
         self.invoice_keywords = [
             'faktura', 'invoice', 'vat', 'sprzedawca', 'nabywca',
             'nip', 'razem', 'suma', 'brutto', 'netto',
@@ -70,106 +248,180 @@ class PDFProcessor:
             'MY_MUSIC': ['my music', 'mymusic'],
             'PMH': ['pmh group', 'pmh']
         }
-        self.invoice_patterns = {
-            'invoice_number': [
-                r'Faktura\s*(?:VAT\s*)?nr\s*[:.]?\s*([^\s\n]+)',
-                r'Faktura\s*nr\s*[:.]?\s*([A-Z0-9\-/\.]+)',
-                r'nr\s*[:.]?\s*([A-Z0-9\-/\.]+)',
-                r'Numer\s*faktury\s*[:.]?\s*([A-Z0-9\-/\.]+)',
-                r'Invoice\s*(?:no\.?)?\s*([A-Z0-9\-/\.]+)'
-            ],
-            'date': [
-                r'Data\s*wystawienia\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
-                r'Data\s*wystawienia\s*[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
-                r'Wystawiono\s*dnia\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
-                r'z\s*dnia\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})'
-            ],
-            'sale_date': [
-                r'Data\s*sprzedaży\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
-                r'Data\s*sprzedaży\s*[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
-                r'Data\s*dostawy.*?[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
-                r'Data\s*dostawy.*?[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})'
-            ],
-            'nip': [
-                r'NIP\s*[:.]?\s*([PL]?\s*[\d\s\-]+)',
-                r'Tax\s*ID\s*[:.]?\s*(\d{10})'
-            ],
-            'gross_amount': [
-                r'Do\s*zapłaty\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
-                r'Razem\s*do\s*zapłaty\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
-                r'Pozostało\s*do\s*zapłaty\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
-                r'Należność\s*ogółem\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
-                r'Suma\s*brutto.*?[:.]?\s*([\d\s]+[,.]?\d*)',
-                r'Wartość\s*brutto.*?([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
-                r'Razem.*?brutto.*?([\d\s]+[,.]?\d*)'
-            ],
-            'net_amount': [
-                r'Wartość\s*netto\s*[:.]?\s*([\d\s]+[,.]?\d*)',
-                r'Razem\s*netto\s*[:.]?\s*([\d\s]+[,.]?\d*)',
-                r'Netto\s*[:.]?\s*([\d\s]+[,.]?\d*)',
-                r'Suma\s*netto\s*[:.]?\s*([\d\s]+[,.]?\d*)'
-            ],
-            'vat_amount': [
-                r'VAT\s*[:.]?\s*([\d\s]+[,.]?\d*)',
-                r'Kwota\s*VAT\s*[:.]?\s*([\d\s]+[,.]?\d*)',
-                r'Podatek\s*VAT\s*[:.]?\s*([\d\s]+[,.]?\d*)'
-            ],
-            'payment_method': [
-                r'Sposób\s*(?:płatności|zapłaty)\s*[:.]?\s*([^\n]+)',
-                r'Forma\s*płatności\s*[:.]?\s*([^\n]+)',
-                r'Zapłacono\s*[:.]?\s*([^\n]+)'
-            ],
-            'payment_date': [
-                r'Termin\s*płatności\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
-                r'Termin\s*płatności\s*[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
-                r'Data\s*płatności\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})'
-            ]
+        # Sonda pierwszej strony: tytuł faktury wystarcza, żeby nie odrzucać pliku,
+        # a słowa rodzajów dokumentów opisują odrzucony plik w logu i podsumowaniu
+        self.invoice_title_keywords = ['faktura', 'invoice', 'rachunek', 'nota korygująca']
+        self.non_invoice_kinds = {
+            'umowa': ['umowa', 'aneks', 'contract', 'agreement'],
+            'dokument dostawy': ['wydanie zewnętrzne', 'dowód dostawy', 'list przewozowy', 'delivery note'],
+            'regulamin': ['regulamin', 'ogólne warunki', 'warunki handlowe', 'terms and conditions'],
+            'oferta': ['oferta', 'zamówienie', 'purchase order'],
         }
+        # Wzorce prekompilowane we wspólnym rejestrze
+        self.invoice_patterns = rx.PDF_INVOICE_PATTERNS
+        # Wykrywanie granic faktur w plikach zbiorczych
+        self.detector = InvoiceDetector()
+        # Automat słów kluczowych faktury i typów - jedno przejście tekstu dla
+        # _is_invoice i _detect_invoice_type (wynik pamiętany dla ostatniego tekstu)
+        self.keyword_matcher = get_keyword_matcher(
+            self.invoice_keywords + self.invoice_title_keywords
+            + [keyword for keywords in self.invoice_types.values() for keyword in keywords]
+            + [keyword for keywords in self.non_invoice_kinds.values() for keyword in keywords]
+        )
+        self._hits_text = None
+        self._hits = None
 
-    def _extract_with_ocr(self, pdf_path: str) -> str:
-        """Ekstraktuje tekst z PDF używając OCR z optymalizacją dla tabel"""
+    def get_parser(self, parser_type: str):
+        """Zwraca parser danego typu - tworzony raz i używany dla kolejnych plików
+
+        Parsery resetują swój stan na początku parse(), więc ta sama instancja
+        może obsłużyć dowolnie wiele faktur.
+        """
+        if parser_type not in ('atut', 'bolt'):
+            parser_type = 'universal'
+        parser = self._parsers.get(parser_type)
+        if parser is None:
+            if parser_type == 'atut':
+                parser = ATUTParser()
+            elif parser_type == 'bolt':
+                parser = BoltParser()
+            else:
+                parser = UniversalParser()
+            self._parsers[parser_type] = parser
+        return parser
+
+    def _get_poppler_path(self) -> Optional[str]:
+        """Zwraca ścieżkę Poppler z konfiguracji, jeśli katalog istnieje"""
+        if config.poppler_path and os.path.isdir(config.poppler_path):
+            return config.poppler_path
+        return None
+
+    def _ocr_page(self, pdf_path: str, page_number: int, dpi: Optional[int] = None) -> str:
+        """Rasteryzuje i rozpoznaje pojedynczą stronę PDF (numeracja od 1)
+
+        Rasteryzowana jest tylko jedna strona naraz (first_page/last_page), a obraz
+        zwalniany zaraz po OCR - szczyt pamięci nie zależy od liczby stron.
+        Domyślna rozdzielczość to OCR_DPI.
+        """
+        images = convert_from_path(
+            pdf_path,
+            dpi=dpi or config.ocr_dpi,
+            first_page=page_number,
+            last_page=page_number,
+            grayscale=True,
+            poppler_path=self._get_poppler_path()
+        )
+        page_text = ""
         try:
-            images = convert_from_path(pdf_path)
-            text = ""
             for image in images:
-                # Optymalizacja Tesseract: PSM 6 dla tabel, OEM 3 dla LSTM, obsługa języka polskiego i angielskiego
-                page_text = pytesseract.image_to_string(
+                # Optymalizacja Tesseract: PSM z konfiguracji (domyślnie 6 dla tabel), OEM 3 dla LSTM
+                page_text += pytesseract.image_to_string(
                     image,
-                    lang='pol+eng',
-                    config='--psm 6 --oem 3'
+                    lang=config.ocr_languages,
+                    config=config.get_tesseract_config()
                 )
-                text += page_text + "\n"
-            return text
+        finally:
+            for image in images:
+                image.close()
+        return page_text
+
+    def _ocr_pages(self, pdf_path: str, page_numbers: List[int]) -> List[str]:
+        """OCR wskazanych stron (numeracja od 1) - strony przetwarzane równolegle
+
+        Zwraca listę tekstów w kolejności page_numbers.
+        """
+        if not page_numbers:
+            return []
+        try:
+            workers = max(1, min(config.ocr_workers, len(page_numbers)))
+
+            if workers == 1:
+                return [self._ocr_page(pdf_path, n) for n in page_numbers]
+
+            # Tesseract sam uruchamia wątki OpenMP - przy wielu stronach naraz tylko by się dusiły
+            os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+            # Tesseract i Poppler działają w osobnych procesach, więc wątki wystarczą;
+            # executor.map zachowuje kolejność stron
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(partial(self._ocr_page, pdf_path), page_numbers))
+        except Exception as e:
+            logger.error(f"Błąd OCR: {e}")
+            return [""] * len(page_numbers)
+
+    def _extract_with_ocr(self, pdf_path: str) -> str:
+        """Ekstraktuje tekst z całego PDF używając OCR"""
+        try:
+            page_count = pdfinfo_from_path(pdf_path, poppler_path=self._get_poppler_path())['Pages']
         except Exception as e:
             logger.error(f"Błąd OCR: {e}")
             return ""
+        page_texts = self._ocr_pages(pdf_path, list(range(1, page_count + 1)))
+        return "".join(page_text + "\n" for page_text in page_texts)
+
+    def _page_needs_ocr(self, page_text: str) -> bool:
+        """Sprawdza, czy strona nie ma użytecznej warstwy tekstowej
+
+        Obecność obrazu nie jest wymagana - tekst zamieniony na krzywe i obrazy
+        wstawione w strumień strony (inline) nie trafiają do page.images.
+        """
+        return len(page_text.strip()) < config.ocr_min_page_chars
+
+    def _keyword_hits(self, text: str) -> KeywordHits:
+        """Trafienia słów kluczowych w tekście (automat przechodzi ten sam tekst tylko raz)"""
+        if text is not self._hits_text:
+            self._hits = self.keyword_matcher.scan(text)
+            self._hits_text = text
+        return self._hits
 
     def _is_invoice(self, text: str) -> bool:
         """Sprawdza, czy tekst zawiera wystarczającą liczbę słów kluczowych"""
-        text_lower = text.lower()
-        keyword_count = sum(1 for keyword in self.invoice_keywords if keyword in text_lower)
+        hits = self._keyword_hits(text)
+        keyword_count = sum(1 for keyword in self.invoice_keywords if hits.contains(keyword))
         return keyword_count >= self.min_keywords_count
 
+    def _classify_first_page(self, page_text: str, metadata: str) -> Tuple[bool, str]:
+        """Ocenia po tekście 1. strony i metadanych PDF, czy plik jest fakturą
+
+        Odrzucana jest tylko strona z czytelnym tekstem, bez tytułu faktury
+        i bez wymaganej liczby słów kluczowych. Strona bez tekstu (np. OCR
+        niedostępny) nie przesądza o niczym - decyzja zapada po pełnej ekstrakcji.
+
+        Returns:
+            (czy plik może być fakturą, rodzaj dokumentu)
+        """
+        metadata_hits = self.keyword_matcher.scan(metadata)
+        if any(metadata_hits.contains(keyword) for keyword in self.invoice_title_keywords):
+            return True, 'faktura'
+        if len(page_text.strip()) < config.ocr_min_page_chars:
+            return True, 'nieznany'
+        hits = self._keyword_hits(page_text)
+        if self._is_invoice(page_text) or any(hits.contains(keyword) for keyword in self.invoice_title_keywords):
+            return True, 'faktura'
+        for kind, keywords in self.non_invoice_kinds.items():
+            if any(hits.contains(keyword) for keyword in keywords):
+                return False, kind
+        return False, 'inny dokument'
+
     def _detect_invoice_type(self, text: str) -> str:
         """Rozpoznaje typ faktury na podstawie słów kluczowych"""
-        text_lower = text.lower()
+        hits = self._keyword_hits(text)
         for inv_type, keywords in self.invoice_types.items():
-            if any(keyword in text_lower for keyword in keywords):
+            if any(hits.contains(keyword) for keyword in keywords):
                 return inv_type
         return 'UNIVERSAL'
 
     def _clean_nip(self, nip: str) -> str:
         """Czyści NIP z niepotrzebnych znaków"""
-        cleaned = re.sub(r'[^\d]', '', nip)
+        cleaned = rx.NON_DIGITS.sub('', nip)
         return cleaned
 
     def _parse_amount(self, amount_str: str) -> float:
         """Parsuje kwoty w formacie polskim"""
         amount_str = amount_str.strip()
-        amount_str = re.sub(r'\s', '', amount_str)
+        amount_str = rx.WHITESPACE.sub('', amount_str)
         amount_str = amount_str.replace(',', '.')
         try:
-            return float(re.sub(r'[^\d.]', '', amount_str))
+            return float(rx.NON_DIGITS_OR_DOT.sub('', amount_str))
         except:
             return 0.0
 
@@ -196,11 +448,11 @@ class PDFProcessor:
 
                         cell_str = str(cell).strip()
 
-                        if len(cell_str) > 10 and not re.match(r'^[\d\s,.-]+$', cell_str):
+                        if len(cell_str) > 10 and not rx.CELL_NUMERIC_ONLY.match(cell_str):
                             item['description'] = cell_str
-                        elif re.match(r'^\d+([.,]\d+)?\s*(szt|kg|l|m|h)?\.?$', cell_str, re.IGNORECASE):
+                        elif rx.CELL_QUANTITY.match(cell_str):
                             item['quantity'] = self._parse_amount(cell_str)
-                        elif re.match(r'^[\d\s]+[,.]?\d*$', cell_str):
+                        elif rx.CELL_AMOUNT.match(cell_str):
                             amount = self._parse_amount(cell_str)
                             if amount > 0:
                                 if 'unit_price' not in item:
@@ -219,40 +471,247 @@ class PDFProcessor:
 
         return items
 
-    def extract_text_and_tables(self, pdf_path: str):
-        """Ekstraktuje tekst i tabele z PDF"""
-        text = ""
-        all_tables = []
+    def _cache_lookup(self, pdf_path: str):
+        """Zwraca (klucz cache, wynik z cache albo None); klucz None, gdy cache jest wyłączony"""
+        cache = get_extraction_cache()
+        if not cache.enabled:
+            return None, None
+        try:
+            cache_key = cache.make_key(pdf_path)
+        except OSError as e:
+            logger.warning(f"Nie można obliczyć klucza cache dla {pdf_path}: {e}")
+            return None, None
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache: wynik ekstrakcji z cache dla {os.path.basename(pdf_path)}")
+            self.last_stats['cache_hit'] = True
+        return cache_key, cached
+
+    def _cache_put(self, cache_key: Optional[str], text: str, tables: List):
+        # Pusty tekst (np. brak Tesseract) nie trafia do cache, żeby nie utrwalać błędu
+        if cache_key and text.strip():
+            get_extraction_cache().put(cache_key, text, tables)
+
+    def extract_text_and_tables(self, pdf_path: str, probe: bool = False):
+        """Ekstraktuje tekst i tabele z PDF (z użyciem cache, jeśli włączony)
+
+        probe=True: plik spoza cache jest najpierw oceniany po pierwszej stronie
+        (wynik w self.last_stats['probe']); plik odrzucony przez sondę zwraca
+        pusty tekst bez ekstrakcji pozostałych stron.
+        """
+        self.last_stats = {'cache_hit': False}
+        cache_key, cached = self._cache_lookup(pdf_path)
+        if cached is not None:
+            return cached
+
+        text, all_tables = self._extract_text_and_tables_uncached(pdf_path, probe)
+        self._cache_put(cache_key, text, all_tables)
+        return text, all_tables
+
+    def _extract_page(self, page, release: bool = True):
+        """Ekstraktuje tekst i tabele jednej strony w jednym przebiegu
 
+        Tekst i tabele korzystają z tych samych obiektów strony (znaki, linie),
+        parsowanych przez pdfplumber raz i trzymanych w cache strony. Po
+        ekstrakcji cache jest zwalniany (release=False zostawia go dla
+        kolejnego odczytu strony), więc pamięć nie rośnie z liczbą stron.
+
+        Returns:
+            (tekst, tabele, czy strona wymaga OCR, czy ostatnia tabela sięga dołu strony)
+        """
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            page_text = page.extract_text() or ""
+            # Domyślna strategia tabel pdfplumber ("lines") buduje komórki z linii
+            # i prostokątów - strona bez nich nie zawiera tabeli
+            found_tables = page.find_tables() if page.edges else []
+            tables = [table.extract() for table in found_tables]
+            # Tabela ucięta dolnym marginesem zwykle ciągnie się na następnej stronie
+            table_at_bottom = bool(found_tables) and max(table.bbox[3] for table in found_tables) >= \
+                page.height * (1 - TABLE_BOTTOM_MARGIN)
+            needs_ocr = self._page_needs_ocr(page_text)
+        finally:
+            if release:
+                self._release_page(page)
+        return page_text, tables, needs_ocr, table_at_bottom
+
+    def _release_page(self, page):
+        """Zwalnia cache obiektów strony pdfplumber"""
+        release = getattr(page, 'close', None) or getattr(page, 'flush_cache', None)
+        if release:
+            try:
+                release()
+            except Exception as e:
+                logger.debug(f"Nie udało się zwolnić strony: {e}")
+
+    def _extract_page_range(self, pdf_path: str, first_page: int = 1, last_page: Optional[int] = None):
+        """Ekstraktuje tekst i tabele stron first_page..last_page (numeracja od 1, bez OCR)
+
+        Returns:
+            (teksty stron, tabele stron, numery stron wymagających OCR)
+        """
+        page_texts = []
+        page_tables = []
+        ocr_page_numbers = []
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_number, page in enumerate(pdf.pages[first_page - 1:last_page], first_page):
+                page_text, tables, needs_ocr, _ = self._extract_page(page)
+                if needs_ocr:
+                    ocr_page_numbers.append(page_number)
+                page_texts.append(page_text)
+                page_tables.append(tables or [])
+        return page_texts, page_tables, ocr_page_numbers
+
+    def _probe_document(self, document: 'LazyDocument') -> DocumentProbe:
+        """Sonda pliku na podstawie 1. strony i metadanych (wynik w self.last_stats['probe'])
+
+        Strona bez warstwy tekstowej jest OCR-owana w niskiej rozdzielczości
+        (PROBE_OCR_DPI) - wynik służy tylko do decyzji, pełny OCR odbywa się
+        przy ekstrakcji zaakceptowanego pliku.
+        """
+        started_at = time.perf_counter()
+        first_pages = document.load([1], ocr=False)
+        page_text = first_pages[0].text if first_pages else ""
+        needs_ocr = bool(first_pages) and first_pages[0].needs_ocr
+        if needs_ocr:
+            try:
+                page_text = self._ocr_page(document.pdf_path, 1, dpi=config.probe_ocr_dpi)
+            except Exception as e:
+                logger.debug(f"OCR sondy 1. strony niedostępny: {e}")
+                page_text = ""
+        metadata = document.metadata
+        metadata_text = ' '.join(str(metadata.get(field, '')) for field in ('Title', 'Subject', 'Keywords'))
+        is_invoice, kind = self._classify_first_page(page_text, metadata_text)
+        document_probe = DocumentProbe(is_invoice=is_invoice, kind=kind, pages=document.page_count, ocr=needs_ocr,
+                                       seconds=time.perf_counter() - started_at)
+        self.last_stats['probe'] = document_probe
+        return document_probe
+
+    def _apply_ocr(self, pdf_path: str, page_texts: List[str], ocr_page_numbers: List[int]):
+        """Zastępuje teksty stron bez warstwy tekstowej wynikiem OCR"""
+        if ocr_page_numbers:
+            logger.info(f"Używam OCR dla stron {ocr_page_numbers} z {len(page_texts)}...")
+            ocr_start = time.perf_counter()
+            ocr_texts = self._ocr_pages(pdf_path, ocr_page_numbers)
+            self.last_stats['ocr_seconds'] = time.perf_counter() - ocr_start
+            for page_number, ocr_text in zip(ocr_page_numbers, ocr_texts):
+                page_texts[page_number - 1] = ocr_text
+
+        self.last_stats['pages'] = len(page_texts)
+        self.last_stats['ocr_pages'] = len(ocr_page_numbers)
 
-                    tables = page.extract_tables()
-                    if tables:
-                        all_tables.extend(tables)
+    def _extract_pages(self, pdf_path: str) -> Tuple[List[str], List[List]]:
+        """Ekstraktuje tekst i tabele z PDF osobno dla każdej strony
 
-            if len(text.strip()) < 100:
-                logger.info("Używam OCR do ekstrakcji...")
-                text = self._extract_with_ocr(pdf_path)
+        OCR dotyczy tylko stron bez warstwy tekstowej - strony tekstowe
+        dokumentów mieszanych są zachowywane bez zmian.
 
-            return text, all_tables
+        Returns:
+            (teksty stron, tabele stron) - listy w kolejności stron
+        """
+        page_texts, page_tables, ocr_page_numbers = self._extract_page_range(pdf_path)
+        self._apply_ocr(pdf_path, page_texts, ocr_page_numbers)
+        return page_texts, page_tables
 
+    def _record_document_stats(self, document: 'LazyDocument'):
+        """Statystyki ekstrakcji dokumentu w self.last_stats"""
+        self.last_stats['pages'] = document.page_count
+        self.last_stats['pages_loaded'] = len(document.loaded_pages)
+        self.last_stats['ocr_pages'] = document.ocr_page_count
+        if document.ocr_seconds:
+            self.last_stats['ocr_seconds'] = document.ocr_seconds
+
+    def _extract_text_and_tables_uncached(self, pdf_path: str, probe: bool = False):
+        """Ekstraktuje tekst i tabele z PDF (plik odrzucony przez sondę - pusty tekst)"""
+        try:
+            with LazyDocument(self, pdf_path) as document:
+                if probe and not self._probe_document(document).is_invoice:
+                    self._record_document_stats(document)
+                    return "", []
+                document.load_all()
+                self._record_document_stats(document)
+                return document.text(), document.tables()
         except Exception as e:
             logger.error(f"Błąd ekstrakcji tekstu i tabel: {e}")
             return "", []
 
-    def extract_from_pdf(self, pdf_path: str) -> InvoiceData:
-        """Główna metoda ekstrakcji danych z PDF"""
-        text, tables = self.extract_text_and_tables(pdf_path)
-        if not self._is_invoice(text):
-            logger.warning(f"Plik {pdf_path} nie zawiera faktury")
-            return InvoiceData()
+    def _load_invoice_pages(self, document: 'LazyDocument'):
+        """Wczytuje strony, na których zwykle są pola faktury
+
+        Pierwsza strona (numer, daty, strony transakcji), kolejne strony
+        dopóki ciągnie się tabela pozycji, oraz ostatnia strona (podsumowanie).
+        """
+        page = document.first_page()
+        while page is not None and page.number < document.page_count and self._continues_on_next_page(page):
+            page = document.next_page(page)
+        document.last_page()
+
+    def _continues_on_next_page(self, page: 'PageContent') -> bool:
+        """Czy faktura (tabela pozycji) ciągnie się na następnej stronie"""
+        counter = rx.PAGE_COUNTER_TOTAL.search(page.text)
+        if counter and int(counter.group(1)) < int(counter.group(2)):
+            return True
+        if not page.tables:
+            return False
+        # Tabela bez kwoty do zapłaty pod nią albo ucięta dolnym marginesem strony
+        return page.table_at_bottom or not rx.AMOUNT_DUE.search(page.text)
+
+    def _is_incomplete(self, invoice_data: Dict, text: str) -> bool:
+        """Czy wynik parsera z części stron wymaga wczytania pozostałych stron
+
+        Nagłówek (numer, daty, strony transakcji) jest na pierwszej stronie -
+        pozostałe strony mogą uzupełnić tylko pozycje i podsumowanie. Strony ze
+        środka tabeli bez linii i bez licznika "Strona X z N" nie są wczytywane
+        jako ciąg tabeli, a ich brak widać tylko w sumie pozycji - dlatego suma
+        brutto pozycji musi zgadzać się z kwotą do zapłaty podaną w tekście
+        wczytanych stron (parser v6 liczy podsumowanie z pozycji; gdy pozycje
+        nie mają kwot brutto - porównywane jest podsumowanie). Bez kwoty do
+        zapłaty kompletności nie da się sprawdzić.
+        """
+        items = invoice_data.get('items') or []
+        gross_total = _to_decimal(invoice_data.get('summary', {}).get('gross_total'))
+        if not items or gross_total is None or gross_total <= 0:
+            return True
+        amounts_due = [amount for amount in map(_parse_stated_amount, rx.AMOUNT_DUE_VALUE.findall(text)) if amount]
+        if not amounts_due:
+            return True
+        items_gross = sum(_to_decimal(item.get('gross_amount')) or Decimal(0) for item in items) or gross_total
+        tolerance = ITEM_SUM_TOLERANCE * (len(items) + 1)
+        return not any(abs(items_gross - amount) <= tolerance for amount in amounts_due)
+
+    def _parse_with_template(self, pages, template: Dict, first_page_text: str, timings: Dict) -> Optional[Dict]:
+        """Odczyt faktury z obszarów stron według szablonu dostawcy; None - parser uniwersalny"""
+        stage_start = time.perf_counter()
+        invoice_data = extract_with_template(pages, template, first_page_text)
+        timings['template'] = timings.get('template', 0.0) + time.perf_counter() - stage_start
+        if invoice_data is not None:
+            logger.info(f"Faktura odczytana szablonem dostawcy {template['name']} ({template['nip']})")
+            self.last_stats['template'] = template['nip']
+        return invoice_data
+
+    def _parse_document_with_template(self, document: 'LazyDocument', timings: Dict) -> Optional[Dict]:
+        """Szablon dostawcy, którego NIP jest na 1. stronie dokumentu (skany - zawsze None)"""
+        first_pages = document.load([1], ocr=False)
+        if not first_pages or first_pages[0].needs_ocr:
+            return None
+        template = get_template_store().find(first_pages[0].text)
+        if template is None:
+            return None
+        try:
+            return self._parse_with_template(document.pdf_pages, template, first_pages[0].text, timings)
+        except Exception as e:
+            logger.warning(f"Błąd odczytu szablonem dostawcy {template['nip']}: {e}")
+            return None
+
+    def _detect_and_parse(self, pdf_path: str, text: str, tables: List, timings: Dict) -> Optional[Dict]:
+        """Rozpoznaje fakturę i jej typ, a następnie parsuje; None, gdy tekst nie zawiera faktury"""
+        stage_start = time.perf_counter()
+        is_invoice = self._is_invoice(text)
+        if not is_invoice:
+            timings['detection'] = timings.get('detection', 0.0) + time.perf_counter() - stage_start
+            return None
 
         invoice_type = self._detect_invoice_type(text)
+        timings['detection'] = timings.get('detection', 0.0) + time.perf_counter() - stage_start
         logger.info(f"Wykryto typ faktury: {invoice_type}")
 
         if self.parser_type == 'auto':
@@ -260,16 +719,292 @@ class PDFProcessor:
         else:
             parser_type = self.parser_type
 
-        if parser_type == 'atut':
-            parser = ATUTParser()
-        elif parser_type == 'bolt':
-            parser = BoltParser()
-        else:
-            parser = UniversalParser()
-
+        stage_start = time.perf_counter()
+        parser = self.get_parser(parser_type)
         parser.filename = os.path.basename(pdf_path)
         invoice_data = parser.parse(text, tables)
+        timings['parse'] = timings.get('parse', 0.0) + time.perf_counter() - stage_start
+        return invoice_data
+
+    def extract_from_pdf(self, pdf_path: str) -> InvoiceData:
+        """Główna metoda ekstrakcji danych z PDF
+
+        Czasy etapów (ekstrakcja, OCR, wykrywanie typu, parsowanie) trafiają
+        do self.last_stats['timings'] w sekundach. Przy PROBE_ENABLED plik,
+        którego pierwsza strona nie wygląda na fakturę, jest odrzucany przed
+        ekstrakcją pozostałych stron (self.last_stats['probe']).
+
+        Przy LAZY_PAGES strony spoza cache są ekstraktowane na żądanie
+        (LazyDocument): pierwsza, kolejne dopóki ciągnie się tabela pozycji
+        i ostatnia. Pozostałe strony są wczytywane tylko wtedy, gdy wynik
+        parsera jest niepełny - strony, których nie potrzebuje żadne pole,
+        nie są ekstraktowane ani OCR-owane.
+
+        Faktura dostawcy z szablonem układu (vendor_templates, NIP sprzedawcy
+        na 1. stronie) jest odczytywana z obszarów stron bez parsera
+        uniwersalnego (self.last_stats['template'] = NIP); wynik odrzucony
+        przez kontrolę szablonu trafia do parsera uniwersalnego.
+        """
+        self.last_stats = {'cache_hit': False}
+        timings = {}
+        self.last_stats['timings'] = timings
+        with PeakMemoryMonitor() as memory:
+            invoice_data = self._extract_and_parse(pdf_path, timings)
+        self.last_stats['peak_rss_mb'] = memory.peak_mb
+        if memory.peak_mb is not None:
+            logger.info(f"Szczyt pamięci podczas przetwarzania {os.path.basename(pdf_path)}: {memory.peak_mb:.0f} MB")
+
+        document_probe = self.last_stats.get('probe')
+        if document_probe is not None and not document_probe.is_invoice:
+            logger.warning(f"Plik {pdf_path} nie zawiera faktury (sonda 1. strony: {document_probe.kind}) - "
+                           f"pominięto ekstrakcję {document_probe.pages - 1} kolejnych stron")
+            return InvoiceData()
+        if invoice_data is None:
+            logger.warning(f"Plik {pdf_path} nie zawiera faktury")
+            return InvoiceData()
+        return self._build_invoice_data(invoice_data)
+
+    def _extract_and_parse(self, pdf_path: str, timings: Dict) -> Optional[Dict]:
+        """Tekst i tabele z cache albo z dokumentu (LazyDocument), rozpoznanie i parsowanie"""
+        stage_start = time.perf_counter()
+        cache_key, cached = self._cache_lookup(pdf_path)
+        if cached is not None:
+            timings['extraction'] = time.perf_counter() - stage_start
+            text, tables = cached
+            template = get_template_store().find(text) if config.vendor_templates_enabled else None
+            if template is not None:
+                try:
+                    with pdfplumber.open(pdf_path) as pdf:
+                        invoice_data = self._parse_with_template(
+                            pdf.pages, template, pdf.pages[0].extract_text() or "", timings)
+                except Exception as e:
+                    logger.warning(f"Błąd odczytu szablonem dostawcy {template['nip']}: {e}")
+                    invoice_data = None
+                if invoice_data is not None:
+                    return invoice_data
+            return self._detect_and_parse(pdf_path, text, tables, timings)
+
+        try:
+            document = LazyDocument(self, pdf_path)
+        except Exception as e:
+            logger.error(f"Błąd ekstrakcji tekstu i tabel: {e}")
+            return None
+        try:
+            return self._extract_from_document(document, cache_key, timings)
+        finally:
+            document.close()
+            self._record_document_stats(document)
+            timings['extraction'] = document.load_seconds - document.ocr_seconds
+            if document.ocr_seconds:
+                timings['ocr'] = document.ocr_seconds
+
+    def _extract_from_document(self, document: 'LazyDocument', cache_key: Optional[str],
+                               timings: Dict) -> Optional[Dict]:
+        """Sonda, szablon dostawcy albo wczytanie stron i parsowanie dokumentu spoza cache"""
+        use_templates = config.vendor_templates_enabled and len(get_template_store()) > 0
+        if use_templates:
+            # Obiekty 1. strony (sonda) zostają w pamięci do odczytu szablonem
+            document.retained_pages.add(1)
+        if config.probe_enabled and not self._probe_document(document).is_invoice:
+            return None
 
+        try:
+            if use_templates:
+                invoice_data = self._parse_document_with_template(document, timings)
+                if invoice_data is not None:
+                    return invoice_data
+            if config.lazy_pages:
+                self._load_invoice_pages(document)
+            else:
+                document.load_all()
+        except Exception as e:
+            logger.error(f"Błąd ekstrakcji tekstu i tabel: {e}")
+            return None
+
+        invoice_data = self._detect_and_parse(document.pdf_path, document.text(), document.tables(), timings)
+        if not document.fully_loaded and (invoice_data is None or self._is_incomplete(invoice_data, document.text())):
+            logger.info(f"Niepełne dane z {len(document.loaded_pages)} z {document.page_count} stron - "
+                        f"wczytuję pozostałe strony")
+            try:
+                document.load_all()
+            except Exception as e:
+                logger.error(f"Błąd ekstrakcji tekstu i tabel: {e}")
+                return invoice_data
+            invoice_data = self._detect_and_parse(document.pdf_path, document.text(), document.tables(), timings)
+
+        # Do cache trafia tylko tekst całego dokumentu
+        if document.fully_loaded:
+            self._cache_put(cache_key, document.text(), document.tables())
+        return invoice_data
+
+    def extract_from_pdf_multipage(self, pdf_path: str) -> List[InvoiceData]:
+        """Ekstrakcja wszystkich faktur z pliku zbiorczego (wiele faktur w jednym PDF)
+
+        Plik jest dzielony na faktury według granic stron. Ekstrakcja zakresów
+        stron i parsowanie faktur odbywa się równolegle w MULTIPAGE_WORKERS
+        procesach. Każda faktura ma ustawione source_page - stronę, na której
+        się zaczyna. Fragmenty niebędące fakturą (np. strona tytułowa) są
+        pomijane. Ekstrakcja nie korzysta z cache, bo cache przechowuje tekst
+        całego pliku bez podziału na strony.
+        """
+        self.last_stats = {'cache_hit': False}
+        timings = {}
+        pdf_name = os.path.basename(pdf_path)
+
+        workers = config.multipage_workers or os.cpu_count() or 1
+        # Procesy robocze main_multi.py i watch_folder.py (daemon) nie mogą tworzyć procesów potomnych
+        if multiprocessing.current_process().daemon:
+            workers = 1
+        # Procesy puli startują dopiero przy pierwszym zadaniu
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            stage_start = time.perf_counter()
+            try:
+                page_texts, page_tables = self._extract_pages_parallel(pdf_path, executor, workers)
+            except Exception as e:
+                logger.error(f"Błąd ekstrakcji tekstu i tabel: {e}")
+                return []
+            ocr_seconds = self.last_stats.get('ocr_seconds', 0.0)
+            timings['extraction'] = time.perf_counter() - stage_start - ocr_seconds
+            if ocr_seconds:
+                timings['ocr'] = ocr_seconds
+            self.last_stats['timings'] = timings
+
+            stage_start = time.perf_counter()
+            segments = self._split_into_invoices(page_texts, page_tables)
+            timings['detection'] = time.perf_counter() - stage_start
+            logger.info(f"{pdf_name}: {len(segments)} faktur(y) na {len(page_texts)} stronach")
+
+            stage_start = time.perf_counter()
+            results = self._parse_segments(pdf_name, segments, executor, workers)
+            timings['parse'] = time.perf_counter() - stage_start
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        invoices = [invoice for invoice in results if invoice is not None]
+        self.last_stats['segments'] = len(segments)
+        self.last_stats['invoices'] = len(invoices)
+        return invoices
+
+    def _extract_pages_parallel(self, pdf_path: str, executor: Optional[ProcessPoolExecutor],
+                                workers: int) -> Tuple[List[str], List[List]]:
+        """Jak _extract_pages, ale zakresy stron ekstraktowane są w puli procesów
+
+        OCR stron bez warstwy tekstowej odbywa się w procesie głównym
+        (strony OCR-owane są równolegle w wątkach, patrz _ocr_pages).
+        """
+        if executor is None:
+            return self._extract_pages(pdf_path)
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+        if page_count < MULTIPAGE_MIN_PARALLEL_ITEMS:
+            return self._extract_pages(pdf_path)
+
+        # Kilka zakresów na proces wyrównuje obciążenie (strony z tabelami są wolniejsze)
+        chunk_size = -(-page_count // (workers * 4))
+        first_pages = list(range(1, page_count + 1, chunk_size))
+        last_pages = [first_page + chunk_size - 1 for first_page in first_pages]
+        try:
+            chunks = list(executor.map(partial(_extract_page_range_in_worker, self.parser_type, pdf_path), first_pages, last_pages))
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Równoległa ekstrakcja niedostępna ({e}) - ekstraktuję sekwencyjnie")
+            return self._extract_pages(pdf_path)
+
+        page_texts, page_tables, ocr_page_numbers = [], [], []
+        for chunk_texts, chunk_tables, chunk_ocr_pages in chunks:
+            page_texts.extend(chunk_texts)
+            page_tables.extend(chunk_tables)
+            ocr_page_numbers.extend(chunk_ocr_pages)
+        self._apply_ocr(pdf_path, page_texts, ocr_page_numbers)
+        return page_texts, page_tables
+
+    def _split_into_invoices(self, page_texts: List[str], page_tables: List[List]) -> List[Dict]:
+        """Dzieli strony pliku zbiorczego na fragmenty z pojedynczymi fakturami
+
+        Nowa faktura zaczyna się na stronie z numerem innym niż numer bieżącej
+        faktury (znaczniki z InvoiceDetector.detect_multiple_invoices) albo
+        z licznikiem "Strona 1 z N". Strony bez znaczników (np. "Faktura X -
+        strona 2") są kontynuacją bieżącej faktury. Pierwsza faktura na stronie
+        obejmuje stronę od początku (nad numerem bywa nazwa sprzedawcy); kolejne
+        faktury na tej samej stronie (np. paragony) zaczynają się od swojego
+        znacznika, a tabele takiej strony są pomijane - nie da się ich
+        przypisać do konkretnej faktury.
+
+        Returns:
+            Lista fragmentów {'start_page', 'number', 'texts', 'tables'}
+        """
+        segments = []
+        for page_number, (page_text, tables) in enumerate(zip(page_texts, page_tables), 1):
+            current_number = segments[-1]['number'] if segments else None
+            # (pozycja w tekście strony, numer faktury) - początki faktur na stronie
+            starts = []
+            for marker in self.detector.detect_multiple_invoices(page_text):
+                number = marker['number']
+                # Numer bez cyfr to fragment tekstu (np. "Faktura nr / Invoice no."), nie numer faktury
+                if number and any(char.isdigit() for char in number):
+                    if number == current_number:
+                        continue
+                    if starts and starts[-1][1] is None:
+                        starts[-1] = (0, number)  # licznik "Strona 1 z N" już otworzył fakturę
+                    else:
+                        starts.append((marker['start_pos'] if starts else 0, number))
+                    current_number = number
+                elif not starts:
+                    counter = rx.PAGE_COUNTER.match(marker['text_fragment'])
+                    if counter and int(counter.group(1)) == 1:
+                        starts.append((0, None))
+
+            if not starts:
+                if segments:
+                    segments[-1]['texts'].append(page_text)
+                    segments[-1]['tables'].extend(tables)
+                    continue
+                starts = [(0, None)]
+
+            if len(starts) > 1:
+                logger.debug(f"Strona {page_number}: {len(starts)} faktur - tabele strony pominięte")
+            ends = [position for position, _ in starts[1:]] + [len(page_text)]
+            for (position, number), end in zip(starts, ends):
+                segments.append({
+                    'start_page': page_number,
+                    'number': number,
+                    'texts': [page_text[position:end]],
+                    'tables': list(tables) if len(starts) == 1 else [],
+                })
+        return segments
+
+    def _parse_segments(self, filename: str, segments: List[Dict], executor: Optional[ProcessPoolExecutor] = None,
+                        workers: int = 1) -> List[Optional[InvoiceData]]:
+        """Parsuje fragmenty pliku zbiorczego - w puli procesów lub sekwencyjnie (wyniki w kolejności fragmentów)"""
+        if executor is not None and len(segments) >= MULTIPAGE_MIN_PARALLEL_ITEMS:
+            try:
+                chunksize = max(1, len(segments) // (workers * 4))
+                return list(executor.map(partial(_parse_segment_in_worker, self.parser_type, filename),
+                                         segments, chunksize=chunksize))
+            except (OSError, BrokenProcessPool) as e:
+                logger.warning(f"Równoległe parsowanie niedostępne ({e}) - parsuję sekwencyjnie")
+        return [self._parse_segment(filename, segment) for segment in segments]
+
+    def _parse_segment(self, filename: str, segment: Dict) -> Optional[InvoiceData]:
+        """Parsuje jeden fragment pliku zbiorczego; None, gdy to nie faktura lub wystąpił błąd"""
+        text = "".join(page_text + "\n" for page_text in segment['texts'] if page_text)
+        if not self._is_invoice(text):
+            logger.info(f"Strona {segment['start_page']}: fragment nie zawiera faktury - pomijam")
+            return None
+        try:
+            invoice_type = self._detect_invoice_type(text)
+            parser_type = invoice_type.lower() if self.parser_type == 'auto' else self.parser_type
+            parser = self.get_parser(parser_type)
+            parser.filename = filename
+            invoice_data = parser.parse(text, segment['tables'])
+        except Exception as e:
+            logger.error(f"Błąd parsowania faktury ze strony {segment['start_page']}: {e}")
+            return None
+        return self._build_invoice_data(invoice_data, source_page=segment['start_page'])
+
+    def _build_invoice_data(self, invoice_data: Dict, source_page: Optional[int] = None) -> InvoiceData:
+        """Buduje InvoiceData ze słownika zwróconego przez parser"""
         return InvoiceData(
             invoice_number=invoice_data.get('invoice_number'),
             invoice_date=invoice_data.get('invoice_date'),
@@ -287,5 +1022,21 @@ class PDFProcessor:
             vat_total=float(invoice_data.get('summary', {}).get('vat_total', 0)),
             gross_total=float(invoice_data.get('summary', {}).get('gross_total', 0)),
             payment_method=invoice_data.get('payment_method'),
-            payment_date=invoice_data.get('payment_date')
-        )
\ No newline at end of file
+            payment_date=invoice_data.get('payment_date'),
+            source_page=source_page
+        )
+
+# Procesor w procesie roboczym plików zbiorczych (tworzony raz na proces)
+_worker_processor = None
+
+def _get_worker_processor(parser_type: str) -> 'PDFProcessor':
+    global _worker_processor
+    if _worker_processor is None or _worker_processor.parser_type != parser_type:
+        _worker_processor = PDFProcessor(parser_type=parser_type)
+    return _worker_processor
+
+def _extract_page_range_in_worker(parser_type: str, pdf_path: str, first_page: int, last_page: int):
+    return _get_worker_processor(parser_type)._extract_page_range(pdf_path, first_page, last_page)
+
+def _parse_segment_in_worker(parser_type: str, filename: str, segment: Dict) -> Optional[InvoiceData]:
+    return _get_worker_processor(parser_type)._parse_segment(filename, segment)
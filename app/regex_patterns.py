@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Rejestr prekompilowanych wyrażeń regularnych współdzielonych przez parsery
+
+Wzorce są kompilowane raz przy imporcie modułu, dzięki czemu parsowanie
+faktury nie przechodzi przy każdym wywołaniu przez cache modułu re,
+a złożone wzorce dat nie są budowane od nowa dla każdego słowa kluczowego.
+"""
+import re
+
+I = re.IGNORECASE
+
+def _compile_all(patterns, flags=0):
+    """Kompiluje listę wzorców z tymi samymi flagami"""
+    return [re.compile(pattern, flags) for pattern in patterns]
+
+# ---------------------------------------------------------------------------
+# Wspólne pomocnicze
+# ---------------------------------------------------------------------------
+NON_DIGITS = re.compile(r'[^\d]')
+NON_DIGITS_OR_DOT = re.compile(r'[^\d.]')
+NON_AMOUNT_CHARS = re.compile(r'[^\d,.-]')
+WHITESPACE = re.compile(r'\s')
+WHITESPACE_RUN = re.compile(r'\s+')
+DASH_OR_SPACE = re.compile(r'[-\s]')
+DATE_SEPARATOR = re.compile(r'[-/]')
+YEAR_FIRST_DATE = re.compile(r'\d{4}[-/]\d{1,2}[-/]\d{1,2}')
+DAY_FIRST_DATE = re.compile(r'\d{1,2}[-/]\d{1,2}[-/]\d{4}')
+
+# Komórki tabel pozycji
+CELL_NUMERIC_ONLY = re.compile(r'^[\d\s,.-]+$')
+CELL_QUANTITY = re.compile(r'^\d+([.,]\d+)?\s*(szt|kg|l|m|h)?\.?$', I)
+CELL_AMOUNT = re.compile(r'^[\d\s]+[,.]?\d*$')
+CELL_PERCENT = re.compile(r'^\d+%$')
+
+# Adresy
+POSTAL_CITY = re.compile(r'(\d{2}[-\s]\d{3})\s+([A-Za-zĄĆĘŁŃÓŚŹŻąćęłńóśźż\s]+)')
+STREET_ADDRESS = re.compile(r'(ul\.?|ulica)\s+([A-Za-zĄĆĘŁŃÓŚŹŻąćęłńóśźż\s]+\s+\d+[A-Za-z]?(?:/\d+)?)', I)
+STREET_SHORT = re.compile(r'ul\.?\s+([^,\n]+)', I)
+
+# Snapshot białej listy VAT (nip_whitelist)
+SNAPSHOT_FIELD_SEPARATOR = re.compile(r'[;,\t]')
+
+# ---------------------------------------------------------------------------
+# BaseInvoiceParser
+# ---------------------------------------------------------------------------
+BASE_INVOICE_NUMBER = _compile_all([
+    r'(?:Faktura\s+(?:VAT\s+)?(?:nr|Nr\.?)\s*[:\s]?)([A-Za-z0-9\-/]+)',
+    r'(?:FAKTURA\s+(?:VAT\s+)?(?:NR|Nr\.?)\s*[:\s]?)([A-Za-z0-9\-/]+)',
+    r'(?:Invoice\s+(?:number|no\.?)\s*[:\s]?)([A-Za-z0-9\-/]+)',
+    r'(?:Numer\s+faktury\s*[:\s]?)([A-Za-z0-9\-/]+)'
+], I)
+
+DATE_KEYWORDS = {
+    'invoice': ['Data wystawienia', 'Data faktury', 'Invoice date', 'Data dokumentu'],
+    'sale': ['Data sprzedaży', 'Data dostawy', 'Sale date', 'Data wykonania'],
+    'payment': ['Termin płatności', 'Payment due', 'Data płatności']
+}
+
+DATE_VALUE_PATTERNS = [
+    r'(\d{4}[-/.]\d{1,2}[-/.]\d{1,2})',  # YYYY-MM-DD
+    r'(\d{1,2}[-/.]\d{1,2}[-/.]\d{4})',  # DD-MM-YYYY
+    r'(\d{1,2}\s+\w+\s+\d{4})',          # DD Month YYYY
+]
+
+# Słowo kluczowe + pierwsza data po nim - po jednym wzorcu na słowo, w kolejności priorytetu
+DATE_BY_TYPE = {
+    date_type: _compile_all(
+        [f'{keyword}.*?({"|".join(DATE_VALUE_PATTERNS)})' for keyword in keywords],
+        I | re.DOTALL
+    )
+    for date_type, keywords in DATE_KEYWORDS.items()
+}
+
+BASE_NIP = _compile_all([
+    r'NIP[\s:]*([0-9]{3}[-\s]?[0-9]{3}[-\s]?[0-9]{2}[-\s]?[0-9]{2})',
+    r'NIP[\s:]*([0-9]{10})',
+    r'VAT[\s:]*PL([0-9]{10})',
+], I)
+
+VAT_RATE = _compile_all([
+    r'(\d+)\s*%',
+    r'(\d+)%',
+    r'VAT\s+(\d+)',
+])
+
+# ---------------------------------------------------------------------------
+# PDFProcessor
+# ---------------------------------------------------------------------------
+PDF_INVOICE_PATTERNS = {
+    'invoice_number': _compile_all([
+        r'Faktura\s*(?:VAT\s*)?nr\s*[:.]?\s*([^\s\n]+)',
+        r'Faktura\s*nr\s*[:.]?\s*([A-Z0-9\-/\.]+)',
+        r'nr\s*[:.]?\s*([A-Z0-9\-/\.]+)',
+        r'Numer\s*faktury\s*[:.]?\s*([A-Z0-9\-/\.]+)',
+        r'Invoice\s*(?:no\.?)?\s*([A-Z0-9\-/\.]+)'
+    ], I),
+    'date': _compile_all([
+        r'Data\s*wystawienia\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
+        r'Data\s*wystawienia\s*[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
+        r'Wystawiono\s*dnia\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
+        r'z\s*dnia\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})'
+    ], I),
+    'sale_date': _compile_all([
+        r'Data\s*sprzedaży\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
+        r'Data\s*sprzedaży\s*[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
+        r'Data\s*dostawy.*?[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
+        r'Data\s*dostawy.*?[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})'
+    ], I),
+    'nip': _compile_all([
+        r'NIP\s*[:.]?\s*([PL]?\s*[\d\s\-]+)',
+        r'Tax\s*ID\s*[:.]?\s*(\d{10})'
+    ], I),
+    'gross_amount': _compile_all([
+        r'Do\s*zapłaty\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
+        r'Razem\s*do\s*zapłaty\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
+        r'Pozostało\s*do\s*zapłaty\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
+        r'Należność\s*ogółem\s*[:.]?\s*([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
+        r'Suma\s*brutto.*?[:.]?\s*([\d\s]+[,.]?\d*)',
+        r'Wartość\s*brutto.*?([\d\s]+[,.]?\d*)\s*(?:PLN|zł)?',
+        r'Razem.*?brutto.*?([\d\s]+[,.]?\d*)'
+    ], I),
+    'net_amount': _compile_all([
+        r'Wartość\s*netto\s*[:.]?\s*([\d\s]+[,.]?\d*)',
+        r'Razem\s*netto\s*[:.]?\s*([\d\s]+[,.]?\d*)',
+        r'Netto\s*[:.]?\s*([\d\s]+[,.]?\d*)',
+        r'Suma\s*netto\s*[:.]?\s*([\d\s]+[,.]?\d*)'
+    ], I),
+    'vat_amount': _compile_all([
+        r'VAT\s*[:.]?\s*([\d\s]+[,.]?\d*)',
+        r'Kwota\s*VAT\s*[:.]?\s*([\d\s]+[,.]?\d*)',
+        r'Podatek\s*VAT\s*[:.]?\s*([\d\s]+[,.]?\d*)'
+    ], I),
+    'payment_method': _compile_all([
+        r'Sposób\s*(?:płatności|zapłaty)\s*[:.]?\s*([^\n]+)',
+        r'Forma\s*płatności\s*[:.]?\s*([^\n]+)',
+        r'Zapłacono\s*[:.]?\s*([^\n]+)'
+    ], I),
+    'payment_date': _compile_all([
+        r'Termin\s*płatności\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
+        r'Termin\s*płatności\s*[:.]?\s*(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
+        r'Data\s*płatności\s*[:.]?\s*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})'
+    ], I)
+}
+
+# Licznik stron ("Strona 2 z 5") - podział plików zbiorczych na faktury
+PAGE_COUNTER = re.compile(r'(?:Strona|Page)\s+(\d+)\s+(?:z|of)\s+\d+', I)
+
+# Leniwe ładowanie stron: licznik z liczbą stron i kwota do zapłaty (koniec tabeli pozycji)
+PAGE_COUNTER_TOTAL = re.compile(r'(?:Strona|Page)\s+(\d+)\s+(?:z|of)\s+(\d+)', I)
+AMOUNT_DUE = re.compile(r'do\s+zapłaty|amount\s+due|total\s+due', I)
+# Kwota do zapłaty podana w dokumencie (1 234,56 / 1.234,56 / 1234.56)
+AMOUNT_DUE_VALUE = re.compile(
+    r'(?:do\s+zapłaty|amount\s+due|total\s+due)\s*[:\-]?\s*(\d{1,3}(?:[ \u00a0.]\d{3})+(?:[.,]\d{2})?|\d+(?:[.,]\d{2})?)(?!\d)', I
+)
+
+# ---------------------------------------------------------------------------
+# Szablony dostawców (vendor_templates) - wartości pól z obszarów strony
+# ---------------------------------------------------------------------------
+TEMPLATE_NIP_CANDIDATE = re.compile(
+    r'(?<!\d)((?:PL\s?)?(?:\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2}|\d{3}[-\s]?\d{2}[-\s]?\d{2}[-\s]?\d{3}))(?!\d)'
+)
+TEMPLATE_NIP = re.compile(r'^(?:PL\s?)?[\d\s-]+$', I)
+TEMPLATE_AMOUNT = re.compile(r'^-?\d[\d\s.,]*(?:\s*(?:zł|pln|eur|usd|gbp|chf))?$', I)
+TEMPLATE_DATE = re.compile(
+    r'^(?:\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4}|\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2}|\d{1,2}\s+[a-ząćęłńóśźż]+\s+\d{4})$', I
+)
+TEMPLATE_RATE = re.compile(r'^(\d{1,2})(?:[.,]0+)?\s?%?$')
+TEMPLATE_TOTAL_ROW = re.compile(r'^(?:razem|suma|ogółem|łącznie|w\s+tym|total)\b', I)
+
+# ---------------------------------------------------------------------------
+# Rejestr kontrahentów (contractor_registry) - nazwy i eksport z Optimy
+# ---------------------------------------------------------------------------
+# Słowo nazwy (tekst już małymi literami, bez polskich znaków); kropki,
+# łączniki i & wewnątrz słowa zostają: nazwa.pl, o.o, sp.j, b&b
+CONTRACTOR_NAME_TOKEN = re.compile(r'[^\W_]+(?:[.&\-][^\W_]+)*')
+CONTRACTOR_POSTAL_CODE = re.compile(r'^(\d{2})\s*-?\s*(\d{3})$')
+# Nagłówek kolumny CSV / znacznik XML eksportu -> klucz (nr_domu, kod_pocztowy)
+CONTRACTOR_FIELD_KEY = re.compile(r'[^0-9a-z]+')
+
+# ---------------------------------------------------------------------------
+# InvoiceDetector - znaczniki początku faktury w dokumencie zbiorczym
+# ---------------------------------------------------------------------------
+# Wzorce małymi literami, dopasowywane do tekstu po keyword_matcher.fold_case
+# (pozycje znaków bez zmian) - szybsze niż re.IGNORECASE na całym dokumencie
+INVOICE_MARKERS = _compile_all([
+    r'faktura\s+(?:vat\s+)?(?:nr|nr\.?)\s*[:\s]?\s*([a-z0-9\-/]+)',
+    r'invoice\s+(?:number|no\.?)\s*[:\s]?\s*([a-z0-9\-/]+)',
+    r'faktura\s+nr\s*[:\s]?\s*([a-z0-9\-/]+)',
+    r'strona\s+\d+\s+z\s+\d+',
+    r'page\s+\d+\s+of\s+\d+'
+], re.MULTILINE)
+
+# ---------------------------------------------------------------------------
+# UniversalParser v6
+# ---------------------------------------------------------------------------
+V6_INVOICE_NUMBER = _compile_all([
+    r'(\d{5}/naz/\d{2}/\d{4})',
+    r'Faktura\s*(?:VAT\s*)?nr\s*[:.]?\s*([^\s\n]+)',
+    r'Invoice\s*(?:No\.?)?\s*([A-Z0-9\-/\.]+)',
+    r'Korekta\s*nr\s*[:.]?\s*([A-Z0-9\-/\.]+)'
+], I)
+
+V6_CURRENCY = _compile_all([
+    r'Waluta\s*[:.]?\s*(\w{3})',
+    r'Currency\s*[:.]?\s*(\w{3})',
+    r'\b(PLN|EUR|USD|GBP)\b'
+], I)
+
+V6_PAYMENT_METHOD = _compile_all([
+    r'Sposób\s*(?:płatności|zapłaty)\s*[:.]?\s*([^\n]+)',
+    r'Forma\s*płatności\s*[:.]?\s*([^\n]+)',
+    r'Payment\s*method\s*[:.]?\s*([^\n]+)'
+], I)
+
+V6_NIP = re.compile(r'NIP\s*[:.]?\s*([PL]?\s*[\d\s\-]+)', I)
+
+V6_SUMMARY_AMOUNTS = _compile_all([
+    r'do\s+zapłaty[:\s]*([\d\s,.-]+)',
+    r'razem\s+do\s+zapłaty[:\s]*([\d\s,.-]+)',
+    r'kwota\s+brutto[:\s]*([\d\s,.-]+)',
+    r'wartość\s+brutto[:\s]*([\d\s,.-]+)',
+    r'suma\s+brutto[:\s]*([\d\s,.-]+)',
+    r'razem\s+netto[:\s]*([\d\s,.-]+)',
+    r'kwota\s+netto[:\s]*([\d\s,.-]+)',
+    r'podatek\s+vat[:\s]*([\d\s,.-]+)',
+], I)
+
+V6_TEXT_ITEMS = _compile_all([
+    r'(\d+)\s+([^\d\n].*?)\s+(\d+[,\.]?\d*)\s*(szt|kg|l|m|h)?\.?\s+([\d\s]+[,.]\d{2})\s+(\d+%)\s+([\d\s]+[,.]\d{2})'
+], I)
+
+FILENAME_INVOICE_NUMBER = _compile_all([
+    r'(F[VSAKZ][S]?[\-_]*\d+[\-_]\d+[\-_]\d+)',
+    r'(\d+[\-_]\d+[\-_]\d{4})',
+    r'(\d+_\d+_\d+)'
+], I)
+
+# ---------------------------------------------------------------------------
+# BoltParser
+# ---------------------------------------------------------------------------
+BOLT_INVOICE_NUMBER = _compile_all([
+    r'(?:Invoice|Faktura)\s*(?:number|nr|Nr)?\s*[:\s]*([A-Z0-9\-]+)',
+    r'RIDE[-\s]([A-Z0-9]+)',
+    r'Trip\s*ID[:\s]*([A-Z0-9\-]+)'
+], I)
+
+BOLT_DATE = _compile_all([
+    r'Date[:\s]*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{4})',
+    r'(\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2})',
+    r'(\d{1,2}\s+\w+\s+\d{4})'
+])
+
+BOLT_VAT_ID = re.compile(r'VAT\s*(?:ID|number)[:\s]*([A-Z]{2}\d+)', I)
+BOLT_TALLINN_POSTAL = re.compile(r'Tallinn[,\s]+(\d{5})')
+BOLT_BUYER_SECTION = re.compile(
+    r'(?:Customer|Client|Nabywca|Bill to)[:\s]*(.*?)(?:Items|Services|Trip|$)',
+    I | re.DOTALL
+)
+
+BOLT_SERVICE = _compile_all([
+    r'(?:Ride|Trip|Przejazd)\s+(?:from|z)\s+(.*?)(?:to|do)\s+(.*?)(?:\n|$)',
+    r'(?:Service|Usługa)[:\s]*(.*?)(?:\n|$)'
+], I)
+
+BOLT_AMOUNTS = [
+    (re.compile(r'(?:Total|Razem|Amount)[:\s]*([\d.,]+)', I), 'gross'),
+    (re.compile(r'(?:Net|Netto)[:\s]*([\d.,]+)', I), 'net'),
+    (re.compile(r'(?:VAT|Tax)[:\s]*([\d.,]+)', I), 'vat')
+]
+
+# ---------------------------------------------------------------------------
+# ATUTParser
+# ---------------------------------------------------------------------------
+ATUT_SELLER_SECTION = _compile_all([
+    r'Sprzedawca[:\s]*(.*?)(?:Nabywca|Odbiorca|$)',
+    r'SPRZEDAWCA[:\s]*(.*?)(?:NABYWCA|ODBIORCA|$)',
+    r'Wystawca[:\s]*(.*?)(?:Nabywca|Odbiorca|$)'
+], I | re.DOTALL)
+
+ATUT_BUYER_SECTION = _compile_all([
+    r'Nabywca[:\s]*(.*?)(?:Pozycje|Lp\.|Nr\.|$)',
+    r'NABYWCA[:\s]*(.*?)(?:POZYCJE|LP\.|NR\.|$)',
+    r'Odbiorca[:\s]*(.*?)(?:Pozycje|Lp\.|Nr\.|$)'
+], I | re.DOTALL)
+
+ATUT_TEXT_ITEM = re.compile(
+    r'(\d+)\s+(.*?)\s+(\d+[,.]?\d*)\s+(\w+)\s+(\d+[,.]?\d*)\s+(\d+[,.]?\d*)\s+(\d+)%?\s+(\d+[,.]?\d*)\s+(\d+[,.]?\d*)'
+)
@@ -0,0 +1,729 @@
+# -*- coding: utf-8 -*-
+"""
+Szablony układu faktur stałych dostawców (kluczowane NIP sprzedawcy)
+
+Szablon opisuje, gdzie na stronie leżą pola faktury danego dostawcy:
+stronę i prostokąt (bbox) każdego pola nagłówka i podsumowania oraz obszar
+i kolumny tabeli pozycji. Faktura rozpoznanego dostawcy (NIP z szablonem
+na pierwszej stronie) jest odczytywana z wyciętych obszarów stron
+(pdfplumber within_bbox) zamiast przeszukiwania całego tekstu wzorcami
+parsera uniwersalnego. Pole z etykietą (np. "Do zapłaty:") jest przesuwane
+w pionie razem z etykietą, więc podsumowanie pod tabelą o zmiennej liczbie
+pozycji trafia we właściwy obszar.
+
+Wynik, który nie przejdzie kontroli (brak numeru, daty lub pozycji, suma
+pozycji różna od kwoty do zapłaty, inny rozmiar strony), jest odrzucany -
+fakturę parsuje wtedy parser uniwersalny. Szablony działają na warstwie
+tekstowej PDF, skany zawsze trafiają do parsera uniwersalnego.
+
+Szablon powstaje z faktury zweryfikowanej przez użytkownika:
+
+    python vendor_templates.py dump faktura.pdf faktura.json    # wynik parsera do poprawienia
+    python vendor_templates.py learn faktura.pdf faktura.json   # zapis szablonu
+    python vendor_templates.py list
+    python vendor_templates.py remove 1234567890
+
+Szablony to pliki <NIP>.json w katalogu VENDOR_TEMPLATES_DIR.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pdfplumber
+
+import regex_patterns as rx
+from base_parser import InvoiceItem
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Zmienić przy każdej zmianie formatu szablonu
+TEMPLATE_FORMAT_VERSION = 1
+
+# Margines obszaru pola wokół wartości z faktury wzorcowej (punkty PDF)
+FIELD_MARGIN = 2.0
+# Słowa, których położenie w pionie różni się najwyżej o tyle, tworzą jedną linię
+LINE_TOLERANCE = 3.0
+# Najdłuższa wartość pola i najdłuższa etykieta przed nią (w słowach)
+MAX_FIELD_WORDS = 12
+MAX_ANCHOR_WORDS = 4
+# Przerwa między słowami oddzielająca kolumny linii (punkty)
+COLUMN_GAP = 12.0
+# Etykieta pola musi zaczynać się w tym samym miejscu w poziomie (punkty)
+ANCHOR_X_TOLERANCE = 3.0
+# Tabela pozycji może zaczynać się wyżej niż na fakturze wzorcowej (punkty)
+TABLE_SLACK = 60.0
+# Strona musi mieć rozmiar strony faktury wzorcowej (punkty)
+PAGE_SIZE_TOLERANCE = 2.0
+# Dopuszczalna różnica sumy brutto pozycji i kwoty do zapłaty - na pozycję (zaokrąglenia)
+ITEM_SUM_TOLERANCE = Decimal('0.01')
+
+# Pola nagłówka i podsumowania: ścieżka w słowniku faktury -> (rodzaj wartości, słowa etykiety)
+# Słowa etykiety wskazują, które wystąpienie wartości należy do pola
+# (np. ta sama data jako data wystawienia i data sprzedaży)
+TEMPLATE_FIELDS = {
+    'invoice_number': ('text', ('nr', 'numer', 'faktura', 'invoice', 'no')),
+    'invoice_date': ('date', ('wystawienia', 'faktury', 'issue')),
+    'sale_date': ('date', ('sprzedaży', 'dostawy', 'wykonania', 'sale')),
+    'payment_date': ('date', ('termin', 'płatności', 'due')),
+    'payment_method': ('text', ('forma', 'sposób', 'metoda', 'method')),
+    'buyer.name': ('text', ()),
+    'buyer.nip': ('nip', ()),
+    'buyer.address': ('text', ()),
+    'buyer.postal_code': ('text', ()),
+    'buyer.city': ('text', ()),
+    'summary.net_total': ('amount', ('netto', 'net')),
+    'summary.vat_total': ('amount', ('vat', 'podatek', 'tax')),
+    'summary.gross_total': ('amount', ('zapłaty', 'brutto', 'due', 'total')),
+}
+# Pola, bez których szablon nie powstanie, a odczyt szablonem jest odrzucany
+REQUIRED_FIELDS = ('invoice_number', 'invoice_date', 'summary.gross_total')
+
+# Kolumny tabeli pozycji: klucz pozycji -> rodzaj wartości (kolejność = kolejność przypisywania kolumn)
+ITEM_COLUMNS = {
+    'name': 'text',
+    'quantity': 'amount',
+    'unit': 'text',
+    'unit_price_net': 'amount',
+    'net_amount': 'amount',
+    'vat_rate': 'rate',
+    'vat_amount': 'amount',
+    'gross_amount': 'amount',
+}
+
+# Parser uniwersalny - wspólne z nim normalizacja dat, flagi JPK i struktura wyniku
+_universal_parser = None
+
+def _universal():
+    global _universal_parser
+    if _universal_parser is None:
+        from parsers.universal_parser_v6 import UniversalParser
+        _universal_parser = UniversalParser()
+    return _universal_parser
+
+def _normalize_date(raw: str) -> str:
+    # normalize_date rozpoznaje separatory - i /, kropki zamieniamy na -
+    return _universal().normalize_date(raw.strip().replace('.', '-'))
+
+def _normalize_text(value) -> str:
+    return ' '.join(str(value or '').split())
+
+def _parse_amount(raw) -> Optional[Decimal]:
+    """Kwota z tekstu ("17 149,10 PLN", "1.234,56", "99.90") albo None"""
+    if raw is None:
+        return None
+    if not isinstance(raw, str):
+        raw = str(raw)
+    cleaned = rx.NON_AMOUNT_CHARS.sub('', raw)
+    if not any(char.isdigit() for char in cleaned):
+        return None
+    # Separatorem dziesiętnym jest ostatni z separatorów, pozostałe grupują tysiące
+    separator_at = max(cleaned.rfind(','), cleaned.rfind('.'))
+    if separator_at >= 0:
+        cleaned = (cleaned[:separator_at].replace(',', '').replace('.', '')
+                   + '.' + cleaned[separator_at + 1:])
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return None
+
+def _convert(kind: str, raw) -> Optional[object]:
+    """Wartość pola danego rodzaju z tekstu obszaru albo None, gdy tekst nie jest taką wartością"""
+    text = _normalize_text(raw)
+    if not text:
+        return None
+    if kind == 'amount':
+        return _parse_amount(text) if rx.TEMPLATE_AMOUNT.match(text) else None
+    if kind == 'date':
+        return _normalize_date(text) if rx.TEMPLATE_DATE.match(text) else None
+    if kind == 'nip':
+        nip = rx.NON_DIGITS.sub('', text) if rx.TEMPLATE_NIP.match(text) else ''
+        return nip if len(nip) == 10 else None
+    if kind == 'rate':
+        rate = rx.TEMPLATE_RATE.match(text)
+        return int(rate.group(1)) if rate else None
+    return text
+
+def _same_value(kind: str, raw, expected) -> bool:
+    """Czy tekst z PDF to zweryfikowana wartość pola"""
+    value = _convert(kind, raw)
+    if value is None:
+        return False
+    if kind == 'amount':
+        expected_amount = _parse_amount(expected)
+        return expected_amount is not None and abs(value - expected_amount) < Decimal('0.005')
+    if kind == 'date':
+        return value == _normalize_date(str(expected))
+    if kind == 'nip':
+        return value == rx.NON_DIGITS.sub('', str(expected))
+    if kind == 'rate':
+        return value == _convert('rate', str(expected).replace('%', '') + '%')
+    return value.casefold() == _normalize_text(expected).casefold()
+
+def _get_path(data: Dict, path: str):
+    for key in path.split('.'):
+        data = data.get(key) if isinstance(data, dict) else None
+    return data
+
+def _set_path(data: Dict, path: str, value):
+    *parents, key = path.split('.')
+    for parent in parents:
+        data = data.setdefault(parent, {})
+    data[key] = value
+
+def _page_lines(page) -> List[List[Dict]]:
+    """Słowa strony pogrupowane w linie (od góry), w linii od lewej"""
+    lines = []
+    for word in sorted(page.extract_words(), key=lambda word: (word['top'], word['x0'])):
+        if lines and word['top'] - lines[-1][0]['top'] <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    for line in lines:
+        line.sort(key=lambda word: word['x0'])
+    return lines
+
+def _inside(word: Dict, bbox) -> bool:
+    x0, top, x1, bottom = bbox
+    return word['x0'] >= x0 and word['x1'] <= x1 and word['top'] >= top and word['bottom'] <= bottom
+
+def _clamp_bbox(bbox, page) -> Tuple[float, float, float, float]:
+    x0, top, x1, bottom = bbox
+    return (max(0.0, x0), max(0.0, top), min(float(page.width), x1), min(float(page.height), bottom))
+
+def _region_text(page, bbox) -> str:
+    """Tekst obiektów leżących w całości w obszarze strony"""
+    x0, top, x1, bottom = _clamp_bbox(bbox, page)
+    if x1 <= x0 or bottom <= top:
+        return ''
+    return page.within_bbox((x0, top, x1, bottom)).extract_text() or ''
+
+# ---------------------------------------------------------------------------
+# Magazyn szablonów
+# ---------------------------------------------------------------------------
+
+class TemplateStore:
+    """Szablony dostawców wczytywane z katalogu (<NIP>.json), odświeżane po zmianie plików"""
+
+    def __init__(self, templates_dir: Optional[str] = None):
+        templates_dir = templates_dir or get_config().vendor_templates_dir
+        self.templates_dir = Path(templates_dir)
+        if not self.templates_dir.is_absolute():
+            self.templates_dir = Path(__file__).parent.parent / self.templates_dir
+        self.templates: Dict[str, Dict] = {}
+        # (nazwa, rozmiar, mtime_ns) wczytanych plików; None - jeszcze nie wczytano
+        self._signature = None
+
+    def _refresh(self):
+        """Wczytuje szablony ponownie, gdy w katalogu przybył, ubył lub zmienił się plik
+
+        Porównywane są rozmiar i czas modyfikacji każdego pliku - edycja pliku
+        w miejscu nie zmienia czasu modyfikacji katalogu.
+        """
+        signature = []
+        for template_path in sorted(self.templates_dir.glob('*.json')):
+            try:
+                stat = template_path.stat()
+            except OSError:
+                continue
+            signature.append((template_path.name, stat.st_size, stat.st_mtime_ns))
+        signature = tuple(signature)
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self.templates = {}
+        for template_path in (self.templates_dir / name for name, _, _ in signature):
+            try:
+                with open(template_path, 'r', encoding='utf-8') as f:
+                    template = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Uszkodzony szablon dostawcy {template_path.name}: {e}")
+                continue
+            if template.get('version') != TEMPLATE_FORMAT_VERSION or not template.get('nip'):
+                logger.warning(f"Pomijam szablon {template_path.name} w nieobsługiwanym formacie")
+                continue
+            self.templates[template['nip']] = template
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self.templates)
+
+    def get(self, nip: str) -> Optional[Dict]:
+        self._refresh()
+        return self.templates.get(nip)
+
+    def all(self) -> List[Dict]:
+        self._refresh()
+        return [self.templates[nip] for nip in sorted(self.templates)]
+
+    def find(self, text: str) -> Optional[Dict]:
+        """Szablon dostawcy, którego NIP występuje w tekście (zwykle 1. strony) albo None"""
+        self._refresh()
+        if not self.templates or not text:
+            return None
+        for match in rx.TEMPLATE_NIP_CANDIDATE.finditer(text):
+            template = self.templates.get(rx.NON_DIGITS.sub('', match.group(1)))
+            if template is not None:
+                return template
+        return None
+
+    def save(self, template: Dict) -> Path:
+        """Zapisuje szablon atomowo (istniejący szablon dostawcy jest zastępowany)"""
+        self.templates_dir.mkdir(parents=True, exist_ok=True)
+        template_path = self.templates_dir / f"{template['nip']}.json"
+        tmp_path = template_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(template, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, template_path)
+        self._signature = None
+        return template_path
+
+    def remove(self, nip: str) -> bool:
+        try:
+            (self.templates_dir / f"{nip}.json").unlink()
+        except FileNotFoundError:
+            return False
+        self._signature = None
+        return True
+
+    def fingerprint(self) -> str:
+        """Odcisk zawartości szablonów - zmiana szablonu zmienia wynik przetwarzania"""
+        self._refresh()
+        payload = json.dumps(self.templates, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()[:16]
+
+# Magazyn szablonów na proces
+_store = None
+
+def get_template_store() -> TemplateStore:
+    """Zwraca współdzielony magazyn szablonów dla bieżącego procesu"""
+    global _store
+    if _store is None:
+        _store = TemplateStore()
+    return _store
+
+# ---------------------------------------------------------------------------
+# Uczenie szablonu z faktury zweryfikowanej
+# ---------------------------------------------------------------------------
+
+def _field_spec(line: List[Dict], start: int, end: int, page_number: int, page) -> Dict:
+    """Obszar pola w linii - wartość innej faktury może być dłuższa niż na wzorcu
+
+    Obszar zaczyna się tuż za etykietą (albo na początku kolumny, gdy przed
+    wartością jest przerwa) i kończy przed następną kolumną linii, więc
+    obejmuje też słowa tuż za wartością (np. walutę). Etykieta jest kotwicą
+    położenia pola w pionie.
+    """
+    words = line[start:end]
+    anchor_words = []
+    if start > 0 and words[0]['x0'] - line[start - 1]['x1'] <= COLUMN_GAP:
+        x0 = line[start - 1]['x1'] + 0.5
+        anchor_start = start - 1
+        while anchor_start > max(0, start - MAX_ANCHOR_WORDS) and \
+                line[anchor_start]['x0'] - line[anchor_start - 1]['x1'] <= COLUMN_GAP:
+            anchor_start -= 1
+        anchor_words = line[anchor_start:start]
+    else:
+        x0 = words[0]['x0'] - FIELD_MARGIN
+    x1 = float(page.width)
+    for index in range(end, len(line)):
+        if line[index]['x0'] - line[index - 1]['x1'] > COLUMN_GAP:
+            x1 = line[index]['x0'] - 0.5
+            break
+    top = min(word['top'] for word in words) - FIELD_MARGIN
+    bottom = max(word['bottom'] for word in words) + FIELD_MARGIN
+    spec = {'page': page_number, 'bbox': [round(value, 1) for value in _clamp_bbox((x0, top, x1, bottom), page)]}
+    if anchor_words:
+        spec['anchor'] = {
+            'text': ' '.join(word['text'] for word in anchor_words),
+            'x0': round(anchor_words[0]['x0'], 1),
+            'top': round(anchor_words[0]['top'], 1),
+        }
+    return spec
+
+def _learn_field(pages_lines, pages, kind: str, hints, expected, excluded) -> Optional[Dict]:
+    """Znajduje wartość pola na stronach; None, gdy jej nie ma lub jest niejednoznaczna
+
+    excluded to (indeks strony, bbox) tabeli pozycji - jej komórki nie są
+    polami nagłówka ani podsumowania. Wystąpienia z etykietą zawierającą słowo z hints mają pierwszeństwo;
+    pozostałe niejednoznaczności rozstrzyga pierwsze wystąpienie tylko dla
+    pól z etykietami (dla danych nabywcy wynik byłby przypadkowy).
+    """
+    candidates = []
+    for page_index, lines in enumerate(pages_lines):
+        for line in lines:
+            for start in range(len(line)):
+                if excluded and excluded[0] == page_index and _inside(line[start], excluded[1]):
+                    continue
+                for end in range(start + 1, min(len(line), start + MAX_FIELD_WORDS) + 1):
+                    raw = ' '.join(word['text'] for word in line[start:end])
+                    if _same_value(kind, raw, expected):
+                        label = ' '.join(word['text'] for word in line[max(0, start - MAX_ANCHOR_WORDS):start]).lower()
+                        candidates.append((any(hint in label for hint in hints), page_index, line, start, end))
+                        break
+    if not candidates:
+        return None
+    best_score = max(candidate[0] for candidate in candidates)
+    best = [candidate for candidate in candidates if candidate[0] == best_score]
+    if len(best) > 1 and not hints:
+        return None
+    _, page_index, line, start, end = best[0]
+    spec = _field_spec(line, start, end, page_index + 1, pages[page_index])
+    # Pole pod tabelą pozycji (podsumowanie) leży na stronie, na której kończy się tabela
+    if excluded and (page_index > excluded[0] or (page_index == excluded[0] and line[start]['top'] >= excluded[1][3])):
+        spec['after_items'] = True
+    return spec
+
+def _item_value(item: Dict, key: str):
+    if key == 'unit_price_net':
+        return item.get('unit_price_net') or item.get('unit_price')
+    if key == 'name':
+        return item.get('name') or item.get('description')
+    return item.get(key)
+
+def _learn_items(pages, items: List[Dict]) -> Tuple[Optional[Dict], Optional[Tuple[int, Tuple]]]:
+    """Tabela pozycji (strona, obszar, kolumny) na podstawie zweryfikowanych pozycji"""
+    best = None
+    for page_index, page in enumerate(pages):
+        for table in page.find_tables():
+            rows = table.extract()
+            # Nazwa -> indeksy pozycji jeszcze nieprzypisanych do wiersza (nazwy mogą się powtarzać)
+            unmatched = {}
+            for item_index, item in enumerate(items):
+                unmatched.setdefault(_normalize_text(_item_value(item, 'name')).casefold(), []).append(item_index)
+            matched = {}
+            for row_index, row in enumerate(rows):
+                for cell in row:
+                    pending = unmatched.get(_normalize_text(cell).casefold())
+                    if pending:
+                        matched[pending.pop(0)] = row_index
+                        break
+            if matched and (best is None or len(matched) > len(best[3])):
+                best = (page_index, table, rows, matched)
+    if best is None:
+        return None, None
+
+    page_index, table, rows, matched = best
+    column_count = len(rows[0])
+    columns = {}
+    for key, kind in ITEM_COLUMNS.items():
+        scores = [0] * column_count
+        for item_index, row_index in matched.items():
+            expected = _item_value(items[item_index], key)
+            if expected in (None, ''):
+                continue
+            for column, cell in enumerate(rows[row_index][:column_count]):
+                if _same_value(kind, cell, expected):
+                    scores[column] += 1
+        # Najwięcej zgodnych pozycji, przy remisie pierwsza wolna kolumna od lewej
+        free = [column for column in range(column_count) if column not in columns.values()]
+        if free and max(scores[column] for column in free) * 2 >= len(matched) and max(scores) > 0:
+            columns[key] = max(free, key=lambda column: (scores[column], -column))
+    first_item_row = min(matched.values())
+    spec = {
+        'page': page_index + 1,
+        'bbox': [round(value, 1) for value in table.bbox],
+        'column_count': column_count,
+        'columns': columns,
+        'header': [_normalize_text(cell) for cell in rows[first_item_row - 1]] if first_item_row > 0 else [],
+    }
+    return spec, (page_index, table.bbox)
+
+def learn_template(pdf_path: str, invoice_data: Dict) -> Dict:
+    """Buduje szablon dostawcy z PDF i zweryfikowanych danych tej faktury
+
+    invoice_data ma postać wyniku parsera (invoice_number, daty, seller,
+    buyer, items, summary). ValueError, gdy z PDF nie da się odczytać pól
+    wymaganych (NIP sprzedawcy na 1. stronie, numer, data, kwota do zapłaty,
+    tabela pozycji).
+    """
+    seller = dict(invoice_data.get('seller') or {})
+    seller_nip = rx.NON_DIGITS.sub('', str(seller.get('nip') or ''))
+    if len(seller_nip) != 10:
+        raise ValueError("Zweryfikowane dane nie zawierają 10-cyfrowego NIP sprzedawcy")
+    seller['nip'] = seller_nip
+
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = pdf.pages
+        first_page_text = pages[0].extract_text() or ''
+        if not any(rx.NON_DIGITS.sub('', match.group(1)) == seller_nip
+                   for match in rx.TEMPLATE_NIP_CANDIDATE.finditer(first_page_text)):
+            raise ValueError(f"NIP sprzedawcy {seller_nip} nie występuje w warstwie tekstowej 1. strony")
+
+        items_spec, items_region = _learn_items(pages, invoice_data.get('items') or [])
+        if items_spec is None or 'name' not in items_spec['columns'] or not (
+                {'unit_price_net', 'net_amount', 'gross_amount'} & set(items_spec['columns'])):
+            raise ValueError("Nie znaleziono tabeli pozycji z nazwami i kwotami pozycji")
+
+        pages_lines = [_page_lines(page) for page in pages]
+        fields = {}
+        for path, (kind, hints) in TEMPLATE_FIELDS.items():
+            expected = _get_path(invoice_data, path)
+            if expected in (None, '') or (kind == 'amount' and not _parse_amount(expected)):
+                continue
+            spec = _learn_field(pages_lines, pages, kind, hints, expected, items_region)
+            if spec is not None:
+                fields[path] = spec
+        missing = [path for path in REQUIRED_FIELDS if path not in fields]
+        if missing:
+            raise ValueError(f"Nie znaleziono w PDF wartości pól: {', '.join(missing)}")
+        page_size = [round(float(pages[0].width), 1), round(float(pages[0].height), 1)]
+
+    return {
+        'version': TEMPLATE_FORMAT_VERSION,
+        'nip': seller_nip,
+        'name': seller.get('name') or seller_nip,
+        'seller': seller,
+        'currency': invoice_data.get('currency') or 'PLN',
+        'page_size': page_size,
+        'fields': fields,
+        'items': items_spec,
+        'learned_from': os.path.basename(pdf_path),
+        'learned_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+# ---------------------------------------------------------------------------
+# Odczyt faktury szablonem
+# ---------------------------------------------------------------------------
+
+def _anchor_shift(spec: Dict, lines: List[List[Dict]]) -> float:
+    """Przesunięcie w pionie etykiety pola względem faktury wzorcowej (0, gdy brak etykiety)"""
+    anchor = spec.get('anchor')
+    if not anchor:
+        return 0.0
+    anchor_words = anchor['text'].split()
+    shift = None
+    for line in lines:
+        for index in range(len(line) - len(anchor_words) + 1):
+            if abs(line[index]['x0'] - anchor['x0']) > ANCHOR_X_TOLERANCE:
+                continue
+            if [word['text'] for word in line[index:index + len(anchor_words)]] == anchor_words:
+                offset = line[index]['top'] - anchor['top']
+                if shift is None or abs(offset) < abs(shift):
+                    shift = offset
+    return shift or 0.0
+
+def _build_item(row: List, columns: Dict[str, int], lp: int) -> Optional[Dict]:
+    """Pozycja z wiersza tabeli; None dla nagłówka, podsumowania i wierszy bez kwot"""
+    values = {}
+    for key, column in columns.items():
+        cell = row[column] if column < len(row) else None
+        values[key] = _convert(ITEM_COLUMNS[key], cell)
+    name = values.get('name')
+    if not name or rx.TEMPLATE_TOTAL_ROW.match(name):
+        return None
+    if values.get('net_amount') is None and values.get('gross_amount') is None and values.get('unit_price_net') is None:
+        return None
+    if 'vat_rate' in columns and values.get('vat_rate') is None:
+        return None  # stawka nieliczbowa (zw, np) - taką fakturę czyta parser uniwersalny
+
+    item = InvoiceItem()
+    item.lp = lp
+    item.name = name
+    item.unit = values.get('unit') or ''
+    item.quantity = values.get('quantity') or Decimal('1')
+    item.unit_price_net = values.get('unit_price_net') or Decimal('0')
+    item.vat_rate = values['vat_rate'] if values.get('vat_rate') is not None else 23
+    rate = Decimal(item.vat_rate) / Decimal('100')
+    gross = values.get('gross_amount')
+    net = values.get('net_amount')
+    if net is None:
+        net = item.unit_price_net * item.quantity if values.get('unit_price_net') is not None else gross / (1 + rate)
+    item.net_amount = net
+    item.vat_amount = values['vat_amount'] if values.get('vat_amount') is not None else (
+        gross - net if gross is not None else net * rate)
+    item.gross_amount = gross if gross is not None else net + item.vat_amount
+    return item.to_dict()
+
+def _read_items(pages, spec: Dict) -> Tuple[List[Dict], int]:
+    """Pozycje z tabeli na stronie szablonu i jej kontynuacji na kolejnych stronach
+
+    Returns:
+        (pozycje, indeks strony, na której kończy się tabela)
+    """
+    x0, top, x1, _ = spec['bbox']
+    header = [cell.casefold() for cell in spec.get('header') or []]
+    items = []
+    end_page_index = spec['page'] - 1
+    for page_index in range(spec['page'] - 1, len(pages)):
+        page = pages[page_index]
+        region_top = top - TABLE_SLACK if page_index == spec['page'] - 1 else 0.0
+        region = _clamp_bbox((x0 - FIELD_MARGIN, region_top, x1 + FIELD_MARGIN, float(page.height)), page)
+        tables = [table for table in page.within_bbox(region).extract_tables()
+                  if table and len(table[0]) == spec['column_count']]
+        if not tables:
+            break
+        end_page_index = page_index
+        if header:
+            # Tabela z nagłówkiem wzorca, gdy obszar obejmuje też inne tabele o tej liczbie kolumn
+            tables.sort(key=lambda table: not any(
+                [_normalize_text(cell).casefold() for cell in row] == header for row in table[:3]))
+        for row in tables[0]:
+            item = _build_item(row, spec['columns'], len(items) + 1)
+            if item is not None:
+                items.append(item)
+    return items, end_page_index
+
+def _vat_breakdown(items: List[Dict]) -> Dict:
+    breakdown = {}
+    for item in items:
+        rate = f"{item['vat_rate']}%"
+        totals = breakdown.setdefault(rate, {'net': Decimal('0'), 'vat': Decimal('0'), 'gross': Decimal('0')})
+        totals['net'] += Decimal(item['net_amount'])
+        totals['vat'] += Decimal(item['vat_amount'])
+        totals['gross'] += Decimal(item['gross_amount'])
+    return breakdown
+
+def _rejection_reason(invoice_data: Dict) -> Optional[str]:
+    """Powód odrzucenia odczytu szablonem albo None, gdy wynik jest spójny"""
+    missing = [path for path in REQUIRED_FIELDS if not _get_path(invoice_data, path)]
+    if missing:
+        return f"brak pól {', '.join(missing)}"
+    items = invoice_data['items']
+    if not items:
+        return "brak pozycji"
+    gross_total = Decimal(invoice_data['summary']['gross_total'])
+    items_gross = sum(Decimal(item['gross_amount']) for item in items)
+    if abs(items_gross - gross_total) > ITEM_SUM_TOLERANCE * (len(items) + 1):
+        return f"suma pozycji {items_gross:.2f} różna od kwoty do zapłaty {gross_total:.2f}"
+    return None
+
+def extract_with_template(pages, template: Dict, first_page_text: str = '') -> Optional[Dict]:
+    """Odczytuje fakturę z obszarów stron według szablonu dostawcy
+
+    pages to strony pdfplumber dokumentu. Zwraca słownik w postaci wyniku
+    parsera uniwersalnego albo None, gdy układ nie pasuje do szablonu lub
+    wynik nie przechodzi kontroli - fakturę parsuje wtedy parser uniwersalny.
+    """
+    if not pages:
+        return None
+    width, height = template['page_size']
+    if abs(float(pages[0].width) - width) > PAGE_SIZE_TOLERANCE or \
+            abs(float(pages[0].height) - height) > PAGE_SIZE_TOLERANCE:
+        logger.debug(f"Szablon {template['nip']}: inny rozmiar strony")
+        return None
+    # Korekty mają u dostawców inny układ niż faktury wzorcowe
+    if 'korekt' in first_page_text.lower():
+        return None
+
+    invoice_data = _universal()._get_empty_invoice_data()
+    invoice_data['seller'].update(template['seller'])
+    invoice_data['currency'] = template.get('currency', 'PLN')
+    invoice_data['jpk_flags'] = _universal()._extract_jpk_flags(first_page_text)
+
+    if template['items']['page'] > len(pages):
+        return None
+    invoice_data['items'], items_end_index = _read_items(pages, template['items'])
+
+    page_lines = {}
+    for path, spec in template['fields'].items():
+        page_index = items_end_index if spec.get('after_items') else spec['page'] - 1
+        if page_index >= len(pages):
+            continue
+        page = pages[page_index]
+        if spec.get('anchor') and page_index not in page_lines:
+            page_lines[page_index] = _page_lines(page)
+        shift = _anchor_shift(spec, page_lines.get(page_index, []))
+        x0, top, x1, bottom = spec['bbox']
+        value = _convert(TEMPLATE_FIELDS[path][0], _region_text(page, (x0, top + shift, x1, bottom + shift)))
+        if value is not None:
+            _set_path(invoice_data, path, str(value) if isinstance(value, Decimal) else value)
+
+    breakdown = _vat_breakdown(invoice_data['items'])
+    invoice_data['summary']['vat_breakdown'] = breakdown
+    # Sumy, których szablon nie odczytuje ze strony, liczone z pozycji
+    for path, part in (('summary.net_total', 'net'), ('summary.vat_total', 'vat')):
+        if path not in template['fields']:
+            _set_path(invoice_data, path, str(sum((totals[part] for totals in breakdown.values()), Decimal('0'))))
+    if not invoice_data['payment_method']:
+        invoice_data['payment_method'] = 'przelew'
+
+    reason = _rejection_reason(invoice_data)
+    if reason:
+        logger.info(f"Szablon dostawcy {template['name']} ({template['nip']}) odrzucony: {reason}")
+        return None
+    return invoice_data
+
+# ---------------------------------------------------------------------------
+# Wiersz poleceń
+# ---------------------------------------------------------------------------
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} nie jest serializowalny do JSON")
+
+def main():
+    parser = argparse.ArgumentParser(description='Szablony układu faktur dostawców (kluczowane NIP sprzedawcy)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    dump = commands.add_parser('dump', help='Zapisz wynik parsera faktury do JSON (do weryfikacji przed learn)')
+    dump.add_argument('pdf', help='Plik PDF faktury')
+    dump.add_argument('json', nargs='?', help='Plik wyjściowy JSON (domyślnie obok PDF)')
+    learn = commands.add_parser('learn', help='Zbuduj szablon dostawcy z faktury i jej zweryfikowanych danych')
+    learn.add_argument('pdf', help='Plik PDF faktury')
+    learn.add_argument('json', help='Zweryfikowane dane faktury (JSON w postaci wyniku dump)')
+    commands.add_parser('list', help='Wypisz zapisane szablony')
+    remove = commands.add_parser('remove', help='Usuń szablon dostawcy')
+    remove.add_argument('nip', help='NIP sprzedawcy')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = get_template_store()
+
+    if args.command == 'dump':
+        from pdf_processor import PDFProcessor
+        processor = PDFProcessor(parser_type='auto')
+        text, tables = processor.extract_text_and_tables(args.pdf)
+        if not processor._is_invoice(text):
+            logger.error(f"{args.pdf} nie wygląda na fakturę")
+            return 1
+        invoice_parser = processor.get_parser(processor._detect_invoice_type(text).lower())
+        invoice_parser.filename = os.path.basename(args.pdf)
+        invoice_data = invoice_parser.parse(text, tables)
+        json_path = args.json or str(Path(args.pdf).with_suffix('.json'))
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(invoice_data, f, ensure_ascii=False, indent=2, default=_json_default)
+        logger.info(f"Zapisano {json_path} - popraw błędne wartości i uruchom: learn {args.pdf} {json_path}")
+        return 0
+
+    if args.command == 'learn':
+        with open(args.json, 'r', encoding='utf-8') as f:
+            invoice_data = json.load(f)
+        try:
+            template = learn_template(args.pdf, invoice_data)
+        except ValueError as e:
+            logger.error(f"Nie udało się zbudować szablonu: {e}")
+            return 1
+        template_path = store.save(template)
+        logger.info(f"Zapisano szablon {template['name']} ({template['nip']}): {template_path}")
+        logger.info(f"Pola: {', '.join(template['fields'])}; kolumny pozycji: {', '.join(template['items']['columns'])}")
+        # Kontrola: szablon musi odczytać fakturę, z której powstał
+        with pdfplumber.open(args.pdf) as pdf:
+            check = extract_with_template(pdf.pages, template, pdf.pages[0].extract_text() or '')
+        if check is None:
+            logger.warning("Szablon nie odczytuje poprawnie faktury wzorcowej - faktury dostawcy trafią do parsera uniwersalnego")
+        return 0
+
+    if args.command == 'list':
+        for template in store.all():
+            print(f"{template['nip']}  {template['name']}  (pola: {len(template['fields'])}, "
+                  f"wzorzec: {template.get('learned_from', '-')}, {template.get('learned_at', '-')})")
+        return 0
+
+    if args.command == 'remove':
+        if not store.remove(args.nip):
+            logger.error(f"Brak szablonu dla NIP {args.nip}")
+            return 1
+        logger.info(f"Usunięto szablon {args.nip}")
+        return 0
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Demon obserwujący katalog wejściowy (INPUT_DIR)
+
+Nowe pliki PDF są wykrywane przez watchdog (inotify na Linuksie), a bez
+niego przez okresowe skanowanie katalogu (WATCH_POLL_INTERVAL). Plik trafia
+do przetwarzania dopiero, gdy jego rozmiar i czas modyfikacji nie zmieniają
+się przez WATCH_DEBOUNCE sekund - kopiowany plik nie jest czytany w połowie.
+Pliki przetwarza stała pula procesów z załadowanym parserem i mapperem, XML
+zapisywany jest do OUTPUT_DIR, a przetworzony PDF przenoszony do
+PROCESSED_DIR (nieudany do PROCESSED_DIR/bledy, odrzucony przez sondę
+pierwszej strony jako niebędący fakturą - do PROCESSED_DIR/nie_faktury).
+"""
+
+import os
+import time
+import queue
+import signal
+import logging
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config import get_config
+from main_multi import _init_worker, process_single_pdf
+from batch_progress import format_probe_summary
+from xml_generator import XMLGenerator
+from worker_pool import WarmWorkerPool
+
+# watchdog jest opcjonalny - bez niego katalog jest skanowany okresowo
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Podkatalog PROCESSED_DIR na pliki, których nie udało się przetworzyć
+FAILED_SUBDIR = 'bledy'
+# Podkatalog PROCESSED_DIR na pliki odrzucone przez sondę pierwszej strony (umowy, WZ, regulaminy)
+REJECTED_SUBDIR = 'nie_faktury'
+# Odstęp pętli głównej (sprawdzanie gotowości plików i wyników puli)
+TICK_SECONDS = 0.25
+# Pełne skanowanie katalogu także przy watchdog - zabezpieczenie przed zgubionymi zdarzeniami
+RESCAN_INTERVAL = 60
+
+def _resolve_dir(path: str) -> Path:
+    """Ścieżki względne z config.ini liczone są od katalogu projektu"""
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = Path(__file__).parent.parent / resolved
+    return resolved
+
+def _is_pdf(path: Path) -> bool:
+    return path.suffix.lower() == '.pdf' and not path.name.startswith('.')
+
+def process_pdf_to_xml(pdf_path: str, output_file: str, parser_type: str) -> Tuple[bool, Optional[str], dict]:
+    """Przetwarza PDF w procesie roboczym i zapisuje XML; zwraca (sukces, błąd, statystyki)"""
+    comarch_data, _, error, stats = process_single_pdf(Path(pdf_path), parser_type)
+    if comarch_data is None:
+        return False, error, stats
+    try:
+        xml_content = XMLGenerator().generate_xml(comarch_data)
+        # Zapis do pliku tymczasowego i podmiana - odbiorca nie widzi niepełnego XML
+        output_path = Path(output_file)
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8-sig') as f:
+            f.write(xml_content)
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        logger.error(f"  ❌ Błąd zapisu XML dla {Path(pdf_path).name}: {e}")
+        return False, str(e), stats
+    return True, None, stats
+
+if WATCHDOG_AVAILABLE:
+    class _PdfEventHandler(FileSystemEventHandler):
+        """Przekazuje ścieżki utworzonych, zmienionych i przeniesionych plików do kolejki"""
+
+        def __init__(self, events: queue.Queue):
+            self.events = events
+
+        def on_created(self, event):
+            if not event.is_directory:
+                self.events.put(event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                self.events.put(event.src_path)
+
+        def on_moved(self, event):
+            if not event.is_directory:
+                self.events.put(event.dest_path)
+
+class WatchFolderDaemon:
+    """Obserwuje katalog wejściowy i przetwarza nowe PDF w ciepłej puli procesów"""
+
+    def __init__(self, input_dir=None, output_dir=None, processed_dir=None, parser_type: str = 'universal',
+                 workers: Optional[int] = None, debounce: Optional[float] = None,
+                 poll_interval: Optional[float] = None, use_watchdog: bool = True, use_cache: bool = True):
+        config = get_config()
+        self.input_dir = _resolve_dir(input_dir or config.input_dir)
+        self.output_dir = _resolve_dir(output_dir or config.output_dir)
+        self.processed_dir = _resolve_dir(processed_dir or config.processed_dir)
+        self.parser_type = parser_type
+        self.workers = config.watch_workers if workers is None else workers
+        self.debounce = config.watch_debounce if debounce is None else debounce
+        self.poll_interval = config.watch_poll_interval if poll_interval is None else poll_interval
+        self.use_watchdog = use_watchdog and WATCHDOG_AVAILABLE
+        self.use_cache = use_cache
+
+        # ścieżka -> (rozmiar, mtime_ns, czas ostatniej zmiany) dla plików czekających na stabilizację
+        self.pending: Dict[Path, Tuple[int, int, float]] = {}
+        # ścieżka -> czas zlecenia
+        self.in_flight: Dict[Path, float] = {}
+        self.events: queue.Queue = queue.Queue()
+        self.processed = 0
+        self.failed = 0
+        # Sonda pierwszej strony: pliki ocenione, odrzucone i szacowany zaoszczędzony czas
+        self.probed = 0
+        self.rejected = 0
+        self.probe_saved_seconds = 0.0
+        self._stop = False
+
+    def stop(self, *_):
+        """Kończy pętlę główną (również z obsługi sygnału)"""
+        self._stop = True
+
+    def _scan(self):
+        """Dodaje do oczekujących wszystkie PDF z katalogu wejściowego"""
+        with os.scandir(self.input_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    self._add_candidate(Path(entry.path))
+
+    def _add_candidate(self, path: Path):
+        if _is_pdf(path) and path.parent == self.input_dir and path not in self.in_flight \
+                and path not in self.pending:
+            self.pending[path] = (-1, -1, time.monotonic())
+
+    def _drain_events(self, timeout: float):
+        """Odbiera zdarzenia watchdog (czeka najwyżej timeout sekund na pierwsze)"""
+        try:
+            self._add_candidate(Path(self.events.get(timeout=timeout)))
+            while True:
+                self._add_candidate(Path(self.events.get_nowait()))
+        except queue.Empty:
+            pass
+
+    def _collect_ready(self):
+        """Zwraca pliki, których rozmiar i mtime nie zmieniły się przez czas debounce"""
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, changed_at) in list(self.pending.items()):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                del self.pending[path]  # plik usunięty lub przeniesiony przed przetworzeniem
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                self.pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+            elif now - changed_at >= self.debounce:
+                del self.pending[path]
+                ready.append(path)
+        return ready
+
+    def _submit(self, pool, pdf_path: Path):
+        output_file = self.output_dir / (pdf_path.stem + ".xml")
+        logger.info(f"📥 Nowy plik: {pdf_path.name}")
+        pool.submit(pdf_path, process_pdf_to_xml, str(pdf_path), str(output_file), self.parser_type)
+        self.in_flight[pdf_path] = time.monotonic()
+
+    def _move_to(self, pdf_path: Path, target_dir: Path) -> Path:
+        """Przenosi PDF; przy kolizji nazw dodaje znacznik czasu"""
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = target_dir / pdf_path.name
+        if target.exists():
+            target = target_dir / f"{pdf_path.stem}_{datetime.now():%Y%m%d_%H%M%S_%f}{pdf_path.suffix}"
+        os.replace(pdf_path, target)
+        return target
+
+    def _collect_results(self, pool):
+        """Odbiera zakończone zadania puli i przenosi pliki PDF"""
+        for pdf_path, completed, result in pool.collect(timeout=0):
+            elapsed = time.monotonic() - self.in_flight.pop(pdf_path)
+            success, error, stats = result if completed else (False, result, {})
+            if stats.get('probed'):
+                self.probed += 1
+            try:
+                if stats.get('probe_rejected'):
+                    self.rejected += 1
+                    self.probe_saved_seconds += stats.get('probe_saved_seconds', 0.0)
+                    self._move_to(pdf_path, self.processed_dir / REJECTED_SUBDIR)
+                    logger.info(f"⏭️ {pdf_path.name}: {error} - przeniesiono do {REJECTED_SUBDIR}/")
+                elif success:
+                    self.processed += 1
+                    self._move_to(pdf_path, self.processed_dir)
+                    logger.info(f"✅ {pdf_path.name} → {pdf_path.stem}.xml ({elapsed:.1f} s)")
+                else:
+                    self.failed += 1
+                    self._move_to(pdf_path, self.processed_dir / FAILED_SUBDIR)
+                    logger.error(f"❌ {pdf_path.name}: {error} - przeniesiono do {FAILED_SUBDIR}/")
+            except OSError as e:
+                logger.error(f"Nie udało się przenieść {pdf_path.name}: {e}")
+
+    def run(self, once: bool = False):
+        """Pętla główna; once=True przetwarza bieżącą zawartość katalogu i kończy"""
+        for directory in (self.input_dir, self.output_dir, self.processed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        observer = None
+        if self.use_watchdog and not once:
+            observer = Observer()
+            observer.schedule(_PdfEventHandler(self.events), str(self.input_dir), recursive=False)
+            observer.start()
+            mode = "watchdog"
+        else:
+            mode = f"skanowanie co {self.poll_interval:g} s"
+        logger.info(f"👀 Obserwuję {self.input_dir} ({mode}), XML → {self.output_dir}, "
+                    f"przetworzone → {self.processed_dir}")
+
+        cache_enabled = None if self.use_cache else False
+        pool = WarmWorkerPool(self.workers or os.cpu_count() or 1, initializer=_init_worker,
+                              initargs=(self.parser_type, cache_enabled, False))
+        try:
+            # Pliki, które pojawiły się, gdy demon nie działał
+            self._scan()
+            last_scan = time.monotonic()
+            while not self._stop:
+                if observer is not None:
+                    self._drain_events(TICK_SECONDS)
+                    rescan_interval = RESCAN_INTERVAL
+                else:
+                    time.sleep(TICK_SECONDS)
+                    rescan_interval = self.poll_interval
+                if not once and time.monotonic() - last_scan >= rescan_interval:
+                    self._scan()
+                    last_scan = time.monotonic()
+
+                for pdf_path in self._collect_ready():
+                    self._submit(pool, pdf_path)
+                self._collect_results(pool)
+
+                if once and not self.pending and not self.in_flight:
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            # Przerwane pliki zostają w katalogu wejściowym i zostaną przetworzone po restarcie
+            pool.terminate()
+            if self.in_flight:
+                logger.warning(f"Przerwano {len(self.in_flight)} plików w trakcie - zostają w {self.input_dir}")
+
+        logger.info("=" * 50)
+        logger.info("PODSUMOWANIE:")
+        logger.info(f"✅ Przetworzone pomyślnie: {self.processed}")
+        logger.info(f"❌ Niepowodzenia: {self.failed}")
+        if self.rejected:
+            logger.info(f"⏭️ Pominięte (nie są fakturami): {self.rejected}")
+        if self.probed:
+            logger.info(format_probe_summary(self.probed, self.rejected, self.probe_saved_seconds))
+        logger.info("=" * 50)
+
+def main():
+    """Uruchamia demon obserwujący katalog wejściowy"""
+    parser = argparse.ArgumentParser(description='Demon konwertujący nowe faktury PDF z katalogu wejściowego do XML')
+    parser.add_argument('--input-dir', help='Katalog obserwowany (domyślnie INPUT_DIR z config.ini)')
+    parser.add_argument('--output-dir', help='Katalog na pliki XML (domyślnie OUTPUT_DIR)')
+    parser.add_argument('--processed-dir', help='Katalog na przetworzone PDF (domyślnie PROCESSED_DIR)')
+    parser.add_argument('--parser', help='Parser do użycia (universal, atut, bolt)',
+                       default='universal')
+    parser.add_argument('--workers', type=int, help='Liczba procesów roboczych (domyślnie WATCH_WORKERS)')
+    parser.add_argument('--poll', action='store_true',
+                       help='Skanuj katalog okresowo zamiast używać watchdog')
+    parser.add_argument('--once', action='store_true',
+                       help='Przetwórz pliki obecne w katalogu i zakończ')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Nie używaj cache ekstrakcji tekstu i tabel')
+
+    args = parser.parse_args()
+
+    if not args.poll and not WATCHDOG_AVAILABLE:
+        logger.info("Brak modułu watchdog - katalog będzie skanowany okresowo (pip install watchdog)")
+
+    daemon = WatchFolderDaemon(args.input_dir, args.output_dir, args.processed_dir, args.parser,
+                               workers=args.workers, use_watchdog=not args.poll,
+                               use_cache=not args.no_cache)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run(once=args.once)
+
+if __name__ == '__main__':
+    main()
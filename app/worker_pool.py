@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Pula ciepłych procesów roboczych
+
+Każdy proces roboczy jest inicjalizowany raz (parser, mapper, model spaCy)
+i dostaje zadania pojedynczo przez własny potok. Procesy nie współdzielą
+blokad kolejki jak w multiprocessing.Pool - zabicie jednego procesu
+(sygnał, awaria biblioteki natywnej) nie blokuje pozostałych, a pula
+zgłasza błąd zadania i uruchamia proces w jego miejsce.
+
+Plik przetwarzany dłużej niż WORKER_TASK_TIMEOUT sekund jest oznaczany jako
+przekroczenie czasu, a jego proces zabijany i zastępowany. Procesy są też
+wymieniane po WORKER_MAX_TASKS zadaniach lub gdy ich RSS po zadaniu
+przekracza WORKER_MAX_RSS_MB - długie partie mają przewidywalny czas
+i zużycie pamięci.
+"""
+import logging
+import signal
+import time
+from collections import deque
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
+from typing import Any, Callable, List, Optional, Tuple
+
+from config import get_config
+from memory_monitor import get_rss_mb
+
+logger = logging.getLogger(__name__)
+
+# Komunikat procesu roboczego po inicjalizacji - od tej chwili liczy się limit czasu zadań
+WORKER_READY = 'ready'
+
+def _worker_main(conn, initializer: Optional[Callable], initargs: tuple):
+    """Pętla procesu roboczego: odbiera (funkcja, argumenty), odsyła (sukces, wynik, RSS w MB)"""
+    # Ctrl-C obsługuje proces główny (zatrzymuje pulę); obsługa SIGTERM
+    # odziedziczona po procesie głównym nie dotyczy procesu roboczego
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send(WORKER_READY)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        func, args = task
+        try:
+            result = (True, func(*args))
+        except Exception as e:
+            result = (False, f"{type(e).__name__}: {e}")
+        conn.send(result + (get_rss_mb(),))
+    conn.close()
+
+class _Worker:
+    """Proces roboczy z potokiem i bieżącym zadaniem"""
+
+    def __init__(self, initializer, initargs):
+        self.conn, child_conn = Pipe()
+        self.process = Process(target=_worker_main, args=(child_conn, initializer, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.tag = None
+        self.started_at = 0.0
+        self.tasks_done = 0
+
+    @property
+    def busy(self) -> bool:
+        return self.tag is not None
+
+    def stop(self, timeout: float = 5.0):
+        """Kończy proces: łagodnie (sentinel), a gdy nie reaguje - kill"""
+        if self.process.is_alive() and not self.busy:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class WarmWorkerPool:
+    """Pula procesów roboczych zainicjalizowanych raz i przetwarzających zadania pojedynczo
+
+    Zadania identyfikuje dowolny znacznik (tag); wyniki odbiera się metodą
+    collect() w kolejności zakończenia, jako (tag, sukces, wynik lub opis błędu).
+    Limity (task_timeout, max_tasks, max_rss_mb) domyślnie pochodzą z config.ini,
+    0 wyłącza limit.
+    """
+
+    def __init__(self, processes: int, initializer: Optional[Callable] = None, initargs: tuple = (),
+                 task_timeout: Optional[float] = None, max_tasks: Optional[int] = None,
+                 max_rss_mb: Optional[int] = None):
+        config = get_config()
+        self.task_timeout = config.worker_task_timeout if task_timeout is None else task_timeout
+        self.max_tasks = config.worker_max_tasks if max_tasks is None else max_tasks
+        self.max_rss_mb = config.worker_max_rss_mb if max_rss_mb is None else max_rss_mb
+        self.initializer = initializer
+        self.initargs = initargs
+        self.queue = deque()
+        self.workers: List[_Worker] = [_Worker(initializer, initargs) for _ in range(max(1, processes))]
+        self._closed = False
+        # Znaczniki zadań przerwanych po przekroczeniu czasu i liczba wymienionych procesów
+        self.timed_out: List[Any] = []
+        self.recycled = 0
+        # Kolejne nieudane inicjalizacje (np. błąd ładowania parsera) - przerywają pracę puli
+        self._init_failures = 0
+
+    def submit(self, tag: Any, func: Callable, *args):
+        """Dodaje zadanie do kolejki i przekazuje je wolnemu procesowi"""
+        self.queue.append((tag, func, args))
+        self._dispatch()
+
+    @property
+    def pending(self) -> int:
+        """Liczba zadań oczekujących i w trakcie przetwarzania"""
+        return len(self.queue) + sum(1 for worker in self.workers if worker.busy)
+
+    def _dispatch(self):
+        for index in range(len(self.workers)):
+            if not self.queue:
+                return
+            worker = self.workers[index]
+            if worker.busy or not worker.ready:
+                continue
+            if not worker.process.is_alive():
+                self._replace(index)  # proces zakończony poza zadaniem (np. sygnałem)
+                continue
+            tag, func, args = self.queue.popleft()
+            worker.tag = tag
+            worker.started_at = time.monotonic()
+            try:
+                worker.conn.send((func, args))
+            except OSError:
+                pass  # proces zakończył się przed odebraniem zadania - zgłosi to collect()
+
+    def _replace(self, index: int, graceful: bool = False):
+        """Zatrzymuje proces i, jeśli pula działa, uruchamia nowy w jego miejsce
+
+        graceful=True (wolny proces wymieniany po limicie zadań lub RSS) - proces
+        kończy się sam po sentinelu; inaczej (zawieszony lub martwy) - kill.
+        """
+        if graceful:
+            self.workers[index].stop()
+        else:
+            self.workers[index].stop(timeout=0)
+        self.workers[index].tag = None
+        if not self._closed:
+            self.workers[index] = _Worker(self.initializer, self.initargs)
+
+    def _recycle_reason(self, worker: _Worker, rss_mb: Optional[float]) -> Optional[str]:
+        if self.max_tasks and worker.tasks_done >= self.max_tasks:
+            return f"po {worker.tasks_done} zadaniach"
+        if self.max_rss_mb and rss_mb is not None and rss_mb > self.max_rss_mb:
+            return f"RSS {rss_mb:.0f} MB > {self.max_rss_mb} MB"
+        return None
+
+    def _handle_ready(self, index: int):
+        """Odbiera komunikat gotowości procesu albo obsługuje nieudaną inicjalizację"""
+        worker = self.workers[index]
+        try:
+            worker.conn.recv()
+            worker.ready = True
+            self._init_failures = 0
+        except (EOFError, OSError):
+            worker.process.join()
+            self._init_failures += 1
+            logger.error(f"Inicjalizacja procesu roboczego nie powiodła się (kod {worker.process.exitcode})")
+            if self._init_failures >= len(self.workers):
+                raise RuntimeError("Nie udało się zainicjalizować procesów roboczych")
+            self._replace(index)
+
+    def collect(self, timeout: Optional[float] = None) -> List[Tuple[Any, bool, Any]]:
+        """Zwraca zakończone zadania (czeka najwyżej timeout sekund na pierwsze)"""
+        busy = [worker for worker in self.workers if worker.busy]
+        # Procesy w trakcie inicjalizacji obserwujemy tylko, gdy czekają na nie zadania
+        warming = [worker for worker in self.workers if not worker.ready] if self.queue else []
+        if not busy and not warming:
+            return []
+        if self.task_timeout and busy:
+            # Nie czekamy dłużej niż do najbliższego przekroczenia limitu czasu
+            until_deadline = max(0.0, min(worker.started_at for worker in busy) + self.task_timeout - time.monotonic())
+            timeout = until_deadline if timeout is None else min(timeout, until_deadline)
+        # Gotowy potok = wynik lub gotowość; gotowy sentinel procesu = proces zakończył się
+        watched = busy + warming
+        ready = set(wait([worker.conn for worker in watched] + [worker.process.sentinel for worker in watched], timeout))
+
+        for index, worker in enumerate(self.workers):
+            if not worker.ready and not worker.busy and (worker.conn in ready or worker.process.sentinel in ready):
+                self._handle_ready(index)
+
+        now = time.monotonic()
+        results = []
+        for index, worker in enumerate(self.workers):
+            if not worker.busy:
+                continue
+            tag = worker.tag
+            if worker.conn in ready or worker.process.sentinel in ready:
+                try:
+                    success, value, rss_mb = worker.conn.recv()
+                except (EOFError, OSError):
+                    worker.process.join()
+                    success, value = False, f"Proces roboczy zakończył się nieoczekiwanie (kod {worker.process.exitcode})"
+                    logger.error(f"{value} podczas zadania {tag}")
+                    self._replace(index)
+                else:
+                    worker.tag = None
+                    worker.tasks_done += 1
+                    reason = self._recycle_reason(worker, rss_mb)
+                    if reason and not self._closed:
+                        logger.info(f"🔁 Wymiana procesu roboczego ({reason})")
+                        self.recycled += 1
+                        self._replace(index, graceful=True)
+            elif self.task_timeout and now - worker.started_at >= self.task_timeout:
+                success, value = False, f"Przekroczono limit czasu przetwarzania ({self.task_timeout:g} s)"
+                logger.error(f"⏱️ {value}: {tag} - proces roboczy zostanie zastąpiony")
+                self.timed_out.append(tag)
+                self._replace(index)
+            else:
+                continue
+            results.append((tag, success, value))
+
+        if not self._closed:
+            self._dispatch()
+        return results
+
+    def close(self):
+        """Czeka na zakończenie bieżących zadań i zatrzymuje procesy (zadania w kolejce są porzucane)"""
+        self._closed = True
+        self.queue.clear()
+        while any(worker.busy for worker in self.workers):
+            self.collect()
+        for worker in self.workers:
+            worker.stop()
+
+    def terminate(self):
+        """Natychmiast zatrzymuje wszystkie procesy (bieżące zadania są przerywane)"""
+        self._closed = True
+        self.queue.clear()
+        for worker in self.workers:
+            worker.tag = None
+            worker.stop(timeout=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.terminate()
+        return False
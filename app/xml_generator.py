@@ -2,18 +2,31 @@
 from lxml import etree
 import logging
 from datetime import datetime
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-class XMLGenerator:
-    def __init__(self):
-        self.xsd_schema = None
+# Schemat leży w katalogu projektu - niezależnie od katalogu bieżącego
+XSD_SCHEMA_PATH = Path(__file__).resolve().parent.parent / 'comarch_schema.xsd'
+
+# Skompilowany schemat XSD współdzielony w obrębie procesu
+_xsd_schema = None
+_xsd_schema_loaded = False
+
+def get_xsd_schema():
+    """Zwraca skompilowany schemat XSD (kompilowany leniwie, raz na proces) albo None"""
+    global _xsd_schema, _xsd_schema_loaded
+    if not _xsd_schema_loaded:
+        _xsd_schema_loaded = True
         try:
-            with open('comarch_schema.xsd', 'rb') as f:
-                schema_root = etree.parse(f)
-                self.xsd_schema = etree.XMLSchema(schema_root)
+            _xsd_schema = etree.XMLSchema(etree.parse(str(XSD_SCHEMA_PATH)))
         except Exception as e:
             logger.warning(f"Nie udało się załadować schematu XSD: {e}")
+    return _xsd_schema
+
+class XMLGenerator:
+    def __init__(self):
+        self.xsd_schema = get_xsd_schema()
 
     def validate_xml(self, xml_str: str) -> bool:
         """Waliduje XML względem schematu XSD"""
@@ -28,8 +41,13 @@ class XMLGenerator:
             logger.error(f"Błąd walidacji XML: {e}")
             return False
 
-    def generate_xml(self, comarch_data) -> str:
-        """Generuje XML zgodny z formatem Comarch ERP Optima"""
+    def generate_xml(self, comarch_data, validate: bool = True) -> str:
+        """Generuje XML zgodny z formatem Comarch ERP Optima
+
+        Args:
+            comarch_data: Dane faktury w formacie Comarch
+            validate: Czy walidować wynik względem schematu XSD
+        """
         root = etree.Element("Dokumenty")
         dokument = etree.SubElement(root, "Dokument")
         dokument.set("Typ", comarch_data.document_type)
@@ -112,7 +130,7 @@ class XMLGenerator:
             encoding='UTF-8'
         ).decode('utf-8')
         
-        if not self.validate_xml(xml_str):
+        if validate and not self.validate_xml(xml_str):
             logger.error("Wygenerowany XML nie przeszedł walidacji")
             raise ValueError("Niepoprawny XML")
         
@@ -3,20 +3,44 @@
 Generator XML dla wielu faktur w jednym pliku - format Comarch ERP Optima
 """
 from lxml import etree
+import codecs
 import logging
+import os
+import sys
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from xml_generator import get_xsd_schema
+
+XML_DECLARATION = b"<?xml version='1.0' encoding='UTF-8'?>\n"
 
 logger = logging.getLogger(__name__)
 
+class XMLValidationError(ValueError):
+    """Błąd walidacji XSD z listą odrzuconych faktur
+
+    Każdy element failures to słownik z kluczami: index, invoice_number,
+    source_file, error.
+    """
+
+    def __init__(self, failures: List[Dict]):
+        self.failures = failures
+        names = ", ".join(_describe_failure(failure) for failure in failures[:5])
+        more = f" (+{len(failures) - 5})" if len(failures) > 5 else ""
+        super().__init__(f"Niepoprawny XML - faktury niezgodne ze schematem: {names}{more}")
+
+def _describe_failure(failure: Dict) -> str:
+    name = failure.get('invoice_number') or f"#{failure.get('index')}"
+    if failure.get('source_file'):
+        name += f" ({failure['source_file']})"
+    return name
+
 class XMLGeneratorMulti:
     def __init__(self):
-        self.xsd_schema = None
-        try:
-            with open('comarch_schema.xsd', 'rb') as f:
-                schema_root = etree.parse(f)
-                self.xsd_schema = etree.XMLSchema(schema_root)
-        except Exception as e:
-            logger.warning(f"Nie udało się załadować schematu XSD: {e}")
+        self.xsd_schema = get_xsd_schema()
 
     def validate_xml(self, xml_str: str) -> bool:
         """Waliduje XML względem schematu XSD"""
@@ -31,97 +55,242 @@ class XMLGeneratorMulti:
             logger.error(f"Błąd walidacji XML: {e}")
             return False
 
+    def validate_dokument(self, dokument: etree._Element) -> Optional[str]:
+        """Waliduje pojedynczy <Dokument> względem schematu
+
+        Element jest na czas walidacji przenoszony do tymczasowego <Dokumenty>
+        (i odłączany od dotychczasowego rodzica), więc koszt nie zależy od
+        liczby faktur w pliku.
+
+        Returns:
+            Opis błędu albo None, gdy dokument jest poprawny (lub brak schematu)
+        """
+        if not self.xsd_schema:
+            return None
+        wrapper = etree.Element("Dokumenty")
+        wrapper.append(dokument)
+        try:
+            if self.xsd_schema.validate(wrapper):
+                return None
+            return "; ".join(f"linia {error.line}: {error.message}" if error.line else error.message
+                             for error in self.xsd_schema.error_log)
+        finally:
+            wrapper.remove(dokument)
+
+    def validate_file(self, xml_path) -> List[Dict]:
+        """Waliduje zapisany plik XML dokument po dokumencie (iterparse)
+
+        Pamięć nie zależy od rozmiaru pliku - przetworzone elementy są zwalniane.
+
+        Returns:
+            Lista odrzuconych faktur (pusta, gdy plik jest poprawny)
+        """
+        failures = []
+        if not self.xsd_schema:
+            logger.warning("Schemat XSD nie jest dostępny, pomijam walidację")
+            return failures
+        for index, (_, element) in enumerate(etree.iterparse(str(xml_path), tag="Dokument"), 1):
+            # validate_dokument odłącza element od drzewa - przetworzone dokumenty nie zostają w pamięci
+            error = self.validate_dokument(element)
+            if error:
+                failures.append({
+                    'index': index,
+                    'invoice_number': element.findtext("Naglowek/Numer"),
+                    'source_file': None,
+                    'error': error,
+                })
+            element.clear()
+        return failures
+
+    def _build_dokument(self, comarch_data) -> etree._Element:
+        """Buduje element <Dokument> dla jednej faktury"""
+        dokument = etree.Element("Dokument")
+        dokument.set("Typ", comarch_data.document_type)
+        
+        naglowek = etree.SubElement(dokument, "Naglowek")
+        etree.SubElement(naglowek, "Numer").text = comarch_data.invoice_number
+        etree.SubElement(naglowek, "DataWystawienia").text = comarch_data.issue_date
+        etree.SubElement(naglowek, "DataSprzedazy").text = comarch_data.sale_date or comarch_data.issue_date
+        etree.SubElement(naglowek, "DataKsiegowania").text = datetime.now().strftime('%Y-%m-%d')
+        
+        kontrahent = etree.SubElement(naglowek, "Kontrahent")
+        seller_nip = comarch_data.seller_nip if comarch_data.seller_nip else ""
+        etree.SubElement(kontrahent, "NIP").text = seller_nip
+        seller_name = comarch_data.seller_name if comarch_data.seller_name else "NIEZNANY DOSTAWCA"
+        etree.SubElement(kontrahent, "Nazwa").text = seller_name
+        
+        if comarch_data.seller_address:
+            adres_parts = []
+            if comarch_data.seller_address.get('street'):
+                street = comarch_data.seller_address.get('street')
+                building = comarch_data.seller_address.get('building', '')
+                adres_parts.append(f"{street} {building}".strip())
+            if comarch_data.seller_address.get('city'):
+                city = comarch_data.seller_address.get('city')
+                postal = comarch_data.seller_address.get('postal_code')
+                if postal:
+                    adres_parts.append(f"{postal} {city}")
+                else:
+                    adres_parts.append(city)
+            adres_text = ", ".join(adres_parts) if adres_parts else "brak danych adresowych"
+        else:
+            adres_text = "brak danych adresowych"
+        
+        etree.SubElement(kontrahent, "Adres").text = adres_text
+        etree.SubElement(kontrahent, "KodKraju").text = "PL"
+        etree.SubElement(naglowek, "FormaPlatnosci").text = comarch_data.payment_method
+        etree.SubElement(naglowek, "TerminPlatnosci").text = comarch_data.payment_date
+        etree.SubElement(naglowek, "Waluta").text = comarch_data.currency
+        
+        pozycje = etree.SubElement(dokument, "Pozycje")
+        for item in comarch_data.items:
+            pozycja = etree.SubElement(pozycje, "Pozycja")
+            etree.SubElement(pozycja, "Opis").text = item['description']
+            etree.SubElement(pozycja, "Ilosc").text = str(item['quantity'])
+            etree.SubElement(pozycja, "Jednostka").text = item.get('unit', 'szt.')
+            etree.SubElement(pozycja, "CenaNetto").text = f"{item['unit_price']:.2f}"
+            etree.SubElement(pozycja, "WartoscNetto").text = f"{item['net_value']:.2f}"
+            etree.SubElement(pozycja, "StawkaVAT").text = str(item['vat_rate'])
+            etree.SubElement(pozycja, "KwotaVAT").text = f"{item['vat_amount']:.2f}"
+            etree.SubElement(pozycja, "WartoscBrutto").text = f"{item['gross_value']:.2f}"
+            kategoria = "402-13" if 'usługa' in item['description'].lower() else "401-05"
+            etree.SubElement(pozycja, "KategoriaKsiegowa").text = kategoria
+            etree.SubElement(pozycja, "KontoKsiegowe").text = kategoria
+        
+        rejestr_vat = etree.SubElement(dokument, "RejestrVAT")
+        etree.SubElement(rejestr_vat, "Typ").text = "Rejestr zakupu"
+        for rate_str, amounts in comarch_data.vat_summary.items():
+            rate = rate_str.replace('%', '')
+            etree.SubElement(rejestr_vat, "StawkaVAT").text = rate
+            etree.SubElement(rejestr_vat, "Netto").text = f"{amounts['net']:.2f}"
+            etree.SubElement(rejestr_vat, "VAT").text = f"{amounts['vat']:.2f}"
+            etree.SubElement(rejestr_vat, "Brutto").text = f"{amounts['gross']:.2f}"
+        
+        if comarch_data.jpk_flags:
+            etree.SubElement(rejestr_vat, "JPK").text = ",".join(comarch_data.jpk_flags)
+        etree.SubElement(rejestr_vat, "Odliczalny").text = "Tak"
+        
+        platnosc = etree.SubElement(dokument, "Platnosc")
+        etree.SubElement(platnosc, "Kwota").text = f"{comarch_data.gross_total:.2f}"
+        etree.SubElement(platnosc, "Waluta").text = comarch_data.currency
+        etree.SubElement(platnosc, "DataPlatnosci").text = comarch_data.payment_date
+        etree.SubElement(platnosc, "Status").text = "rozchód"
+        
+        if comarch_data.is_correction:
+            etree.SubElement(dokument, "Korekta").text = f"Korekta faktury {comarch_data.invoice_number}"
+        
+        etree.SubElement(dokument, "Wersja").text = "2.00"
+        
+        return dokument
+
     def generate_multi_invoice_xml(self, invoice_list) -> str:
-        """Generuje XML z wieloma fakturami zgodny z formatem Comarch ERP Optima"""
+        """Generuje XML z wieloma fakturami zgodny z formatem Comarch ERP Optima
+
+        Cały dokument powstaje w pamięci - dla dużych partii lepiej użyć
+        write_multi_invoice_xml, który zapisuje faktury strumieniowo.
+        """
         root = etree.Element("Dokumenty")
+        failures = []
+        
+        for index, comarch_data in enumerate(invoice_list, 1):
+            dokument = self._build_dokument(comarch_data)
+            error = self.validate_dokument(dokument)
+            if error:
+                failures.append(_failure_record(index, comarch_data, error))
+            root.append(dokument)
         
-        for idx, comarch_data in enumerate(invoice_list, 1):
-            dokument = etree.SubElement(root, "Dokument")
-            dokument.set("Typ", comarch_data.document_type)
-            
-            naglowek = etree.SubElement(dokument, "Naglowek")
-            etree.SubElement(naglowek, "Numer").text = comarch_data.invoice_number
-            etree.SubElement(naglowek, "DataWystawienia").text = comarch_data.issue_date
-            etree.SubElement(naglowek, "DataSprzedazy").text = comarch_data.sale_date or comarch_data.issue_date
-            etree.SubElement(naglowek, "DataKsiegowania").text = datetime.now().strftime('%Y-%m-%d')
-            
-            kontrahent = etree.SubElement(naglowek, "Kontrahent")
-            seller_nip = comarch_data.seller_nip if comarch_data.seller_nip else ""
-            etree.SubElement(kontrahent, "NIP").text = seller_nip
-            seller_name = comarch_data.seller_name if comarch_data.seller_name else "NIEZNANY DOSTAWCA"
-            etree.SubElement(kontrahent, "Nazwa").text = seller_name
-            
-            if comarch_data.seller_address:
-                adres_parts = []
-                if comarch_data.seller_address.get('street'):
-                    street = comarch_data.seller_address.get('street')
-                    building = comarch_data.seller_address.get('building', '')
-                    adres_parts.append(f"{street} {building}".strip())
-                if comarch_data.seller_address.get('city'):
-                    city = comarch_data.seller_address.get('city')
-                    postal = comarch_data.seller_address.get('postal_code')
-                    if postal:
-                        adres_parts.append(f"{postal} {city}")
-                    else:
-                        adres_parts.append(city)
-                adres_text = ", ".join(adres_parts) if adres_parts else "brak danych adresowych"
-            else:
-                adres_text = "brak danych adresowych"
-            
-            etree.SubElement(kontrahent, "Adres").text = adres_text
-            etree.SubElement(kontrahent, "KodKraju").text = "PL"
-            etree.SubElement(naglowek, "FormaPlatnosci").text = comarch_data.payment_method
-            etree.SubElement(naglowek, "TerminPlatnosci").text = comarch_data.payment_date
-            etree.SubElement(naglowek, "Waluta").text = comarch_data.currency
-            
-            pozycje = etree.SubElement(dokument, "Pozycje")
-            for item in comarch_data.items:
-                pozycja = etree.SubElement(pozycje, "Pozycja")
-                etree.SubElement(pozycja, "Opis").text = item['description']
-                etree.SubElement(pozycja, "Ilosc").text = str(item['quantity'])
-                etree.SubElement(pozycja, "Jednostka").text = item.get('unit', 'szt.')
-                etree.SubElement(pozycja, "CenaNetto").text = f"{item['unit_price']:.2f}"
-                etree.SubElement(pozycja, "WartoscNetto").text = f"{item['net_value']:.2f}"
-                etree.SubElement(pozycja, "StawkaVAT").text = str(item['vat_rate'])
-                etree.SubElement(pozycja, "KwotaVAT").text = f"{item['vat_amount']:.2f}"
-                etree.SubElement(pozycja, "WartoscBrutto").text = f"{item['gross_value']:.2f}"
-                kategoria = "402-13" if 'usługa' in item['description'].lower() else "401-05"
-                etree.SubElement(pozycja, "KategoriaKsiegowa").text = kategoria
-                etree.SubElement(pozycja, "KontoKsiegowe").text = kategoria
-            
-            rejestr_vat = etree.SubElement(dokument, "RejestrVAT")
-            etree.SubElement(rejestr_vat, "Typ").text = "Rejestr zakupu"
-            for rate_str, amounts in comarch_data.vat_summary.items():
-                rate = rate_str.replace('%', '')
-                etree.SubElement(rejestr_vat, "StawkaVAT").text = rate
-                etree.SubElement(rejestr_vat, "Netto").text = f"{amounts['net']:.2f}"
-                etree.SubElement(rejestr_vat, "VAT").text = f"{amounts['vat']:.2f}"
-                etree.SubElement(rejestr_vat, "Brutto").text = f"{amounts['gross']:.2f}"
-            
-            if comarch_data.jpk_flags:
-                etree.SubElement(rejestr_vat, "JPK").text = ",".join(comarch_data.jpk_flags)
-            etree.SubElement(rejestr_vat, "Odliczalny").text = "Tak"
-            
-            platnosc = etree.SubElement(dokument, "Platnosc")
-            etree.SubElement(platnosc, "Kwota").text = f"{comarch_data.gross_total:.2f}"
-            etree.SubElement(platnosc, "Waluta").text = comarch_data.currency
-            etree.SubElement(platnosc, "DataPlatnosci").text = comarch_data.payment_date
-            etree.SubElement(platnosc, "Status").text = "rozchód"
-            
-            if comarch_data.is_correction:
-                etree.SubElement(dokument, "Korekta").text = f"Korekta faktury {comarch_data.invoice_number}"
-            
-            etree.SubElement(dokument, "Wersja").text = "2.00"
+        if failures:
+            for failure in failures:
+                logger.error(f"Faktura {_describe_failure(failure)} niezgodna ze schematem: {failure['error']}")
+            raise XMLValidationError(failures)
         
-        xml_str = etree.tostring(
+        return etree.tostring(
             root,
             pretty_print=True,
             xml_declaration=True,
             encoding='UTF-8'
         ).decode('utf-8')
-        
-        if not self.validate_xml(xml_str):
-            logger.error("Wygenerowany XML nie przeszedł walidacji")
-            raise ValueError("Niepoprawny XML")
-        
-        return xml_str
\ No newline at end of file
+
+    def write_multi_invoice_xml(self, invoice_list, output_file) -> int:
+        """Zapisuje faktury strumieniowo do pliku XML i zwraca liczbę zapisanych
+
+        Faktury niezgodne ze schematem są pomijane i logowane - pozostałe
+        trafiają do pliku.
+        """
+        with MultiInvoiceXMLWriter(output_file, generator=self) as writer:
+            for comarch_data in invoice_list:
+                writer.write(comarch_data)
+        return writer.count
+
+def _failure_record(index: int, comarch_data, error: str) -> Dict:
+    return {
+        'index': index,
+        'invoice_number': comarch_data.invoice_number,
+        'source_file': getattr(comarch_data, 'source_file', None),
+        'error': error,
+    }
+
+class MultiInvoiceXMLWriter:
+    """Strumieniowy zapis wielu faktur do jednego pliku XML
+
+    Każdy <Dokument> jest walidowany względem schematu, serializowany do
+    bajtów i zapisywany na dysk zaraz po dodaniu, więc pamięć nie rośnie
+    z liczbą faktur. Faktura niezgodna ze schematem nie trafia do pliku -
+    jest zapisywana w failures, a partia jest kontynuowana. Plik ma BOM
+    UTF-8 i wcięcia takie same jak generate_multi_invoice_xml. Bez żadnej
+    poprawnej faktury plik nie jest tworzony.
+    """
+
+    def __init__(self, output_file, generator: XMLGeneratorMulti = None, validate: bool = True):
+        self.output_path = Path(output_file)
+        self.generator = generator or XMLGeneratorMulti()
+        self.validate = validate
+        self.count = 0
+        self.failures: List[Dict] = []
+        self._file = None
+
+    def open(self):
+        self._file = open(self.output_path, 'wb')
+        self._file.write(codecs.BOM_UTF8 + XML_DECLARATION + b"<Dokumenty>\n")
+        return self
+
+    def write(self, comarch_data) -> bool:
+        """Dopisuje fakturę do pliku (plik jest tworzony przy pierwszej fakturze)
+
+        Returns:
+            False, jeśli faktura nie przeszła walidacji i została pominięta
+        """
+        dokument = self.generator._build_dokument(comarch_data)
+        if self.validate:
+            error = self.generator.validate_dokument(dokument)
+            if error:
+                failure = _failure_record(self.count + len(self.failures) + 1, comarch_data, error)
+                self.failures.append(failure)
+                logger.error(f"Faktura {_describe_failure(failure)} niezgodna ze schematem: {error}")
+                return False
+
+        if self._file is None:
+            self.open()
+        etree.indent(dokument, space='  ', level=1)
+        self._file.write(b"  " + etree.tostring(dokument, encoding='UTF-8') + b"\n")
+        self.count += 1
+        return True
+
+    def close(self):
+        """Zamyka element główny i plik"""
+        if self._file is None:
+            return
+        self._file.write(b"</Dokumenty>\n")
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._file is not None:
+            self._file.close()
+            self._file = None
+        return False
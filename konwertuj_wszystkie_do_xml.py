@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 Konwertuje wszystkie faktury do jednego pliku XML
-Obsługuje wielostronicowe PDF - każda strona jako osobna faktura
+Obsługuje wielostronicowe PDF - pliki zbiorcze są dzielone na pojedyncze faktury
 """
 
 import sys
@@ -32,7 +32,7 @@ def convert_all_to_single_xml():
     
     print("="*70)
     print("KONWERSJA WSZYSTKICH FAKTUR DO JEDNEGO PLIKU XML")
-    print("Obsługa wielostronicowych PDF - każda strona osobno")
+    print("Obsługa wielostronicowych PDF - podział pliku zbiorczego na faktury")
     print("="*70)
     
     # Znajdź faktury
@@ -62,7 +62,7 @@ def convert_all_to_single_xml():
         print("-" * 50)
         
         try:
-            # Ekstraktuj faktury z PDF (każda strona osobno)
+            # Ekstraktuj faktury z PDF (plik zbiorczy dzielony na faktury wg stron)
             invoices_from_pdf = processor.extract_from_pdf_multipage(pdf_path)
             
             if invoices_from_pdf:
@@ -79,8 +79,8 @@ def convert_all_to_single_xml():
                         all_invoices.append(comarch_data)
                         
                         # Informacje o fakturze
-                        invoice_num = comarch_data.invoice_number or f"Strona_{invoice_data.get('source_page', '?')}"
-                        source_page = invoice_data.get('source_page', '?')
+                        source_page = invoice_data.source_page or '?'
+                        invoice_num = comarch_data.invoice_number or f"Strona_{source_page}"
                         
                         print(f"      📋 Faktura: {invoice_num} (strona {source_page})")
                         
@@ -95,9 +95,9 @@ def convert_all_to_single_xml():
                         total_invoices += 1
                         
                     except Exception as e:
-                        logger.error(f"Błąd mapowania faktury ze strony {invoice_data.get('source_page', '?')}: {e}")
+                        logger.error(f"Błąd mapowania faktury ze strony {invoice_data.source_page or '?'}: {e}")
                 
-                total_pages_processed += len(invoices_from_pdf)
+                total_pages_processed += processor.last_stats.get('pages', 0)
                 
             else:
                 files_without_invoices += 1
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Generator syntetycznego korpusu faktur PDF dla benchmarku potoku PDF→XML
+
+Kategorie korpusu:
+- text: jednostronicowa faktura z warstwą tekstową i tabelą pozycji
+- table_heavy: faktura z długą tabelą (kilkadziesiąt pozycji na stronę)
+- multipage: faktura wielostronicowa, podsumowanie na ostatniej stronie
+- scanned: ta sama treść zapisana jako obraz (wymaga OCR)
+
+Pliki z warstwą tekstową są zapisywane bez zewnętrznych bibliotek
+(Helvetica z kodowaniem uzupełnionym o polskie znaki). Skany są
+renderowane przez Pillow. Korpus jest deterministyczny dla danego ziarna.
+"""
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+CATEGORIES = ('text', 'table_heavy', 'multipage', 'scanned')
+
+# Strona A4 w punktach PDF
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+# Kody 128+ przypisane polskim znakom przez /Differences (ó i Ó są już w WinAnsi)
+_POLISH_GLYPHS = [
+    ('ą', 'aogonek'), ('ć', 'cacute'), ('ę', 'eogonek'), ('ł', 'lslash'),
+    ('ń', 'nacute'), ('ś', 'sacute'), ('ź', 'zacute'), ('ż', 'zdotaccent'),
+    ('Ą', 'Aogonek'), ('Ć', 'Cacute'), ('Ę', 'Eogonek'), ('Ł', 'Lslash'),
+    ('Ń', 'Nacute'), ('Ś', 'Sacute'), ('Ź', 'Zacute'), ('Ż', 'Zdotaccent'),
+]
+_CHAR_CODES = {char: 128 + i for i, (char, _) in enumerate(_POLISH_GLYPHS)}
+
+_PRODUCTS = [
+    ('Papier ksero A4', 'ryz'), ('Toner do drukarki', 'szt.'), ('Usługa serwisowa', 'godz.'),
+    ('Segregator biurowy', 'szt.'), ('Licencja oprogramowania', 'szt.'),
+    ('Usługa transportowa', 'usł.'), ('Kabel sieciowy 5m', 'szt.'), ('Długopis żelowy', 'szt.'),
+    ('Środek czyszczący', 'l'), ('Usługa księgowa', 'mies.'),
+]
+_CITIES = [('00-001', 'Warszawa'), ('30-002', 'Kraków'), ('80-003', 'Gdańsk'),
+           ('50-004', 'Wrocław'), ('61-005', 'Poznań'), ('90-006', 'Łódź')]
+
+# Układ strony: (teksty [(x, y, rozmiar, tekst)], prostokąty [(x, y, szer, wys)])
+PageLayout = Tuple[List[Tuple[float, float, int, str]], List[Tuple[float, float, float, float]]]
+
+def _random_nip(rng: random.Random) -> str:
+    """Losuje NIP z poprawną sumą kontrolną"""
+    weights = [6, 5, 7, 2, 3, 4, 5, 6, 7]
+    while True:
+        digits = [rng.randint(1, 9)] + [rng.randint(0, 9) for _ in range(8)]
+        checksum = sum(d * w for d, w in zip(digits, weights)) % 11
+        if checksum != 10:
+            return ''.join(map(str, digits)) + str(checksum)
+
+def _fmt(amount: float) -> str:
+    """Formatuje kwotę po polsku: 1 234,56"""
+    return f"{amount:,.2f}".replace(',', ' ').replace('.', ',')
+
+def build_invoice_layout(rng: random.Random, number: int, item_count: int,
+                         rows_per_page: int = 18) -> List[PageLayout]:
+    """Buduje układ stron faktury z tabelą pozycji"""
+    seller_postal, seller_city = rng.choice(_CITIES)
+    buyer_postal, buyer_city = rng.choice(_CITIES)
+    day = rng.randint(1, 28)
+    issue_date = f"2026-09-{day:02d}"
+
+    items = []
+    for _ in range(item_count):
+        name, unit = rng.choice(_PRODUCTS)
+        quantity = rng.randint(1, 20)
+        unit_price = round(rng.uniform(5, 900), 2)
+        vat_rate = rng.choice([23, 23, 23, 8, 5])
+        net = round(quantity * unit_price, 2)
+        vat = round(net * vat_rate / 100, 2)
+        items.append((name, quantity, unit, unit_price, net, vat_rate, net + vat))
+
+    columns = [('Lp.', 28), ('Nazwa towaru lub usługi', 170), ('Ilość', 40), ('J.m.', 36),
+               ('Cena netto', 62), ('Wartość netto', 68), ('VAT', 34), ('Wartość brutto', 72)]
+    row_height = 16
+    pages = []
+    for start in range(0, max(item_count, 1), rows_per_page):
+        texts, rects = [], []
+        first_page = not pages
+        top = PAGE_HEIGHT - 60
+        if first_page:
+            texts += [
+                (50, top, 14, f"FAKTURA VAT nr FV/{number:04d}/09/2026"),
+                (50, top - 24, 9, f"Data wystawienia: {issue_date}"),
+                (50, top - 36, 9, f"Data sprzedaży: {issue_date}"),
+                (50, top - 64, 10, "Sprzedawca:"),
+                (320, top - 64, 10, "Nabywca:"),
+                (50, top - 78, 9, f"Firma Testowa {number} Sp. z o.o."),
+                (320, top - 78, 9, "Odbiorca Benchmarku S.A."),
+                (50, top - 90, 9, f"ul. Przykładowa {rng.randint(1, 99)}"),
+                (320, top - 90, 9, f"ul. Kupiecka {rng.randint(1, 99)}"),
+                (50, top - 102, 9, f"{seller_postal} {seller_city}"),
+                (320, top - 102, 9, f"{buyer_postal} {buyer_city}"),
+                (50, top - 114, 9, f"NIP: {_random_nip(rng)}"),
+                (320, top - 114, 9, f"NIP: {_random_nip(rng)}"),
+            ]
+            table_top = top - 140
+        else:
+            texts.append((50, top, 9, f"Faktura FV/{number:04d}/09/2026 - strona {len(pages) + 1}"))
+            table_top = top - 20
+
+        page_items = items[start:start + rows_per_page]
+        rows = [[name for name, _ in columns]]
+        for offset, (name, quantity, unit, unit_price, net, vat_rate, gross) in enumerate(page_items):
+            rows.append([str(start + offset + 1), name, str(quantity), unit, _fmt(unit_price),
+                         _fmt(net), f"{vat_rate}%", _fmt(gross)])
+
+        y = table_top
+        for row in rows:
+            x = 40
+            for (_, width), cell in zip(columns, row):
+                rects.append((x, y - row_height, width, row_height))
+                texts.append((x + 2, y - row_height + 4, 7, cell))
+                x += width
+            y -= row_height
+
+        if start + rows_per_page >= item_count:
+            net_total = sum(item[4] for item in items)
+            gross_total = sum(item[6] for item in items)
+            texts += [
+                (300, y - 24, 9, f"Razem netto: {_fmt(net_total)} PLN"),
+                (300, y - 36, 9, f"Razem VAT: {_fmt(gross_total - net_total)} PLN"),
+                (300, y - 52, 11, f"Do zapłaty: {_fmt(gross_total)} PLN"),
+                (50, y - 76, 9, "Forma płatności: przelew"),
+                (50, y - 88, 9, f"Termin płatności: 2026-10-{day:02d}"),
+            ]
+        pages.append((texts, rects))
+    return pages
+
+def _encode_pdf_text(text: str) -> bytes:
+    """Koduje tekst do łańcucha PDF dla fontu z tabelą /Differences"""
+    encoded = bytearray()
+    for char in text:
+        if char in _CHAR_CODES:
+            encoded.append(_CHAR_CODES[char])
+        else:
+            encoded += char.encode('cp1252', errors='replace')
+    return bytes(encoded).replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+def write_text_pdf(path: Path, pages: List[PageLayout]):
+    """Zapisuje PDF z warstwą tekstową (bez zależności zewnętrznych)"""
+    differences = ' '.join(f"/{glyph}" for _, glyph in _POLISH_GLYPHS)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages - uzupełniane po zbudowaniu stron
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding 4 0 R >>",
+        f"<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [128 {differences}] >>".encode('ascii'),
+    ]
+    page_ids = []
+    for texts, rects in pages:
+        content = bytearray(b"0.5 w\n")
+        for x, y, width, height in rects:
+            content += f"{x} {y} {width} {height} re S\n".encode('ascii')
+        for x, y, size, text in texts:
+            content += f"BT /F1 {size} Tf {x} {y} Td (".encode('ascii')
+            content += _encode_pdf_text(text) + b") Tj ET\n"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + bytes(content) + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode('ascii'))
+        page_ids.append(len(objects))
+    kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode('ascii')
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for object_id, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{object_id} 0 obj\n".encode('ascii') + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('ascii')
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode('ascii')
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii')
+    path.write_bytes(bytes(output))
+
+def _load_font(size: int):
+    from PIL import ImageFont
+    for font_name in ('DejaVuSans.ttf', 'arial.ttf'):
+        try:
+            return ImageFont.truetype(font_name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 - tylko domyślny font bitmapowy
+        return ImageFont.load_default()
+
+def write_scanned_pdf(path: Path, pages: List[PageLayout], dpi: int = 200):
+    """Zapisuje PDF złożony wyłącznie z obrazów stron (symulacja skanu)"""
+    from PIL import Image, ImageDraw
+
+    scale = dpi / 72
+    fonts = {}
+    images = []
+    for texts, rects in pages:
+        image = Image.new('L', (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 255)
+        draw = ImageDraw.Draw(image)
+        for x, y, width, height in rects:
+            draw.rectangle([x * scale, (PAGE_HEIGHT - y - height) * scale,
+                            (x + width) * scale, (PAGE_HEIGHT - y) * scale], outline=0)
+        for x, y, size, text in texts:
+            font = fonts.get(size) or fonts.setdefault(size, _load_font(int(size * scale)))
+            draw.text((x * scale, (PAGE_HEIGHT - y - size) * scale), text, fill=0, font=font)
+        images.append(image)
+    images[0].save(path, 'PDF', resolution=dpi, save_all=True, append_images=images[1:])
+    for image in images:
+        image.close()
+
+def generate_corpus(corpus_dir: Path, count: int = 5, seed: int = 2026) -> Dict[str, List[Path]]:
+    """Generuje korpus (count plików na kategorię) i zwraca ścieżki według kategorii"""
+    rng = random.Random(seed)
+    corpus = {}
+    number = 1
+    for category in CATEGORIES:
+        category_dir = corpus_dir / category
+        category_dir.mkdir(parents=True, exist_ok=True)
+        corpus[category] = []
+        for index in range(count):
+            if category == 'table_heavy':
+                pages = build_invoice_layout(rng, number, rng.randint(40, 80), rows_per_page=40)
+            elif category == 'multipage':
+                pages = build_invoice_layout(rng, number, rng.randint(60, 90))
+            else:
+                pages = build_invoice_layout(rng, number, rng.randint(2, 8))
+
+            path = category_dir / f"{category}_{index + 1:03d}.pdf"
+            if category == 'scanned':
+                write_scanned_pdf(path, pages)
+            else:
+                write_text_pdf(path, pages)
+            corpus[category].append(path)
+            number += 1
+    return corpus
+
+def load_corpus(corpus_dir: Path) -> Dict[str, List[Path]]:
+    """Zwraca istniejący korpus według kategorii (pusty słownik, jeśli brak)"""
+    corpus = {}
+    for category in CATEGORIES:
+        files = sorted((corpus_dir / category).glob('*.pdf'))
+        if files:
+            corpus[category] = files
+    return corpus
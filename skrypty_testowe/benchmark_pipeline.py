@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark potoku PDF→XML z czasami poszczególnych etapów
+
+Mierzy na syntetycznym korpusie (patrz benchmark_corpus.py):
+- czas etapów: ekstrakcja tekstu/tabel, OCR, wykrywanie typu, parsowanie,
+  mapowanie Comarch, budowa XML, walidacja XSD
+- szczytowe RSS każdego etapu i całego pliku
+- przepustowość (faktury/s) dla każdej kategorii
+
+Wynik zapisywany jest jako JSON. Z opcją --baseline wyniki są porównywane
+z zapisanym wcześniej plikiem - regresja powyżej progu kończy skrypt kodem 1.
+
+Użycie:
+    python skrypty_testowe/benchmark_pipeline.py --count 5 --output bench.json
+    python skrypty_testowe/benchmark_pipeline.py --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'app'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_corpus import CATEGORIES, generate_corpus, load_corpus
+from config import get_config
+from extraction_cache import configure_extraction_cache
+from memory_monitor import PeakMemoryMonitor, get_rss_mb
+from pdf_processor import PDFProcessor
+from comarch_mapper import ComarchMapper
+from xml_generator import XMLGenerator
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('extraction', 'ocr', 'detection', 'parse', 'mapping', 'xml_build', 'xml_validate')
+
+# Różnice czasu poniżej tego progu traktujemy jako szum pomiarowy
+MIN_REGRESSION_MS = 0.5
+
+def _ocr_available() -> bool:
+    """Sprawdza, czy Tesseract i Poppler są dostępne"""
+    config = get_config()
+    tesseract = config.tesseract_path if os.path.isfile(config.tesseract_path) else shutil.which('tesseract')
+    poppler = (config.poppler_path and os.path.isdir(config.poppler_path)) or shutil.which('pdftoppm')
+    return bool(tesseract and poppler)
+
+def _timed(func, *args):
+    """Wywołuje funkcję i zwraca (wynik, sekundy, szczytowe RSS w MB)"""
+    with PeakMemoryMonitor() as memory:
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+    return result, elapsed, memory.peak_mb
+
+def run_file(pdf_path: Path, processor: PDFProcessor, mapper: ComarchMapper, generator: XMLGenerator) -> dict:
+    """Przepuszcza jeden plik przez cały potok i zwraca pomiary etapów"""
+    record = {'file': pdf_path.name, 'stages': {}, 'error': None}
+    stages = record['stages']
+    rss_before = get_rss_mb()
+    start = time.perf_counter()
+    try:
+        with PeakMemoryMonitor() as memory:
+            invoice_data = processor.extract_from_pdf(str(pdf_path))
+            stats = processor.last_stats
+            extraction_peak = stats.get('peak_rss_mb')
+            for stage, seconds in stats.get('timings', {}).items():
+                stages[stage] = {'seconds': seconds, 'peak_rss_mb': extraction_peak}
+            record['pages'] = stats.get('pages', 0)
+            record['ocr_pages'] = stats.get('ocr_pages', 0)
+
+            comarch_data, seconds, peak = _timed(mapper.map_invoice_data, invoice_data)
+            stages['mapping'] = {'seconds': seconds, 'peak_rss_mb': peak}
+
+            xml_str, seconds, peak = _timed(lambda data: generator.generate_xml(data, validate=False), comarch_data)
+            stages['xml_build'] = {'seconds': seconds, 'peak_rss_mb': peak}
+
+            valid, seconds, peak = _timed(generator.validate_xml, xml_str)
+            stages['xml_validate'] = {'seconds': seconds, 'peak_rss_mb': peak}
+            record['xml_valid'] = valid
+            record['invoice'] = bool(invoice_data.invoice_number or invoice_data.items)
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+        memory = None
+
+    record['seconds'] = time.perf_counter() - start
+    record['peak_rss_mb'] = memory.peak_mb if memory else None
+    rss_after = get_rss_mb()
+    record['rss_growth_mb'] = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return record
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def summarize_category(records: list, wall_seconds: float) -> dict:
+    """Agreguje pomiary plików jednej kategorii"""
+    succeeded = [r for r in records if not r['error']]
+    summary = {
+        'files': len(records),
+        'errors': len(records) - len(succeeded),
+        'invoices': sum(1 for r in succeeded if r.get('invoice')),
+        'xml_valid': sum(1 for r in succeeded if r.get('xml_valid')),
+        'pages': sum(r.get('pages', 0) for r in succeeded),
+        'ocr_pages': sum(r.get('ocr_pages', 0) for r in succeeded),
+        'wall_seconds': round(wall_seconds, 4),
+        'invoices_per_second': round(len(succeeded) / wall_seconds, 3) if wall_seconds > 0 else None,
+        'peak_rss_mb': max((r['peak_rss_mb'] for r in records if r['peak_rss_mb'] is not None), default=None),
+        'stages': {},
+    }
+    for stage in STAGES:
+        samples = [r['stages'][stage] for r in succeeded if stage in r['stages']]
+        if not samples:
+            continue
+        times_ms = [sample['seconds'] * 1000 for sample in samples]
+        peaks = [sample['peak_rss_mb'] for sample in samples if sample['peak_rss_mb'] is not None]
+        summary['stages'][stage] = {
+            'count': len(times_ms),
+            'total_ms': round(sum(times_ms), 3),
+            'mean_ms': round(statistics.mean(times_ms), 3),
+            'median_ms': round(statistics.median(times_ms), 3),
+            'p95_ms': round(_percentile(times_ms, 0.95), 3),
+            'peak_rss_mb': round(max(peaks), 1) if peaks else None,
+        }
+    return summary
+
+def run_benchmark(corpus: dict, parser_type: str, warmup: bool = True) -> dict:
+    """Uruchamia benchmark na korpusie i zwraca wyniki (gotowe do zapisu JSON)"""
+    processor = PDFProcessor(parser_type=parser_type)
+    mapper = ComarchMapper()
+    generator = XMLGenerator()
+
+    if warmup:
+        # Pierwszy plik ładuje parsery, spaCy i schemat - nie wliczamy go do pomiarów
+        first_file = next(iter(path for files in corpus.values() for path in files), None)
+        if first_file:
+            run_file(first_file, processor, mapper, generator)
+
+    results = {'categories': {}, 'files': {}}
+    for category, files in corpus.items():
+        start = time.perf_counter()
+        records = [run_file(path, processor, mapper, generator) for path in files]
+        wall_seconds = time.perf_counter() - start
+        results['categories'][category] = summarize_category(records, wall_seconds)
+        results['files'][category] = records
+        for record in records:
+            if record['error']:
+                logger.warning(f"{category}/{record['file']}: {record['error']}")
+    return results
+
+def compare_with_baseline(current: dict, baseline: dict, tolerance: float) -> list:
+    """Zwraca listę regresji względem wyników bazowych"""
+    regressions = []
+    for category, summary in current['categories'].items():
+        base = baseline.get('categories', {}).get(category)
+        if not base:
+            continue
+        base_rate = base.get('invoices_per_second')
+        rate = summary.get('invoices_per_second')
+        if base_rate and rate is not None and rate < base_rate * (1 - tolerance):
+            regressions.append(f"{category}: przepustowość {rate:.2f}/s < {base_rate:.2f}/s")
+        base_peak = base.get('peak_rss_mb')
+        peak = summary.get('peak_rss_mb')
+        if base_peak and peak and peak > base_peak * (1 + tolerance):
+            regressions.append(f"{category}: szczyt RSS {peak:.0f} MB > {base_peak:.0f} MB")
+        for stage, stats in summary['stages'].items():
+            base_stage = base.get('stages', {}).get(stage)
+            if not base_stage:
+                continue
+            mean, base_mean = stats['mean_ms'], base_stage['mean_ms']
+            if mean > base_mean * (1 + tolerance) and mean - base_mean > MIN_REGRESSION_MS:
+                regressions.append(f"{category}/{stage}: {mean:.2f} ms > {base_mean:.2f} ms")
+    return regressions
+
+def print_report(results: dict, baseline: dict = None):
+    """Wypisuje tabelę wyników (z wartościami bazowymi, jeśli podano)"""
+    for category, summary in results['categories'].items():
+        base = (baseline or {}).get('categories', {}).get(category, {})
+        print(f"\n{'=' * 78}")
+        rate = summary['invoices_per_second']
+        line = f"{category}: {summary['files']} plików, {summary['pages']} stron (OCR: {summary['ocr_pages']}), "
+        line += f"{rate:.2f} faktur/s" if rate is not None else "brak pomiaru"
+        if base.get('invoices_per_second'):
+            line += f" (bazowo {base['invoices_per_second']:.2f}/s)"
+        print(line)
+        print(f"Błędy: {summary['errors']}, poprawne XML: {summary['xml_valid']}, "
+              f"szczyt RSS: {summary['peak_rss_mb'] or 0:.0f} MB")
+        print(f"{'-' * 78}")
+        print(f"{'Etap':<14}{'średnio ms':>12}{'mediana':>12}{'p95':>12}{'RSS MB':>10}{'bazowo ms':>12}")
+        for stage, stats in summary['stages'].items():
+            base_mean = base.get('stages', {}).get(stage, {}).get('mean_ms')
+            print(f"{stage:<14}{stats['mean_ms']:>12.2f}{stats['median_ms']:>12.2f}{stats['p95_ms']:>12.2f}"
+                  f"{stats['peak_rss_mb'] or 0:>10.0f}{base_mean if base_mean is not None else '-':>12}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark potoku PDF→XML')
+    parser.add_argument('--corpus-dir', default=str(PROJECT_ROOT / 'benchmark_corpus'),
+                        help='Katalog korpusu (tworzony, jeśli nie istnieje)')
+    parser.add_argument('--count', type=int, default=5, help='Liczba plików na kategorię')
+    parser.add_argument('--seed', type=int, default=2026, help='Ziarno generatora korpusu')
+    parser.add_argument('--regenerate', action='store_true', help='Wygeneruj korpus od nowa')
+    parser.add_argument('--categories', nargs='+', choices=CATEGORIES, help='Uruchom tylko wybrane kategorie')
+    parser.add_argument('--parser', default='universal', help='Parser do użycia (universal, atut, bolt, auto)')
+    parser.add_argument('--with-cache', action='store_true',
+                        help='Nie wyłączaj cache ekstrakcji (domyślnie mierzona jest pełna ekstrakcja)')
+    parser.add_argument('--output', '-o', help='Plik JSON z wynikami')
+    parser.add_argument('--baseline', help='Plik JSON z wynikami bazowymi do porównania')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Dopuszczalne pogorszenie względem bazowych wyników (0.2 = 20%%)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Pokaż logi aplikacji')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    corpus_dir = Path(args.corpus_dir)
+    corpus = {} if args.regenerate else load_corpus(corpus_dir)
+    if not corpus:
+        print(f"Generowanie korpusu w {corpus_dir}...")
+        corpus = generate_corpus(corpus_dir, count=args.count, seed=args.seed)
+    corpus = {category: files[:args.count] for category, files in corpus.items()
+              if not args.categories or category in args.categories}
+
+    ocr_available = _ocr_available()
+    if not ocr_available and 'scanned' in corpus:
+        print("Tesseract/Poppler niedostępne - pomijam kategorię 'scanned'")
+        del corpus['scanned']
+
+    configure_extraction_cache(enabled=args.with_cache)
+
+    results = run_benchmark(corpus, args.parser)
+    results['meta'] = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parser': args.parser,
+        'files_per_category': args.count,
+        'seed': args.seed,
+        'cache': args.with_cache,
+        'ocr_available': ocr_available,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nWyniki zapisane do: {args.output}")
+
+    if baseline:
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegresje względem {args.baseline} (próg {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\nBrak regresji względem {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Skrypt testowy rejestru kontrahentów (app/contractor_registry.py)
+Testuje:
+1. Rozpoznanie wbudowanych firm w tekście faktury (jak known_companies w v5/v6)
+2. Firmy o wspólnym NIP (ZAGAMIX / Hotel Stara Poczta) - wybór po nazwie
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+from contractor_registry import load_contractor_registry
+
+HOTEL_NAME = 'Hotel Stara Poczta'
+ZAGAMIX_NAME = '"ZAGAMIX II" L.J. CHRZĄSTEK SP. JAWNA'
+
+HOTEL_TEXT = """Faktura VAT nr 12/2024
+Sprzedawca: Hotel Stara Poczta
+ul. Wczasowa 18, 30-694 Kraków
+NIP: 734-139-90-90"""
+
+ZAGAMIX_TEXT = """Faktura VAT nr 7/2024
+Sprzedawca: "ZAGAMIX II" L.J. Chrząstek Sp. J.
+ul. Wczasowa 18, 30-694 Kraków
+NIP 7341399090"""
+
+def check(description, result, expected):
+    status = "✓" if result == expected else "✗"
+    print(f"{status} {description:55} -> {result} (Oczekiwano: {expected})")
+    return result == expected
+
+def test_builtin_texts():
+    """Wbudowane firmy rozpoznawane w tekście z NIP i bez NIP"""
+    print("\n=== Test rozpoznania wbudowanych firm ===")
+    registry = load_contractor_registry('')
+
+    def found(text):
+        contractor = registry.find_in_text(text)
+        return contractor.name if contractor else None
+
+    test_cases = [
+        ("Hotel Stara Poczta z NIP", found(HOTEL_TEXT), HOTEL_NAME),
+        ("Hotel Stara Poczta bez NIP", found(HOTEL_TEXT.replace('NIP: 734-139-90-90', '')), HOTEL_NAME),
+        ("ZAGAMIX z NIP", found(ZAGAMIX_TEXT), ZAGAMIX_NAME),
+        ("ZAGAMIX bez NIP", found(ZAGAMIX_TEXT.replace('NIP 7341399090', '')), ZAGAMIX_NAME),
+        ("Sam wspólny NIP (pierwsza firma)", found("Faktura NIP 7341399090"), ZAGAMIX_NAME),
+        ("nazwa.pl", found("Sprzedawca: nazwa.pl sp. z o.o. Katowice"), 'nazwa.pl sp. z o.o.'),
+        ("Krzysztof Nowak", found("Sprzedawca: Krzysztof Nowak, Kraków"), 'Krzysztof Nowak Design'),
+    ]
+    return all([check(*case) for case in test_cases])
+
+def test_resolve_shared_nip():
+    """resolve() po NIP wspólnym dla kilku firm wybiera firmę po nazwie"""
+    print("\n=== Test resolve() dla wspólnego NIP ===")
+    registry = load_contractor_registry('')
+
+    def resolved(nip, name):
+        contractor = registry.resolve(nip, name)
+        return contractor.name if contractor else None
+
+    test_cases = [
+        ("NIP + nazwa hotelu", resolved('7341399090', 'Hotel Stara Poczta'), HOTEL_NAME),
+        ("NIP z prefiksem + nazwa ZAGAMIX", resolved('PL 734-139-90-90', 'Zagamix II'), ZAGAMIX_NAME),
+        ("NIP + nieznana nazwa (pierwsza firma)", resolved('7341399090', 'Inna firma'), ZAGAMIX_NAME),
+        ("NIP spoza rejestru + nazwa hotelu", resolved('1234563218', 'Hotel Stara Poczta'), None),
+    ]
+    return all([check(*case) for case in test_cases])
+
+def main():
+    print("=" * 50)
+    print("TEST REJESTRU KONTRAHENTÓW")
+    print("=" * 50)
+
+    results = []
+    results.append(("builtin_texts", test_builtin_texts()))
+    results.append(("resolve_shared_nip", test_resolve_shared_nip()))
+
+    # Podsumowanie
+    print("\n" + "=" * 50)
+    print("PODSUMOWANIE TESTÓW:")
+    print("=" * 50)
+
+    for test_name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{status}: {test_name}")
+
+    all_passed = all(result[1] for result in results)
+
+    if all_passed:
+        print("\n🎉 Wszystkie testy zakończone sukcesem!")
+    else:
+        print("\n⚠️  Niektóre testy nie powiodły się.")
+
+    return all_passed
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)